@@ -1,7 +1,13 @@
 import streamlit as st
 
+from refresh_worker import get_refresh_worker
+from tracing import span
+
 st.set_page_config(page_title="Executive Cockpit", layout="wide")
 
+# Starts the process-wide sync/build worker on the first request; later runs just get the handle
+get_refresh_worker()
+
 nav = st.navigation(
     {
         "Executive": [
@@ -18,4 +24,6 @@ nav = st.navigation(
     }
 )
 
-nav.run()
+# Every page render is one traced run; page code adds its own nested spans
+with span("page.render", page=nav.title):
+    nav.run()
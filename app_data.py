@@ -1,19 +1,229 @@
-import os
+import json
+import numpy as np
 import pandas as pd
-import streamlit as st
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 
-def _file_mtime(path_val):
-    if not os.path.exists(path_val):
+from build_manifest import file_sha256
+from content_cache import get_content_cache
+from output_store import dataset_name, ipc_name, resolve_output
+from parquet_schema import DATASET_PARTITIONING_FILE, dataset_partitioning
+from tracing import span
+
+# Coercions applied once inside the cache, so pages get ready-to-use dtypes on every rerun.
+# Missing columns are added (empty text / NaN) so pages can index them unconditionally.
+def _coerce_numeric(df_val, col_name):
+    if col_name not in df_val.columns:
+        df_val[col_name] = np.nan
+    else:
+        df_val[col_name] = pd.to_numeric(df_val[col_name], errors="coerce")
+
+def _coerce_text(df_val, col_name):
+    if col_name not in df_val.columns:
+        df_val[col_name] = ""
+    df_val[col_name] = df_val[col_name].astype(str).str.strip()
+
+COERCIONS = {
+    "numeric": _coerce_numeric,
+    "text": _coerce_text,
+}
+
+def _as_key(items_val):
+    # Lists/dicts from callers become tuples so they hash the same way every rerun
+    if items_val is None:
         return None
-    return os.path.getmtime(path_val)
+    if isinstance(items_val, dict):
+        return tuple(items_val.items())
+    return tuple(tuple(x) if isinstance(x, list) else x for x in items_val)
 
-@st.cache_data(show_spinner=False)
-def _read_parquet_cached(path_val, mtime_val):
-    df_val = pd.read_parquet(path_val)
+def _read_ipc_table(path_val, columns=None, filters=None):
+    # Memory-mapped: column buffers point into the page cache, which every worker process
+    # shares, and to_pandas keeps plain numeric columns on those buffers instead of copying.
+    # IPC files have no row-group statistics to skip by, so filters run on the whole mapped
+    # table and the matching rows are copied into private buffers (no longer shared)
+    table = ipc.open_file(pa.memory_map(str(path_val), "r")).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    if filters is not None:
+        table = table.filter(pq.filters_to_expression(filters))
+    return table.to_pandas(split_blocks=True)
+
+def _read_parquet_frame(path_val, columns_key=None, filters_key=None, dtypes_key=None, ipc_path=None):
+    columns = None
+    if columns_key is not None:
+        # Project onto the columns the file has; coercion adds the rest
+        file_cols = set(pq.read_schema(path_val).names)
+        columns = [c for c in columns_key if c in file_cols]
+
+    filters = None if filters_key is None else list(filters_key)
+    if ipc_path is not None:
+        df_val = _read_ipc_table(ipc_path, columns=columns, filters=filters)
+    else:
+        df_val = pd.read_parquet(path_val, columns=columns, filters=filters)
+
+    for col_name, kind in dtypes_key or ():
+        COERCIONS[kind](df_val, col_name)
     return df_val
 
-def read_parquet(path_val):
-    mtime_val = _file_mtime(path_val)
-    if mtime_val is None:
+def read_parquet(name, columns=None, filters=None, dtypes=None):
+    """
+    The read path for dashboard pages. name is a build output (such as LY_OUT_PATH), read
+    from the current output generation; None if it has not been built yet.
+
+    columns: only these columns are read from the file.
+    filters: pyarrow filters such as [("Location", "==", "Digital")]. On the parquet path
+    they are pushed down, so row groups whose statistics cannot match are skipped; on the
+    IPC path they are applied after mapping the whole file, and the result is a private
+    copy of the matching rows rather than a view of the shared map.
+    dtypes: {column: "numeric" | "text"} coercions, done once and stored in the cache.
+
+    When the build wrote the output's Arrow IPC twin (output_store.ipc_name), which every
+    current build does, the frame is read from that file through a memory map rather than
+    decoded from parquet. For reads of a few rows use read_partitioned.
+
+    Results are cached in content_cache per (file sha256, columns, filters, dtypes), so a
+    rerun on an unchanged file is a dictionary lookup and a new generation of the output
+    drops the frames of its previous version. The cached frame is shared across sessions
+    (and after an IPC read its columns may sit on a read-only memory map), so callers get
+    a shallow copy. Changes to it stay local because pandas 3 copies on write
+    (requirements.txt pins pandas>=3.0); pandas 2.x would write through to the shared
+    frame, or fail on the memory-mapped buffers.
+    """
+    path_obj = resolve_output(name)
+    if path_obj is None:
+        return None
+    path_str = str(path_obj)
+    ipc_path = path_obj.with_name(ipc_name(name))
+    ipc_path = ipc_path if ipc_path.exists() else None
+    params = (_as_key(columns), _as_key(filters), _as_key(dtypes))
+    with span("data.read_parquet", path=path_str, ipc=ipc_path is not None):
+        # Keyed on the parquet's sha256 (the IPC twin holds the same table). Owned by the
+        # output name, not the path: every generation has its own directory
+        df_val = get_content_cache().get_or_compute(
+            "parquet" if ipc_path is None else "ipc",
+            file_sha256(path_str),
+            params,
+            lambda: _read_parquet_frame(path_str, *params, ipc_path=ipc_path),
+            owner=("parquet", str(name)),
+        )
+        return df_val.copy(deep=False)
+
+def _partition_key(partitions):
+    # {"Location": "Digital", "Division": ["A", "B"]} -> hashable and the same every rerun
+    if partitions is None:
+        return None
+    return tuple(
+        sorted((col, tuple(vals) if isinstance(vals, (list, tuple)) else vals) for col, vals in partitions.items())
+    )
+
+def _partition_filters(partitions_key):
+    # The same conditions as pyarrow filters, for a read without a dataset
+    return [(col, "in", list(vals)) if isinstance(vals, tuple) else (col, "==", vals) for col, vals in partitions_key or ()]
+
+def _dataset_meta(dataset_dir):
+    # {"columns": [...], "rows_without_partition": n} as written by write_partitioned_dataset
+    return json.loads((dataset_dir / DATASET_PARTITIONING_FILE).read_text())
+
+def _open_dataset(dataset_dir, schema):
+    partition_cols = _dataset_meta(dataset_dir)["columns"]
+    return ds.dataset(str(dataset_dir), format="parquet", partitioning=dataset_partitioning(schema, partition_cols))
+
+def _read_dataset_frame(dataset_dir, schema, partitions_key=None, columns_key=None, filters_key=None, dtypes_key=None):
+    dataset = _open_dataset(dataset_dir, schema)
+    conditions = _partition_filters(partitions_key) + list(filters_key or ())
+    expr = pq.filters_to_expression(conditions) if len(conditions) > 0 else None
+
+    columns = list(schema.names) if columns_key is None else [c for c in columns_key if c in schema.names]
+    out_schema = pa.schema([schema.field(c) for c in columns], metadata=schema.metadata)
+    if len(dataset.files) == 0:
+        table = out_schema.empty_table()
+    else:
+        # Directories whose partition values cannot match expr are never opened. Partition
+        # columns come back as plain values, so cast to the output's own types (categories)
+        table = dataset.to_table(columns=columns, filter=expr).cast(out_schema)
+    df_val = table.to_pandas()
+
+    for col_name, kind in dtypes_key or ():
+        COERCIONS[kind](df_val, col_name)
+    return df_val
+
+def read_partitioned(name, partitions=None, columns=None, filters=None, dtypes=None):
+    """
+    Rows of one output for some partition values, such as
+    read_partitioned(LY_OUT_PATH, {"Location": "Digital"}) or {"Division": ["A", "B"]}.
+
+    Reads the output's partitioned dataset (data_build.OUTPUT_PARTITIONS) and only opens
+    the matching directories, so a page's read grows with the rows it shows rather than
+    with the whole output.
+
+    Partition values are the output's own values, matched exactly: pivot subtotals are
+    partitions of their own, so {"Division": "Division 005"} does not include the
+    "Division 005 Total" row (ask for both, or read the "... Total" partition alone). Rows
+    with no partition value (the trend's undated Grand Total) are not in the dataset at
+    all; dataset_partitions() reports how many.
+
+    columns / dtypes, caching and the shallow copy it returns work as in read_parquet;
+    filters is a flat list of conditions, combined with partitions. Falls back to
+    read_parquet with the same conditions when the current generation has no dataset for
+    name, and returns None if the output has not been built.
+    """
+    path_obj = resolve_output(name)
+    if path_obj is None:
+        return None
+    partitions_key = _partition_key(partitions)
+    dataset_dir = path_obj.with_name(dataset_name(name))
+    if not (dataset_dir / DATASET_PARTITIONING_FILE).exists():
+        conditions = _partition_filters(partitions_key) + list(filters or [])
+        return read_parquet(name, columns=columns, filters=conditions or None, dtypes=dtypes)
+
+    path_str = str(path_obj)
+    params = (partitions_key, _as_key(columns), _as_key(filters), _as_key(dtypes))
+    with span("data.read_partitioned", path=str(dataset_dir), partitions=partitions_key):
+        # Keyed on the parquet's sha256 like read_parquet: the dataset holds the same table
+        df_val = get_content_cache().get_or_compute(
+            "dataset",
+            file_sha256(path_str),
+            params,
+            lambda: _read_dataset_frame(dataset_dir, pq.read_schema(path_str), *params),
+            owner=("parquet", str(name)),
+        )
+        return df_val.copy(deep=False)
+
+def dataset_partitions(name):
+    """
+    ([{partition column: value}] per directory of the output's dataset, number of rows
+    left out for having no partition value), or None if the output has no dataset.
+    """
+    path_obj = resolve_output(name)
+    if path_obj is None:
+        return None
+    dataset_dir = path_obj.with_name(dataset_name(name))
+    if not (dataset_dir / DATASET_PARTITIONING_FILE).exists():
+        return None
+    dataset = _open_dataset(dataset_dir, pq.read_schema(path_obj))
+    partitions = [ds.get_partition_keys(frag.partition_expression) for frag in dataset.get_fragments()]
+    return partitions, int(_dataset_meta(dataset_dir).get("rows_without_partition", 0))
+
+def _read_json_file(path_val):
+    with open(path_val) as fh:
+        return json.load(fh)
+
+def read_json(name):
+    """
+    A small JSON output built next to the parquets (such as the KPI snapshot), read from the
+    current output generation, parsed once per file version and shared across sessions:
+    treat the result as read-only. None if missing.
+    """
+    path_obj = resolve_output(name)
+    if path_obj is None:
         return None
-    return _read_parquet_cached(path_val, mtime_val)
+    path_str = str(path_obj)
+    return get_content_cache().get_or_compute(
+        "json",
+        file_sha256(path_str),
+        None,
+        lambda: _read_json_file(path_str),
+        owner=("json", str(name)),
+    )
@@ -1,15 +1,19 @@
+import functools
 import streamlit as st
 
+from table_store import session_tables
+
 def require_tables():
     """
-    Enforces that the workbook tables were loaded on the Data page and are
-    available in session state. Stops the page with a friendly message if not.
+    Enforces that the background refresh has published workbook tables to the shared
+    table store. Returns this session's read-only view of them (the session itself only
+    holds a generation handle). Stops the page with a friendly message if not.
     """
-    tables = st.session_state.get("sheets_raw")
-    if tables is None or not isinstance(tables, dict) or len(tables) == 0:
-        st.warning("No data loaded yet. Go to the Data page and click Load and preview selected tabs.")
+    handle = session_tables()
+    if handle is None or len(handle.tables) == 0:
+        st.warning("No data loaded yet. The background refresh loads it; see the Data page for its status.")
         st.stop()
-    return tables
+    return handle.tables
 
 def _norm_name(name_in):
     """
@@ -43,6 +47,132 @@ def tables_debug_map(tables=None):
     rows = sorted(rows, key=lambda r: str(r["sheet_name"]).lower())
     return rows
 
+# Candidate names tried, in order, for the priority sheets (keyed by lowercased request)
+TABLE_SYNONYMS = {
+    "written produced by week": [
+        "written produced by week",
+        "written produced week",
+        "written produced weekly",
+        "written produced by wk",
+        "written produced",
+        "written v produced by week",
+    ],
+    "written produced invoiced": [
+        "written produced invoiced",
+        "written produced & invoiced",
+        "written produced and invoiced",
+        "written produced invoice",
+        "written produced invoicing",
+    ],
+    "ytd plan v actual": [
+         "ytd plan v actual",
+        "ytd plan vs actual",
+        "ytd plan v. actual",
+        "ytd plan v actual ",
+        "ytd plan vs actual ",
+        "ytd plan vs. actual",
+        "ytd plan v. act",
+        "ytd plan vs act",
+        "ytd plan actual",
+        "plan vs actual ytd",
+        "plan v actual ytd",
+        "ytd plan",
+    ],
+    "ytd v ly": [
+        "ytd v ly",
+        "ytd vs ly",
+        "ytd v. ly",
+        "ytd vs last year",
+        "ytd v last year",
+        "ytd vs last yr",
+    ],
+    "color yds": [
+        "color yds",
+        "color yards",
+        "color yds.",
+        "color yards",
+        "color yards report",
+        "color yards by",
+        "color",
+    ],
+    "wip": [
+        "wip",
+        "work in process",
+        "work in progress",
+    ],
+    "yds wasted": [
+        "yds wasted",
+        "yards wasted",
+        "waste yds",
+        "wasted yards",
+        "yds waste",
+        "yards waste",
+    ],
+}
+
+class TableResolver:
+    """
+    Name resolution for one set of table keys, built once and reused for every lookup.
+
+    Precomputes each key's normalized name, a normalized-name -> first key map for the
+    exact pass, and an index of every substring of every normalized name -> first key for
+    the contains pass, so each probe is a dict lookup instead of a scan over the keys.
+    Resolved names are memoized. Results and priority order are those of the original
+    nested loops: "first key" always means first in the tables' iteration order.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self._key_set = set(self.keys)
+        self._exact = {}
+        self._contains = {}
+        for k in self.keys:
+            k_norm = _norm_name(k)
+            self._exact.setdefault(k_norm, k)
+            for i in range(len(k_norm) + 1):
+                for j in range(i, len(k_norm) + 1):
+                    self._contains.setdefault(k_norm[i:j], k)
+        self._memo = {}
+
+    def _match_norm(self, name_in):
+        # Normalized exact match first, then normalized contains match
+        name_norm = _norm_name(name_in)
+        if name_norm in self._exact:
+            return self._exact[name_norm]
+        return self._contains.get(name_norm)
+
+    def _resolve_uncached(self, desired_name):
+        desired_key = str(desired_name).strip().lower()
+        candidates = TABLE_SYNONYMS.get(desired_key, [desired_name])
+
+        for cand in candidates:
+            if cand in self._key_set:
+                return cand
+
+        for cand in candidates:
+            match = self._match_norm(cand)
+            if match is not None:
+                return match
+
+        if desired_name in self._key_set:
+            return desired_name
+
+        return self._match_norm(desired_name)
+
+    def resolve(self, desired_name):
+        """Actual key for desired_name, or None if nothing matches."""
+        if desired_name not in self._memo:
+            self._memo[desired_name] = self._resolve_uncached(desired_name)
+        return self._memo[desired_name]
+
+@functools.lru_cache(maxsize=32)
+def _resolver_for_keys(keys_tuple):
+    # Keyed on the key names only, so no frames are kept alive by the cache
+    return TableResolver(keys_tuple)
+
+def table_resolver(tables):
+    return _resolver_for_keys(tuple(tables.keys()))
+
 def get_table(tables, desired_name):
     """
     Retrieves a dataframe from `tables` using robust matching:
@@ -52,97 +182,7 @@ def get_table(tables, desired_name):
     - synonym candidates (for your priority sheets)
     Returns (df, actual_sheet_name) or (None, None) if not found.
     """
-    synonyms = {
-        "written produced by week": [
-            "written produced by week",
-            "written produced week",
-            "written produced weekly",
-            "written produced by wk",
-            "written produced",
-            "written v produced by week",
-        ],
-        "written produced invoiced": [
-            "written produced invoiced",
-            "written produced & invoiced",
-            "written produced and invoiced",
-            "written produced invoice",
-            "written produced invoicing",
-        ],
-        "ytd plan v actual": [
-             "ytd plan v actual",
-            "ytd plan vs actual",
-            "ytd plan v. actual",
-            "ytd plan v actual ",
-            "ytd plan vs actual ",
-            "ytd plan vs. actual",
-            "ytd plan v. act",
-            "ytd plan vs act",
-            "ytd plan actual",
-            "plan vs actual ytd",
-            "plan v actual ytd",
-            "ytd plan",
-        ],
-        "ytd v ly": [
-            "ytd v ly",
-            "ytd vs ly",
-            "ytd v. ly",
-            "ytd vs last year",
-            "ytd v last year",
-            "ytd vs last yr",
-        ],
-        "color yds": [
-            "color yds",
-            "color yards",
-            "color yds.",
-            "color yards",
-            "color yards report",
-            "color yards by",
-            "color",
-        ],
-        "wip": [
-            "wip",
-            "work in process",
-            "work in progress",
-        ],
-        "yds wasted": [
-            "yds wasted",
-            "yards wasted",
-            "waste yds",
-            "wasted yards",
-            "yds waste",
-            "yards waste",
-        ],
-    }
-
-    desired_key = str(desired_name).strip().lower()
-    candidates = synonyms.get(desired_key, [desired_name])
-
-    for cand in candidates:
-        if cand in tables:
-            return tables[cand], cand
-
-    for cand in candidates:
-        cand_norm = _norm_name(cand)
-
-        for k in tables.keys():
-            if _norm_name(k) == cand_norm:
-                return tables[k], k
-
-        for k in tables.keys():
-            if cand_norm in _norm_name(k):
-                return tables[k], k
-
-    if desired_name in tables:
-        return tables[desired_name], desired_name
-
-    desired_norm = _norm_name(desired_name)
-
-    for k in tables.keys():
-        if _norm_name(k) == desired_norm:
-            return tables[k], k
-
-    for k in tables.keys():
-        if desired_norm in _norm_name(k):
-            return tables[k], k
-
-    return None, None
+    actual_key = table_resolver(tables).resolve(desired_name)
+    if actual_key is None:
+        return None, None
+    return tables[actual_key], actual_key
@@ -0,0 +1,123 @@
+"""
+Scaling benchmark for data_loader.clean_pivot_export_frame, from 1k to 1M rows, against
+the previous row-by-row (DataFrame.apply) implementation kept below for reference.
+
+    python -m benchmarks.bench_clean_pivot --sizes 1000 10000 100000 1000000
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data_loader import _drop_excel_junk_columns, clean_pivot_export_frame
+
+def make_raw_pivot_frame(n_rows, n_measures=6, seed=0):
+    """A header=None frame shaped like a pivot export: title, blank, header, body with
+    subtotal rows every 25 lines, a Grand Total and some whitespace-only cells."""
+    rng = np.random.default_rng(seed)
+    divisions = np.array(["Digital", "Screen Print", "Wallcovering", "Fabric", "Grass"], dtype=object)
+
+    labels = divisions[rng.integers(0, len(divisions), n_rows)].copy()
+    labels[24::25] = [str(x) + " Total" for x in labels[24::25]]
+    notes = np.where(rng.random(n_rows) < 0.05, "  ", None).astype(object)
+
+    head_rows = 3
+    cols = {}
+    cols[0] = np.concatenate([np.array(["Pivot export", np.nan, "Divisions"], dtype=object), labels, np.array(["Grand Total"], dtype=object)])
+    for j in range(n_measures):
+        vals = rng.integers(0, 100_000, n_rows + 1).astype(object)
+        cols[j + 1] = np.concatenate([np.array([np.nan, np.nan, "Measure " + str(j)], dtype=object), vals])
+    cols[n_measures + 1] = np.concatenate([np.array([np.nan, np.nan, "Note"], dtype=object), notes, np.array([None], dtype=object)])
+    df_raw = pd.DataFrame(cols)
+    df_raw.columns = list(range(df_raw.shape[1]))
+    assert df_raw.shape[0] == n_rows + 1 + head_rows
+    return df_raw
+
+def _legacy_row_text_count(row_vals):
+    ser = row_vals.astype(str).str.strip()
+    ser = ser.replace("", "")
+    return int(ser.ne("").sum())
+
+def _legacy_remove_pivot_totals(df):
+    df = df.copy()
+    obj_cols = []
+    for c in df.columns:
+        try:
+            if df[c].dtype == object or str(df[c].dtype) == "object":
+                obj_cols.append(c)
+        except Exception:
+            continue
+    if len(obj_cols) == 0:
+        return df
+    mask_total = pd.Series(False, index=df.index)
+    for c in obj_cols:
+        col_ser = df[c].astype(str).str.strip().str.lower()
+        mask_total = mask_total | col_ser.str.contains("grand total", na=False)
+        mask_total = mask_total | col_ser.str.contains("total", na=False)
+    return df.loc[~mask_total].copy()
+
+def legacy_clean_pivot_export_frame(df_raw, min_text_cells=4, remove_totals=True):
+    row_text_counts = df_raw.apply(lambda r: _legacy_row_text_count(r), axis=1)
+    header_row_idx = int((row_text_counts >= min_text_cells).idxmax())
+    new_cols = [str(x).strip() for x in df_raw.iloc[header_row_idx].tolist()]
+    df_clean = df_raw.iloc[header_row_idx + 1 :].copy()
+    df_clean.columns = new_cols
+    nonempty_row_mask = df_clean.apply(lambda r: _legacy_row_text_count(r) > 0, axis=1)
+    df_clean = df_clean.loc[nonempty_row_mask].reset_index(drop=True)
+    nonempty_col_mask = df_clean.apply(
+        lambda c: c.astype(str).str.strip().replace("", "").ne("").any(), axis=0
+    )
+    df_clean = df_clean.loc[:, nonempty_col_mask].copy()
+    df_clean = _drop_excel_junk_columns(df_clean)
+    if remove_totals and df_clean.shape[0] > 0:
+        df_clean = _legacy_remove_pivot_totals(df_clean)
+    return df_clean
+
+def run(sizes, legacy_max_rows):
+    rows = []
+    for n_rows in sizes:
+        df_raw = make_raw_pivot_frame(n_rows)
+
+        t0 = time.perf_counter()
+        new_df = clean_pivot_export_frame(df_raw)
+        new_s = time.perf_counter() - t0
+
+        legacy_s = None
+        if n_rows <= legacy_max_rows:
+            t0 = time.perf_counter()
+            old_df = legacy_clean_pivot_export_frame(df_raw)
+            legacy_s = time.perf_counter() - t0
+            pd.testing.assert_frame_equal(old_df, new_df)
+
+        rows.append(
+            {
+                "rows": n_rows,
+                "vectorized_s": round(new_s, 4),
+                "legacy_s": None if legacy_s is None else round(legacy_s, 4),
+                "speedup": None if legacy_s is None else round(legacy_s / max(new_s, 1e-9), 1),
+                "rows_out": int(new_df.shape[0]),
+            }
+        )
+    return pd.DataFrame(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument(
+        "--legacy-max-rows",
+        type=int,
+        default=100_000,
+        help="Skip the legacy implementation above this size (it is row-by-row)",
+    )
+    args = parser.parse_args(argv)
+    print(run(args.sizes, args.legacy_max_rows).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
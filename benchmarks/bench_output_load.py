@@ -0,0 +1,155 @@
+"""
+Compares page load latency and memory of the two output formats: decoding the parquet
+versus memory-mapping its Arrow IPC twin, for each of the six build outputs.
+
+Every (output, format) pair is loaded in a fresh child process so the numbers are not
+mixed up by earlier loads. Memory comes from /proc/self/smaps_rollup (Linux) right after
+the load: anon_kb is private heap that every worker process pays for itself, file_kb is
+file-backed pages, which processes mapping the same file share through the page cache.
+
+Only whole-file loads are measured. A filtered read of the IPC twin maps the whole file and
+then copies the matching rows into private memory, so its anon_kb grows with the rows kept
+and the file_kb sharing shown here does not apply to it.
+
+    python -m benchmarks.bench_output_load --rows 50000 --cols 8
+    python -m benchmarks.bench_output_load --outputs data/outputs/gen-...   # an existing generation
+"""
+from pathlib import Path
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app_data import _read_ipc_table, _read_parquet_frame
+from benchmarks.synth_workbook import write_pivot_workbook
+from data_build import ALL_OUT_PATHS, OUTPUT_BUILDERS
+from output_store import ipc_name
+from parquet_schema import write_typed_parquet
+from workbook_session import WorkbookSession
+
+READERS = {
+    "parquet": _read_parquet_frame,
+    "ipc": _read_ipc_table,
+}
+
+def _smaps():
+    # {"Rss": kb, "Pss": kb, "Anonymous": kb, ...}; empty where /proc is not available
+    out = {}
+    try:
+        with open("/proc/self/smaps_rollup") as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    out[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        pass
+    return out
+
+def _child(kind, path_val, repeat):
+    reader = READERS[kind]
+    before = _smaps()
+    t0 = time.perf_counter()
+    df_val = reader(path_val)
+    first = time.perf_counter() - t0
+    after = _smaps()
+
+    best = first
+    for _ in range(max(0, int(repeat) - 1)):
+        t0 = time.perf_counter()
+        reader(path_val)
+        best = min(best, time.perf_counter() - t0)
+
+    def delta(key):
+        if key not in before or key not in after:
+            return None
+        return after[key] - before[key]
+
+    rss_kb = delta("Rss")
+    anon_kb = delta("Anonymous")
+    return {
+        "rows": int(df_val.shape[0]),
+        "first_ms": round(first * 1000, 3),
+        "best_ms": round(best * 1000, 3),
+        "rss_kb": rss_kb,
+        "anon_kb": anon_kb,
+        "file_kb": None if rss_kb is None or anon_kb is None else rss_kb - anon_kb,
+        "pss_kb": delta("Pss"),
+    }
+
+def write_outputs(workbook_path, out_dir):
+    # The six outputs and their IPC twins, as the build writes them
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with WorkbookSession(workbook_path) as session:
+        for out_path in ALL_OUT_PATHS:
+            df_val = OUTPUT_BUILDERS[out_path](session)
+            write_typed_parquet(df_val, out_dir / out_path, ipc_path=out_dir / ipc_name(out_path))
+    return out_dir
+
+def run(out_dir, repeat=3):
+    rows = []
+    for out_path in ALL_OUT_PATHS:
+        for kind, path_val in (("parquet", Path(out_dir) / out_path), ("ipc", Path(out_dir) / ipc_name(out_path))):
+            if not path_val.exists():
+                continue
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_output_load", "--child", kind, str(path_val), "--repeat", str(repeat)],
+                cwd=str(ROOT_DIR),
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            result.update({"output": out_path, "format": kind, "disk_kb": round(path_val.stat().st_size / 1024, 1)})
+            rows.append(result)
+    columns = ["output", "format", "rows", "disk_kb", "first_ms", "best_ms", "rss_kb", "anon_kb", "file_kb", "pss_kb"]
+    return pd.DataFrame(rows, columns=columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--path", default=None, help="Build the outputs from an existing workbook")
+    parser.add_argument("--outputs", default=None, help="Benchmark an existing output directory instead of building one")
+    parser.add_argument("--out", default=None, help="Write results JSON here")
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(args.child[0], args.child[1], args.repeat)))
+        return 0
+
+    if args.outputs:
+        out_dir = Path(args.outputs)
+    else:
+        if args.path:
+            workbook_path = Path(args.path)
+        else:
+            params = {"rows": args.rows, "cols": args.cols, "seed": args.seed}
+            name_val = "bench_output_load_" + "_".join(str(v) for v in params.values()) + ".xlsx"
+            workbook_path = Path(tempfile.gettempdir()) / name_val
+            if not workbook_path.exists():
+                print("Writing " + str(workbook_path))
+                write_pivot_workbook(workbook_path, **params)
+        out_dir = write_outputs(workbook_path, tempfile.mkdtemp(prefix="bench_output_load_"))
+        print("Outputs in " + str(out_dir))
+
+    report_df = run(out_dir, repeat=args.repeat)
+    if args.out:
+        Path(args.out).write_text(json.dumps({"outputs": str(out_dir), "created_at": time.time(), "results": report_df.to_dict("records")}, indent=2))
+        print("Wrote " + str(args.out))
+    print(report_df.to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
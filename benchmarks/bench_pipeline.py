@@ -0,0 +1,229 @@
+"""
+Times each stage of the sync/clean/build pipeline on a synthetic workbook and writes the
+results as JSON, optionally compared against a saved baseline.
+
+Per stage: seconds, py_heap_peak_mb (tracemalloc: Python and numpy allocations) and
+arrow_peak_mb (Arrow's allocator, which tracemalloc does not see: pandas 3 str columns and
+most of the parquet write). arrow_peak_mb is the highest pyarrow.total_allocated_bytes()
+above the stage's starting level, sampled every millisecond, so a spike shorter than that
+can be missed.
+
+    python -m benchmarks.bench_pipeline --rows 20000 --cols 8 --out bench.json
+    python -m benchmarks.bench_pipeline --rows 20000 --cols 8 --baseline bench.json
+"""
+from pathlib import Path
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.synth_workbook import write_pivot_workbook
+from data_build import OUTPUT_BUILDERS, OUTPUT_SHEETS, _detect_header_row
+from data_loader import DEFAULT_SHEET_WHITELIST, clean_pivot_export_sheet
+from data_sync import _enforce_contract, _looks_like_xlsx
+from parquet_schema import typed_frame, write_typed_parquet
+from workbook_session import WorkbookSession
+
+ARROW_SAMPLE_SECONDS = 0.001
+
+class _ArrowPeak:
+    # Samples pa.total_allocated_bytes() on a thread while the block runs
+    def __enter__(self):
+        self.start = pa.total_allocated_bytes()
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(ARROW_SAMPLE_SECONDS):
+            self.peak = max(self.peak, pa.total_allocated_bytes())
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, pa.total_allocated_bytes())
+        return False
+
+    @property
+    def peak_mb(self):
+        return (self.peak - self.start) / (1024 * 1024)
+
+def _measure(fn, repeat, trace_memory):
+    """
+    Best-of-repeat wall time, then one extra traced call for the peak allocations:
+    (seconds, py_heap_peak_mb, arrow_peak_mb, result).
+    """
+    best = None
+    result = None
+    for _ in range(max(1, int(repeat))):
+        # So a full collection of earlier stages' garbage is not timed as this stage
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    py_peak_mb = None
+    arrow_peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            with _ArrowPeak() as arrow_peak:
+                fn()
+            py_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            arrow_peak_mb = arrow_peak.peak_mb
+        finally:
+            tracemalloc.stop()
+    return best, py_peak_mb, arrow_peak_mb, result
+
+def _parse_sheet(path_val, sheet_name):
+    with WorkbookSession(path_val) as session:
+        return session.preview(sheet_name, nrows=1)
+
+def _warm_session(path_val, sheets):
+    # A session with every sheet already parsed, so later stages time only their own work
+    session = WorkbookSession(path_val)
+    for sheet_name in sheets:
+        session.preview(sheet_name, nrows=1)
+    return session
+
+def run_stages(path_val, repeat=1, trace_memory=True, out_dir=None):
+    path_val = Path(path_val)
+    if out_dir is None:
+        out_dir = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    stages = []
+
+    def add(stage, target, fn):
+        seconds, py_peak_mb, arrow_peak_mb, result = _measure(fn, repeat, trace_memory)
+        stages.append(
+            {
+                "stage": stage,
+                "target": target,
+                "seconds": round(seconds, 6),
+                "py_heap_peak_mb": None if py_peak_mb is None else round(py_peak_mb, 3),
+                "arrow_peak_mb": None if arrow_peak_mb is None else round(arrow_peak_mb, 3),
+            }
+        )
+        return result
+
+    add("looks_like_xlsx", "workbook", lambda: _looks_like_xlsx(path_val))
+    add("enforce_contract", "workbook", lambda: _enforce_contract(path_val, url_val="bench"))
+
+    for sheet_name in DEFAULT_SHEET_WHITELIST:
+        add("parse_sheet", sheet_name, lambda: _parse_sheet(path_val, sheet_name))
+
+    session = _warm_session(path_val, DEFAULT_SHEET_WHITELIST)
+    try:
+        for sheet_name in DEFAULT_SHEET_WHITELIST:
+            add("detect_header_row", sheet_name, lambda: _detect_header_row(session, sheet_name))
+        for sheet_name in DEFAULT_SHEET_WHITELIST:
+            add("clean_pivot_export_sheet", sheet_name, lambda: clean_pivot_export_sheet(session, sheet_name))
+
+        built = {}
+        for out_path, build_fn in OUTPUT_BUILDERS.items():
+            target = build_fn.__name__ + " (" + ", ".join(OUTPUT_SHEETS[out_path]) + ")"
+            built[out_path] = add("build", target, lambda: build_fn(session))
+    finally:
+        session.close()
+
+    for out_path, df_val in built.items():
+        add("typed_frame", out_path, lambda: typed_frame(df_val))
+        dest = Path(out_dir) / out_path
+        add("parquet_write", out_path, lambda: write_typed_parquet(df_val, dest))
+
+    return stages
+
+def compare(stages, baseline, threshold=1.25, min_seconds=0.01):
+    """
+    Joins current stages with a baseline on (stage, target). A stage is flagged when it is
+    more than `threshold` times slower and takes at least min_seconds (sub-10ms stages are
+    mostly timer noise).
+    """
+    cur_df = pd.DataFrame(stages)
+    # Baselines from before the Arrow column have the tracemalloc peak as "peak_mb"
+    base_df = pd.DataFrame(baseline["stages"]).rename(columns={"peak_mb": "py_heap_peak_mb"})
+    base_df = base_df.reindex(columns=["stage", "target", "seconds", "py_heap_peak_mb", "arrow_peak_mb"])
+    out_df = cur_df.merge(base_df, on=["stage", "target"], how="left", suffixes=("", "_baseline"))
+    out_df["ratio"] = (out_df["seconds"] / out_df["seconds_baseline"]).round(3)
+    out_df["regressed"] = (out_df["ratio"] > float(threshold)) & (out_df["seconds"] >= float(min_seconds))
+    return out_df
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--header-offset", type=int, default=3)
+    parser.add_argument("--total-every", type=int, default=25)
+    parser.add_argument("--cardinality", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory pass (tracemalloc and Arrow)")
+    parser.add_argument("--path", default=None, help="Benchmark an existing workbook instead of generating one")
+    parser.add_argument("--out", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="Ignore regressions in stages faster than this")
+    args = parser.parse_args(argv)
+
+    params = {
+        "rows": args.rows,
+        "cols": args.cols,
+        "header_offset": args.header_offset,
+        "total_every": args.total_every,
+        "cardinality": args.cardinality,
+        "seed": args.seed,
+    }
+    if args.path:
+        path_val = Path(args.path)
+        params = {"path": str(path_val)}
+    else:
+        name_val = "bench_pipeline_" + "_".join(str(v) for v in params.values()) + ".xlsx"
+        path_val = Path(tempfile.gettempdir()) / name_val
+        if not path_val.exists():
+            print("Writing " + str(path_val))
+            write_pivot_workbook(path_val, **params)
+
+    stages = run_stages(path_val, repeat=args.repeat, trace_memory=not args.no_memory)
+    results = {
+        "params": params,
+        "workbook_bytes": path_val.stat().st_size,
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "repeat": args.repeat,
+        "stages": stages,
+    }
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print("Wrote " + str(args.out))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("params") != params:
+            print("Note: baseline was run with different parameters: " + str(baseline.get("params")))
+        cmp_df = compare(stages, baseline, threshold=args.threshold, min_seconds=args.min_seconds)
+        print(cmp_df.to_string(index=False))
+        n_regressed = int(cmp_df["regressed"].sum())
+        print(str(n_regressed) + " stage(s) slower than " + str(args.threshold) + "x baseline")
+        return 1 if n_regressed > 0 else 0
+
+    print(pd.DataFrame(stages).to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
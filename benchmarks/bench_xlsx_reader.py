@@ -0,0 +1,96 @@
+"""
+Compares the openpyxl path with the streaming xlsx_reader on a large synthetic
+pivot-export workbook.
+
+    python -m benchmarks.bench_xlsx_reader --rows 200000 --cols 12
+"""
+from pathlib import Path
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from workbook_session import WorkbookSession
+from xlsx_reader import XlsxReader
+
+def write_synthetic_workbook(path_val, rows=200_000, cols=12, seed=0):
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    divisions = ["Digital", "Screen Print", "Wallcovering", "Fabric", "Grass"]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append(["Synthetic pivot export"])
+    ws.append([])
+    ws.append(["Division", "Order", "Created"] + ["Measure " + str(i) for i in range(cols - 3)])
+    start_date = datetime.datetime(2024, 1, 1)
+    for i in range(rows):
+        div = divisions[i % len(divisions)]
+        label = div + " Total" if i % 50 == 49 else div
+        ws.append(
+            [label, "F%07d" % i, start_date + datetime.timedelta(days=i % 700)]
+            + [rnd.randint(0, 10_000) if j % 2 == 0 else rnd.random() * 1000 for j in range(cols - 3)]
+        )
+    wb.save(str(path_val))
+    return Path(path_val)
+
+def _time_call(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(path_val, repeat=1):
+    cases = {
+        "pd.read_excel (openpyxl)": lambda: pd.read_excel(path_val, sheet_name="Data", header=None),
+        "WorkbookSession openpyxl": lambda: WorkbookSession(path_val, backend="openpyxl").read_sheet("Data", header=None),
+        "WorkbookSession stream": lambda: WorkbookSession(path_val, backend="stream").read_sheet("Data", header=None),
+        "header scan pd.read_excel nrows=30": lambda: pd.read_excel(path_val, sheet_name="Data", header=None, nrows=30),
+        "header scan XlsxReader max_rows=30": lambda: XlsxReader(path_val).read_rows("Data", max_rows=30),
+    }
+
+    rows = []
+    reference = None
+    for name, fn in cases.items():
+        seconds, result = _time_call(fn, repeat)
+        if isinstance(result, pd.DataFrame) and result.shape[0] > 30:
+            if reference is None:
+                reference = result
+            else:
+                pd.testing.assert_frame_equal(reference, result)
+        rows.append({"case": name, "seconds": round(seconds, 4)})
+    return pd.DataFrame(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--path", default=None, help="Reuse an existing workbook with a 'Data' sheet")
+    args = parser.parse_args(argv)
+
+    if args.path:
+        path_val = Path(args.path)
+    else:
+        path_val = Path(tempfile.gettempdir()) / ("bench_xlsx_" + str(args.rows) + "x" + str(args.cols) + ".xlsx")
+        if not path_val.exists():
+            print("Writing " + str(path_val))
+            write_synthetic_workbook(path_val, rows=args.rows, cols=args.cols)
+
+    print("Workbook " + str(path_val) + " (" + str(round(path_val.stat().st_size / (1024 * 1024), 1)) + " MB)")
+    print(run(path_val, repeat=args.repeat).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
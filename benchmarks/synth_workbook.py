@@ -0,0 +1,141 @@
+"""
+Synthetic pivot-export workbooks with the seven sheets of DEFAULT_SHEET_WHITELIST, shaped
+so every Data-page builder and the sheet contract accept them.
+
+    python -m benchmarks.synth_workbook out.xlsx --rows 50000 --cols 8 --header-offset 3 \
+        --total-every 25 --cardinality 40
+"""
+from pathlib import Path
+import argparse
+import datetime
+import random
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data_loader import DEFAULT_SHEET_WHITELIST
+
+# Metric header pairs the YTD vs LY builder looks for, one block per Divisions column
+LY_BLOCK_HEADERS = [
+    ("2024 Income Written", "2025 Income Written"),
+    ("2024 Income Produced", "2025 Income Produced"),
+    ("2024 Net Income Invoiced", "2025 Net Income Invoiced"),
+]
+
+def _labels(prefix, cardinality):
+    return [prefix + " " + str(i + 1).zfill(3) for i in range(max(1, int(cardinality)))]
+
+def _preamble(ws, title, header_offset):
+    # header_offset rows above the header: a title, then filter / blank lines like a pivot export
+    for i in range(int(header_offset)):
+        if i == 0:
+            ws.append([title + " report"])
+        elif i % 2 == 1:
+            ws.append([])
+        else:
+            ws.append(["Filter " + str(i), "(All)"])
+
+def _write_pivot_sheet(ws, rnd, label_header, labels, rows, cols, header_offset, total_every, extra_cols=None):
+    _preamble(ws, ws.title, header_offset)
+    extra_cols = extra_cols or []
+    ws.append([label_header] + ["Measure " + str(j + 1) for j in range(cols)] + [name for name, _ in extra_cols])
+    for i in range(rows):
+        label = labels[i % len(labels)]
+        if total_every and i % total_every == total_every - 1:
+            label = label + " Total"
+        measures = [rnd.randint(0, 10_000) if j % 2 == 0 else round(rnd.random() * 1000, 2) for j in range(cols)]
+        ws.append([label] + measures + [fn(i) for _, fn in extra_cols])
+    ws.append(["Grand Total"] + [rnd.randint(0, 10_000_000) for _ in range(cols)])
+
+def _write_ytd_vs_ly(ws, rnd, labels, header_offset):
+    # Three side-by-side Divisions blocks; every division gets a couple of detail rows and a Total row
+    _preamble(ws, ws.title, header_offset)
+    header = []
+    for ly_col, ty_col in LY_BLOCK_HEADERS:
+        header += ["Divisions", ly_col, ty_col, None]
+    ws.append(header[:-1])
+    for label in labels + ["Digital", "Screen Print", "Design Services"]:
+        for sub in ("A", "B", "Total"):
+            row = []
+            for _ in LY_BLOCK_HEADERS:
+                row += [label + " " + sub, rnd.randint(1_000, 90_000), rnd.randint(1_000, 90_000), None]
+            ws.append(row[:-1])
+    row = []
+    for _ in LY_BLOCK_HEADERS:
+        row += ["Grand Total", rnd.randint(1_000_000, 9_000_000), rnd.randint(1_000_000, 9_000_000), None]
+    ws.append(row[:-1])
+
+def write_pivot_workbook(
+    path_val,
+    rows=1_000,
+    cols=6,
+    header_offset=3,
+    total_every=25,
+    cardinality=5,
+    seed=0,
+):
+    """
+    rows / cols: body rows and measure columns of each pivot sheet (YTD vs LY and
+    YTD Plan vs Act stay small, like the real exports).
+    header_offset: rows above the header row (title, blanks, filter lines).
+    total_every: every N-th body row is a "<label> Total" subtotal row (0 disables).
+    cardinality: distinct labels in the label column.
+    """
+    from openpyxl import Workbook
+
+    rnd = random.Random(seed)
+    labels = _labels("Division", cardinality)
+    start_date = datetime.datetime(2024, 1, 1)
+    wb = Workbook(write_only=True)
+
+    for sheet_name in DEFAULT_SHEET_WHITELIST:
+        ws = wb.create_sheet(sheet_name)
+        if sheet_name == "YTD vs LY":
+            _write_ytd_vs_ly(ws, rnd, labels, header_offset)
+        elif sheet_name == "YTD Plan vs Act":
+            _write_pivot_sheet(ws, rnd, "Division", labels, min(rows, max(len(labels), 12)), cols, header_offset, 0)
+        elif sheet_name == "Written and Produced by Week":
+            _write_pivot_sheet(
+                ws, rnd, "Weeks", [str(w) for w in range(1, 53)], rows, cols, header_offset, total_every,
+                extra_cols=[("Week start", lambda i: start_date + datetime.timedelta(days=7 * (i % 52)))],
+            )
+        elif sheet_name == "WIP":
+            _write_pivot_sheet(
+                ws, rnd, "Status", labels, rows, cols, header_offset, total_every,
+                extra_cols=[
+                    ("Order", lambda i: "F" + str(i).zfill(7)),
+                    ("Created", lambda i: start_date + datetime.timedelta(days=i % 700)),
+                ],
+            )
+        else:
+            _write_pivot_sheet(ws, rnd, "Division", labels, rows, cols, header_offset, total_every)
+
+    wb.save(str(path_val))
+    return Path(path_val)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--header-offset", type=int, default=3)
+    parser.add_argument("--total-every", type=int, default=25)
+    parser.add_argument("--cardinality", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path_val = write_pivot_workbook(
+        args.path,
+        rows=args.rows,
+        cols=args.cols,
+        header_offset=args.header_offset,
+        total_every=args.total_every,
+        cardinality=args.cardinality,
+        seed=args.seed,
+    )
+    print("Wrote " + str(path_val) + " (" + str(round(path_val.stat().st_size / (1024 * 1024), 2)) + " MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import time
+
+from xlsx_reader import sheet_input_fingerprints
+
+MANIFEST_PATH = "build_manifest.json"
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# (path, mtime_ns, size) -> sha256, so status checks on every rerun don't re-read an unchanged file
+_sha_memo = {}
+
+def file_sha256(path_val):
+    path_obj = Path(path_val)
+    stat_val = path_obj.stat()
+    memo_key = (str(path_obj.resolve()), stat_val.st_mtime_ns, stat_val.st_size)
+    if memo_key in _sha_memo:
+        return _sha_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path_obj, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    sha_val = digest.hexdigest()
+    _sha_memo[memo_key] = sha_val
+    return sha_val
+
+def read_manifest(manifest_path=MANIFEST_PATH):
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except Exception:
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    return manifest
+
+def write_manifest(manifest, manifest_path=MANIFEST_PATH):
+    manifest_path = Path(manifest_path)
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, manifest_path)
+
+def make_manifest(workbook_sha, builder_version, outputs, inputs_by_output, previous=None, output_dir="."):
+    """
+    outputs: {out_path: df} as written by this build into output_dir. Records row counts,
+    the sha256 of each file on disk (so a deleted or hand-edited output makes it stale
+    again) and the per-part CRC32 fingerprints of the workbook parts the output was built
+    from. Entries of outputs reused from the previous build are carried over unchanged.
+    """
+    out_entries = {}
+    if previous is not None and previous.get("builder_version") == builder_version:
+        out_entries.update(previous.get("outputs", {}))
+
+    for out_path, df_val in outputs.items():
+        out_entries[str(out_path)] = {
+            "rows": int(df_val.shape[0]),
+            "sha256": file_sha256(Path(output_dir) / out_path),
+            "inputs": inputs_by_output.get(str(out_path)),
+        }
+    return {
+        "workbook_sha256": workbook_sha,
+        "builder_version": builder_version,
+        "built_at": time.time(),
+        "outputs": out_entries,
+    }
+
+def output_inputs(workbook_path, output_sheets):
+    """
+    output_sheets: {out_path: [sheet names it is built from]}.
+    Returns {out_path: {input part: fingerprint}}, the union over the output's sheets.
+    A sheet missing from the workbook shows up as "sheet:<name>" with no fingerprint.
+    """
+    sheet_list = []
+    for sheets in output_sheets.values():
+        for sheet_name in sheets:
+            if sheet_name not in sheet_list:
+                sheet_list.append(sheet_name)
+    by_sheet = sheet_input_fingerprints(workbook_path, sheet_list)
+
+    out = {}
+    for out_path, sheets in output_sheets.items():
+        inputs = {}
+        for sheet_name in sheets:
+            sheet_inputs = by_sheet.get(sheet_name)
+            if sheet_inputs is None:
+                inputs["sheet:" + str(sheet_name)] = None
+            else:
+                inputs.update(sheet_inputs)
+        out[str(out_path)] = inputs
+    return out
+
+def _changed_inputs(old_inputs, new_inputs):
+    reasons = []
+    for key in sorted(set(old_inputs) | set(new_inputs)):
+        if old_inputs.get(key) == new_inputs.get(key):
+            continue
+        if key.startswith("sheet:") and new_inputs.get(key) is None:
+            reasons.append("sheet '" + key[len("sheet:"):] + "' not in workbook")
+        else:
+            reasons.append(key + " changed")
+    return reasons
+
+def manifest_status(workbook_path, output_sheets, builder_version, output_dir="."):
+    """
+    Compares the manifest in output_dir with the workbook parts and the outputs next to it.
+    output_dir=None (nothing built yet) reads as no manifest.
+
+    Freshness is decided per output from the CRC32 + size fingerprints of the zip parts it
+    reads (xlsx_reader.sheet_input_fingerprints), not from the whole file, so a workbook
+    that was re-saved or had an unrelated sheet edited does not force a rebuild. CRC32 is
+    a change detector, not a cryptographic hash. same_workbook says whether the workbook's
+    full-file sha256 also matches the one the manifest recorded.
+
+    Returns {"fresh", "same_workbook", "reasons", "stale_outputs", "inputs",
+    "workbook_sha256", "manifest"}: stale_outputs maps each output that needs a rebuild to
+    its reasons, inputs holds the current input fingerprints per output (what the next
+    build should record).
+    """
+    workbook_sha = file_sha256(workbook_path)
+    manifest = None if output_dir is None else read_manifest(Path(output_dir) / MANIFEST_PATH)
+
+    global_reasons = []
+    try:
+        inputs = output_inputs(workbook_path, output_sheets)
+    except Exception as e:
+        inputs = {str(p): None for p in output_sheets}
+        global_reasons.append("workbook parts unreadable (" + str(e) + ")")
+
+    if manifest is None:
+        global_reasons.append("no build manifest")
+    elif manifest.get("builder_version") != builder_version:
+        global_reasons.append(
+            "builder version changed ("
+            + str(manifest.get("builder_version"))
+            + " -> "
+            + str(builder_version)
+            + ")"
+        )
+
+    stale_outputs = {}
+    reasons = list(global_reasons)
+    recorded = {} if manifest is None else manifest.get("outputs", {})
+    for out_path in output_sheets:
+        if global_reasons:
+            stale_outputs[str(out_path)] = list(global_reasons)
+            continue
+
+        out_reasons = []
+        entry = recorded.get(str(out_path))
+        if entry is None:
+            out_reasons.append("not in manifest")
+        elif not (Path(output_dir) / out_path).exists():
+            out_reasons.append("missing")
+        elif file_sha256(Path(output_dir) / out_path) != entry.get("sha256"):
+            out_reasons.append("changed on disk")
+        elif entry.get("inputs") is None:
+            out_reasons.append("no input hashes recorded")
+        else:
+            out_reasons.extend(_changed_inputs(entry["inputs"], inputs[str(out_path)]))
+
+        if out_reasons:
+            stale_outputs[str(out_path)] = out_reasons
+            reasons.append(str(out_path) + ": " + ", ".join(out_reasons))
+
+    return {
+        "fresh": len(stale_outputs) == 0,
+        "same_workbook": manifest is not None and manifest.get("workbook_sha256") == workbook_sha,
+        "reasons": reasons,
+        "stale_outputs": stale_outputs,
+        "inputs": inputs,
+        "workbook_sha256": workbook_sha,
+        "manifest": manifest,
+    }
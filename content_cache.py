@@ -0,0 +1,170 @@
+"""
+Process-wide cache keyed by content instead of by path.
+
+data/current.xlsx and the parquets are replaced in place, so a cache keyed on the path
+can serve a frame from the previous file, and one keyed on (path, mtime) keeps every old
+version until it happens to be pushed out. Entries here are keyed by
+(namespace, content hash, params): the same bytes always hit, new bytes always miss.
+
+The cache holds at most max_bytes (deep memory of the cached frames) and evicts the least
+recently used entries beyond that. Stale versions are also dropped explicitly:
+- an entry may name an owner (such as the file path); storing a new content hash for that
+  owner drops the entries of its older hashes
+- entries tagged with a workbook generation are dropped by set_generation() once the
+  refresh worker publishes a newer one
+
+Values are shared between callers and threads; treat them as read-only (hand out shallow
+copies of frames, as table_store does).
+"""
+from collections import OrderedDict
+import os
+import threading
+import time
+
+import pandas as pd
+
+DEFAULT_MAX_MB = 512
+
+def _budget_from_env():
+    try:
+        return int(float(os.environ.get("CONTENT_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_MAX_MB * 1024 * 1024
+
+def sizeof_value(value):
+    """Approximate deep size in bytes of frames and of tuples / lists / dicts holding them."""
+    if isinstance(value, pd.DataFrame):
+        try:
+            return int(value.memory_usage(index=True, deep=True).sum())
+        except Exception:
+            return 0
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sum(sizeof_value(v) for v in value.values()) + 64 * len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof_value(v) for v in value) + 8 * len(value)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 64
+
+class ContentCache:
+    """Thread-safe LRU of computed values under a byte budget, with hit / miss / eviction counters."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = _budget_from_env() if max_bytes is None else int(max_bytes)
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._generation = None
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "oversize": 0}
+
+    def get_or_compute(self, namespace, content_hash, params, compute_fn, owner=None, generation=None, sizeof=sizeof_value):
+        """
+        Cached value for (namespace, content_hash, params), computing it with compute_fn() on
+        a miss. Concurrent misses on the same key may both compute; the last one is kept.
+        """
+        key = (namespace, content_hash, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                entry["hits"] += 1
+                return entry["value"]
+            self._counters["misses"] += 1
+
+        value = compute_fn()
+        self.put(key, value, owner=owner, generation=generation, nbytes=sizeof(value))
+        return value
+
+    def put(self, key, value, owner=None, generation=None, nbytes=None):
+        nbytes = sizeof_value(value) if nbytes is None else int(nbytes)
+        with self._lock:
+            if owner is not None:
+                # A new version of this owner's content makes the older versions unreachable
+                stale = [k for k, e in self._entries.items() if e["owner"] == owner and k[1] != key[1]]
+                self._drop(stale, "invalidations")
+            if nbytes > self.max_bytes:
+                self._counters["oversize"] += 1
+                return
+
+            self._drop([key], None)
+            self._entries[key] = {
+                "value": value,
+                "nbytes": nbytes,
+                "owner": owner,
+                "generation": generation,
+                "stored_at": time.time(),
+                "hits": 0,
+            }
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes and len(self._entries) > 0:
+                oldest_key = next(iter(self._entries))
+                self._drop([oldest_key], "evictions")
+
+    def _drop(self, keys, counter):
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                continue
+            self._nbytes -= entry["nbytes"]
+            if counter is not None:
+                self._counters[counter] += 1
+
+    def set_generation(self, generation):
+        """Makes generation current and drops every entry tagged with another generation."""
+        with self._lock:
+            self._generation = generation
+            stale = [k for k, e in self._entries.items() if e["generation"] is not None and e["generation"] != generation]
+            self._drop(stale, "invalidations")
+
+    def clear(self):
+        with self._lock:
+            self._drop(list(self._entries.keys()), "invalidations")
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out.update(
+                {
+                    "entries": len(self._entries),
+                    "mb": round(self._nbytes / (1024 * 1024), 2),
+                    "budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+                    "generation": self._generation,
+                }
+            )
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups > 0 else None
+        return out
+
+    def entries_report(self):
+        # Least recently used first, which is the eviction order
+        with self._lock:
+            rows = [
+                {
+                    "namespace": key[0],
+                    "content": str(key[1])[:16],
+                    "params": str(key[2]),
+                    "owner": None if e["owner"] is None else str(e["owner"]),
+                    "generation": e["generation"],
+                    "kb": round(e["nbytes"] / 1024, 1),
+                    "hits": e["hits"],
+                    "stored_at": pd.to_datetime(e["stored_at"], unit="s"),
+                }
+                for key, e in self._entries.items()
+            ]
+        return pd.DataFrame(
+            rows, columns=["namespace", "content", "params", "owner", "generation", "kb", "hits", "stored_at"]
+        )
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_content_cache():
+    # One per process; a plain module global so the loader also works outside Streamlit
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ContentCache()
+        return _default_cache
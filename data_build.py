@@ -0,0 +1,414 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import functools
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from build_manifest import MANIFEST_PATH, make_manifest, manifest_status, write_manifest
+from data_sync import _enforce_contract
+from kpi_snapshot import kpi_snapshot_is_current, write_kpi_snapshot
+from output_store import (
+    carry_over,
+    current_dir,
+    dataset_name,
+    discard_generation,
+    ipc_name,
+    new_generation,
+    prune_generations,
+    resolve_output,
+    set_current,
+)
+from parquet_schema import write_typed_parquet
+from tracing import span, traced
+from workbook_session import WorkbookSession
+
+# Output names inside an output generation directory (see output_store)
+PLAN_OUT_PATH = "landing_ytd_plan.parquet"
+LY_OUT_PATH = "landing_ytd_vs_ly.parquet"
+TREND_OUT_PATH = "trend_weekly.parquet"
+WIP_OUT_PATH = "wip.parquet"
+COLOR_YARDS_OUT_PATH = "color_yards.parquet"
+YARDS_WASTED_OUT_PATH = "yards_wasted.parquet"
+
+# Derived from LY_OUT_PATH after each build: per-location landing KPIs (see kpi_snapshot)
+KPI_SNAPSHOT_PATH = "landing_kpis.json"
+
+ALL_OUT_PATHS = [
+    PLAN_OUT_PATH,
+    LY_OUT_PATH,
+    TREND_OUT_PATH,
+    WIP_OUT_PATH,
+    COLOR_YARDS_OUT_PATH,
+    YARDS_WASTED_OUT_PATH,
+]
+
+# Dependency graph: the sheets each output is built from. The manifest hashes the zip parts
+# behind these sheets, and only outputs whose parts changed are rebuilt.
+OUTPUT_SHEETS = {
+    PLAN_OUT_PATH: ["YTD Plan vs Act"],
+    LY_OUT_PATH: ["YTD vs LY"],
+    TREND_OUT_PATH: ["Written and Produced by Week"],
+    WIP_OUT_PATH: ["WIP"],
+    COLOR_YARDS_OUT_PATH: ["Color Yards"],
+    YARDS_WASTED_OUT_PATH: ["Yards Wasted"],
+}
+
+# Partition columns of the Hive-style datasets written next to the parquets (see
+# parquet_schema.write_partitioned_dataset and app_data.read_partitioned). A column the
+# output does not have is skipped: the trend only has Year when its sheet has one of
+# TREND_WEEK_DATE_COLUMNS, and is written unpartitioned otherwise. Division partitions are
+# the pivot's row labels, so "Division 005 Total" and "Grand Total" are partitions of
+# their own next to "Division 005".
+OUTPUT_PARTITIONS = {
+    PLAN_OUT_PATH: ["Division"],
+    LY_OUT_PATH: ["Location"],
+    TREND_OUT_PATH: ["Year"],
+    COLOR_YARDS_OUT_PATH: ["Division"],
+    YARDS_WASTED_OUT_PATH: ["Division"],
+}
+
+# Week date column of the trend sheet, first match wins (case-insensitive); Year comes from it
+TREND_WEEK_DATE_COLUMNS = ["Week start", "Week Start Date", "Week Of", "Week Date", "Date"]
+
+# Bump whenever a builder's output changes for the same workbook, so old builds read as stale
+BUILDER_VERSION = 5
+
+EXCLUDE_DIVISIONS = {
+    "design services",
+    "design services total",
+}
+
+def _clean_columns(cols_val):
+    clean_cols = []
+    for c in cols_val:
+        c_str = str(c)
+        c_str = re.sub(r"\s+", " ", c_str).strip()
+        clean_cols.append(c_str)
+    return clean_cols
+
+def _drop_unnamed_and_empty_columns(df_val):
+    cols_str = df_val.columns.astype(str)
+    keep_mask = ~cols_str.str.match(r"^Unnamed")
+    df_val = df_val.loc[:, keep_mask]
+    df_val = df_val.dropna(axis=1, how="all")
+    return df_val
+
+def _score_header_row(row_vals):
+    vals = ["" if pd.isna(x) else str(x).strip() for x in row_vals]
+    non_empty = [v for v in vals if v != ""]
+    if len(non_empty) == 0:
+        return 0
+    unique_count = len(set(non_empty))
+    score = len(non_empty) + unique_count
+    return score
+
+def _detect_header_row(session, sheet_name, max_scan_rows=30):
+    preview_df = session.preview(sheet_name, nrows=int(max_scan_rows))
+    best_idx = 0
+    best_score = -1
+    for idx_val in range(preview_df.shape[0]):
+        score_val = _score_header_row(preview_df.iloc[idx_val].tolist())
+        if score_val > best_score:
+            best_score = score_val
+            best_idx = idx_val
+    return int(best_idx)
+
+def _read_sheet(session, sheet_name, header_row_idx):
+    df_val = session.read_sheet(sheet_name, header=int(header_row_idx))
+    df_val.columns = _clean_columns(df_val.columns)
+    df_val = _drop_unnamed_and_empty_columns(df_val)
+    return df_val
+
+def _write_parquet_safe(df_val, out_path, gen_dir):
+    # Typed columns with an explicit Arrow schema (see parquet_schema), not a blanket string cast.
+    # gen_dir is not published yet, so no reader can see the file while it is written
+    with span("build.write_parquet", output=out_path):
+        dataset_dir = None
+        if out_path in OUTPUT_PARTITIONS:
+            dataset_dir = Path(gen_dir) / dataset_name(out_path)
+        return write_typed_parquet(
+            df_val,
+            Path(gen_dir) / out_path,
+            ipc_path=Path(gen_dir) / ipc_name(out_path),
+            dataset_dir=dataset_dir,
+            partition_cols=OUTPUT_PARTITIONS.get(out_path, ()),
+        )
+
+def _clean_loc(loc_val):
+    if pd.isna(loc_val):
+        return None
+    s_val = str(loc_val).strip()
+    if s_val == "":
+        return None
+    s_val = re.sub(r"\s+", " ", s_val)
+    return s_val
+
+def _is_total_row(loc_val):
+    if pd.isna(loc_val):
+        return False
+    s_val = str(loc_val).strip().lower()
+    return (s_val == "grand total") or s_val.endswith(" total")
+
+def _base_division_name(loc_val):
+    if pd.isna(loc_val):
+        return None
+    s_val = re.sub(r"\s+", " ", str(loc_val).strip())
+    s_low = s_val.lower()
+    if s_low == "grand total":
+        return "Grand Total"
+    if s_low.endswith(" total"):
+        return s_val[:-6].strip()
+    return s_val
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_division_label(label_val):
+    # Location and total flag for one distinct Divisions label; memoized across blocks and builds
+    location = _clean_loc(_base_division_name(label_val))
+    return location, _is_total_row(label_val)
+
+# (LY column, current-year column, output LY name, output current name) per block, in sheet order
+LANDING_VS_LY_BLOCKS = [
+    ("Divisions", "2024 Income Written", "2025 Income Written", "Written LY", "Written Current"),
+    ("Divisions.1", "2024 Income Produced", "2025 Income Produced", "Produced LY", "Produced Current"),
+    ("Divisions.2", "2024 Net Income Invoiced", "2025 Net Income Invoiced", "Invoiced LY", "Invoiced Current"),
+]
+
+def _division_total_rows(div_ser, exclude_set):
+    """
+    Positions and locations of the total rows in one Divisions column.
+    The column is factorized once, so the regex/label work runs per distinct label
+    instead of per row.
+    """
+    codes, uniques = pd.factorize(div_ser, use_na_sentinel=True)
+    n_uniq = len(uniques)
+    uniq_loc = np.empty(n_uniq + 1, dtype=object)
+    uniq_keep = np.zeros(n_uniq + 1, dtype=bool)
+    for u_idx, label_val in enumerate(uniques):
+        location, is_total = _normalize_division_label(label_val)
+        uniq_loc[u_idx] = location
+        uniq_keep[u_idx] = (
+            is_total and location is not None and location.strip().lower() not in exclude_set
+        )
+    # code -1 (missing label) maps to the trailing slot: never kept
+    positions = np.flatnonzero(uniq_keep[codes])
+    return positions, uniq_loc[codes[positions]]
+
+def _build_landing_vs_ly_df(session):
+    sheet_name = "YTD vs LY"
+    header_row_idx = _detect_header_row(session, sheet_name)
+    raw_df = _read_sheet(session, sheet_name, header_row_idx)
+
+    exclude_set = set([x.lower() for x in EXCLUDE_DIVISIONS])
+
+    # Blocks share a Divisions column when the sheet has no Divisions.1 / .2; factorize each column once
+    totals_by_div_col = {}
+    blocks = []
+    for div_col, ly_col, ty_col, out_ly_name, out_ty_name in LANDING_VS_LY_BLOCKS:
+        if div_col not in raw_df.columns:
+            div_col = "Divisions"
+        if div_col not in totals_by_div_col:
+            totals_by_div_col[div_col] = _division_total_rows(raw_df[div_col], exclude_set)
+        positions, locations = totals_by_div_col[div_col]
+
+        # Only the total rows of the two metric columns are ever touched (never Weeks)
+        ly_vals = pd.to_numeric(raw_df[ly_col].iloc[positions], errors="coerce")
+        ty_vals = pd.to_numeric(raw_df[ty_col].iloc[positions], errors="coerce")
+        ly_vals.index = locations
+        ty_vals.index = locations
+        # A location listed twice in a block keeps its first row
+        keep_mask = ~ly_vals.index.duplicated()
+        blocks.append((out_ly_name, ly_vals[keep_mask], out_ty_name, ty_vals[keep_mask]))
+
+    all_locations = pd.Index(
+        np.concatenate([blk[1].index.to_numpy(dtype=object) for blk in blocks]), dtype=object
+    ).unique()
+
+    out_df = pd.DataFrame({"Location": all_locations.astype(str)})
+    for out_ly_name, ly_vals, out_ty_name, ty_vals in blocks:
+        out_df[out_ly_name] = ly_vals.reindex(all_locations).to_numpy()
+        out_df[out_ty_name] = ty_vals.reindex(all_locations).to_numpy()
+
+    out_df["__sort"] = np.where(
+        out_df["Location"].str.strip().str.lower() == "grand total", 9999, 0
+    )
+    out_df = out_df.sort_values(["__sort", "Location"]).drop(columns=["__sort"]).reset_index(drop=True)
+
+    return out_df
+
+# Note: these are intentionally simple "read sheet and write parquet" builders.
+# If you already have more specific logic for these in your existing repo, keep yours.
+def _build_landing_plan_df(session):
+    sheet_name = "YTD Plan vs Act"
+    header_row_idx = _detect_header_row(session, sheet_name)
+    raw_df = _read_sheet(session, sheet_name, header_row_idx)
+    df_val = raw_df.copy().dropna(axis=0, how="all")
+    return df_val.reset_index(drop=True)
+
+def _find_column(df_val, names):
+    by_lower = {str(c).strip().lower(): c for c in df_val.columns}
+    for name in names:
+        if name.lower() in by_lower:
+            return by_lower[name.lower()]
+    return None
+
+def _build_trend_weekly_df(session):
+    sheet_name = "Written and Produced by Week"
+    header_row_idx = _detect_header_row(session, sheet_name)
+    raw_df = _read_sheet(session, sheet_name, header_row_idx)
+    df_val = raw_df.copy().dropna(axis=0, how="all")
+    # Year of each week (the partition key of the trend dataset). Rows without a date, such
+    # as the Grand Total, keep Year <NA> and are left out of the dataset, not the parquet
+    date_col = _find_column(df_val, TREND_WEEK_DATE_COLUMNS)
+    if date_col is not None and "Year" not in df_val.columns:
+        df_val["Year"] = pd.to_datetime(df_val[date_col], errors="coerce").dt.year.astype("Int16")
+    return df_val.reset_index(drop=True)
+
+def _build_wip_df(session):
+    sheet_name = "WIP"
+    header_row_idx = _detect_header_row(session, sheet_name)
+    raw_df = _read_sheet(session, sheet_name, header_row_idx)
+    df_val = raw_df.copy().dropna(axis=0, how="all")
+    return df_val.reset_index(drop=True)
+
+def _build_color_yards_df(session):
+    sheet_name = "Color Yards"
+    header_row_idx = _detect_header_row(session, sheet_name)
+    raw_df = _read_sheet(session, sheet_name, header_row_idx)
+    df_val = raw_df.copy().dropna(axis=0, how="all")
+    return df_val.reset_index(drop=True)
+
+def _build_yards_wasted_df(session):
+    sheet_name = "Yards Wasted"
+    header_row_idx = _detect_header_row(session, sheet_name)
+    raw_df = _read_sheet(session, sheet_name, header_row_idx)
+    df_val = raw_df.copy().dropna(axis=0, how="all")
+    return df_val.reset_index(drop=True)
+
+OUTPUT_BUILDERS = {
+    PLAN_OUT_PATH: _build_landing_plan_df,
+    LY_OUT_PATH: _build_landing_vs_ly_df,
+    TREND_OUT_PATH: _build_trend_weekly_df,
+    WIP_OUT_PATH: _build_wip_df,
+    COLOR_YARDS_OUT_PATH: _build_color_yards_df,
+    YARDS_WASTED_OUT_PATH: _build_yards_wasted_df,
+}
+
+def _derived_names(out_path):
+    # [(file or directory written next to out_path, reason when it is missing)]
+    names = [(ipc_name(out_path), "no IPC file")]
+    if out_path in OUTPUT_PARTITIONS:
+        names.append((dataset_name(out_path), "no partitioned dataset"))
+    return names
+
+def output_status(workbook_path_obj):
+    # manifest_status against the current output generation; a missing IPC twin or dataset also makes an output stale
+    gen_dir = current_dir()
+    status = manifest_status(workbook_path_obj, OUTPUT_SHEETS, BUILDER_VERSION, output_dir=gen_dir)
+    if gen_dir is not None:
+        for out_path in ALL_OUT_PATHS:
+            if out_path in status["stale_outputs"]:
+                continue
+            missing = [reason for name, reason in _derived_names(out_path) if not (gen_dir / name).exists()]
+            if len(missing) > 0:
+                status["stale_outputs"][out_path] = missing
+                status["reasons"].append(out_path + ": " + ", ".join(missing))
+        status["fresh"] = len(status["stale_outputs"]) == 0
+    return status
+
+def _write_generation(gen_dir, frames):
+    # The parquets are independent files; pyarrow encodes and compresses without the GIL
+    workers = max(1, min(len(frames), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parquet-write") as pool:
+        futures = {p: pool.submit(_write_parquet_safe, df_val, p, gen_dir) for p, df_val in frames.items()}
+        return {p: f.result() for p, f in futures.items()}
+
+@traced("build.write_all_parquets")
+def write_all_parquets(workbook_path_obj, out_paths=None, status=None):
+    """
+    Builds out_paths (default: all) into a new output generation, carries the other outputs
+    over from the current one, then publishes it and prunes old generations.
+    Returns {out_path: written df}.
+    """
+    if out_paths is None:
+        out_paths = ALL_OUT_PATHS
+    if status is None:
+        status = output_status(workbook_path_obj)
+
+    # One session for the whole build: the workbook is unzipped once and every
+    # sheet is parsed once, shared by header detection and the body read.
+    built = {}
+    with WorkbookSession(workbook_path_obj) as session:
+        _enforce_contract(workbook_path_obj, url_val="build", sheet_names=session.sheet_names)
+        for out_path in out_paths:
+            with span("build." + OUTPUT_BUILDERS[out_path].__name__, output=out_path):
+                built[out_path] = OUTPUT_BUILDERS[out_path](session)
+
+    prev_dir = current_dir()
+    gen_dir = new_generation()
+    try:
+        with span("build.write_generation", generation=gen_dir.name, outputs=len(built)):
+            built = _write_generation(gen_dir, built)
+            carried = []
+            for out_path in ALL_OUT_PATHS:
+                if out_path not in built and prev_dir is not None:
+                    names = [out_path] + [n for n, _ in _derived_names(out_path)]
+                    carried.extend(n for n in names if (prev_dir / n).exists())
+            if LY_OUT_PATH not in built and prev_dir is not None and (prev_dir / KPI_SNAPSHOT_PATH).exists():
+                carried.append(KPI_SNAPSHOT_PATH)
+            for name in carried:
+                carry_over(name, prev_dir, gen_dir)
+
+        ly_path = gen_dir / LY_OUT_PATH
+        if ly_path.exists() and not kpi_snapshot_is_current(ly_path, gen_dir / KPI_SNAPSHOT_PATH):
+            with span("build.kpi_snapshot"):
+                ly_df = built[LY_OUT_PATH] if LY_OUT_PATH in built else pd.read_parquet(ly_path)
+                write_kpi_snapshot(ly_df, ly_path, gen_dir / KPI_SNAPSHOT_PATH)
+
+        write_manifest(
+            make_manifest(
+                status["workbook_sha256"],
+                BUILDER_VERSION,
+                built,
+                status["inputs"],
+                previous=status["manifest"],
+                output_dir=gen_dir,
+            ),
+            gen_dir / MANIFEST_PATH,
+        )
+    except BaseException:
+        discard_generation(gen_dir)
+        raise
+
+    set_current(gen_dir.name)
+    prune_generations()
+    return built
+
+@traced("build.build_parquets_if_stale")
+def build_parquets_if_stale(workbook_path_obj, force=False, return_frames=True):
+    """
+    Rebuilds only the outputs whose input parts changed (all of them with force=True), as
+    a new output generation. Returns (output frames in ALL_OUT_PATHS order, rebuilt paths,
+    reused paths); with return_frames=False the reused parquets are not read back and
+    frames is None.
+    """
+    with span("build.manifest_status"):
+        status = output_status(workbook_path_obj)
+    if force:
+        to_build = list(ALL_OUT_PATHS)
+    else:
+        to_build = [p for p in ALL_OUT_PATHS if p in status["stale_outputs"]]
+
+    built = {}
+    gen_dir = current_dir()
+    snapshot_stale = gen_dir is not None and not kpi_snapshot_is_current(gen_dir / LY_OUT_PATH, gen_dir / KPI_SNAPSHOT_PATH)
+    if len(to_build) > 0 or snapshot_stale:
+        # A deleted or outdated snapshot alone also gets a new generation, derived from the reused parquet
+        built = write_all_parquets(workbook_path_obj, out_paths=to_build, status=status)
+
+    reused = [p for p in ALL_OUT_PATHS if p not in built]
+    if not return_frames:
+        return None, to_build, reused
+    frames = tuple(built[p] if p in built else pd.read_parquet(resolve_output(p)) for p in ALL_OUT_PATHS)
+    return frames, to_build, reused
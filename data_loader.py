@@ -1,6 +1,16 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+import os
+import time
+import numpy as np
 import pandas as pd
 
+from build_manifest import file_sha256
+from content_cache import get_content_cache
+from sheet_cache import get_sheet_disk_cache, sheet_cache_keys
+from tracing import span, traced
+from workbook_session import WorkbookSession, DEFAULT_BACKEND
+
 # Make this module importable even in non-Streamlit contexts (tests, notebooks)
 try:
     import streamlit as st
@@ -55,10 +65,35 @@ def _normalize_sheet_name(name_val):
         return SHEET_ALIASES[name_str]
     return name_str
 
-def _row_text_count(row_vals):
-    ser = row_vals.astype(str).str.strip()
-    ser = ser.replace("", "")
-    return int(ser.ne("").sum())
+def _factorized_flags(col, flag_fn):
+    # Evaluates flag_fn once per distinct value and broadcasts back to the rows.
+    # Missing values (NaN/None) get False, which is what every caller wants.
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    flags = np.fromiter((flag_fn(u) for u in uniques), dtype=bool, count=len(uniques))
+    return np.append(flags, False)[codes]
+
+def _is_blank_text(val):
+    return isinstance(val, str) and val.strip() == ""
+
+def _has_total_text(val):
+    return "total" in str(val).strip().lower()
+
+def _blank_cell_mask(df_raw):
+    """
+    2D bool array, True where a cell counts as empty for header detection and
+    empty-row/column pruning, i.e. str(cell).strip() == "".
+
+    Only string cells can be blank that way (NaN reads as "nan"), so numeric, bool and
+    datetime columns are skipped outright and text columns are decided per distinct value.
+    """
+    n_rows, n_cols = df_raw.shape
+    blank = np.zeros((n_rows, n_cols), dtype=bool)
+    for j in range(n_cols):
+        col = df_raw.iloc[:, j]
+        if getattr(col.dtype, "kind", "O") in "biufcmM":
+            continue
+        blank[:, j] = _factorized_flags(col, _is_blank_text)
+    return blank
 
 def _drop_excel_junk_columns(df_in):
     if df_in is None or not hasattr(df_in, "columns"):
@@ -86,6 +121,7 @@ def _remove_pivot_totals(df_in):
 
     df = df_in.copy()
 
+    # Duplicate column names come back as a DataFrame (no .dtype) and are skipped
     obj_cols = []
     for c in df.columns:
         try:
@@ -97,36 +133,46 @@ def _remove_pivot_totals(df_in):
     if len(obj_cols) == 0:
         return df
 
-    mask_total = pd.Series(False, index=df.index)
+    # "grand total" contains "total", so one substring test per distinct value covers both
+    mask_total = np.zeros(df.shape[0], dtype=bool)
     for c in obj_cols:
-        col_ser = df[c].astype(str).str.strip().str.lower()
-        mask_total = mask_total | col_ser.str.contains("grand total", na=False)
-        mask_total = mask_total | col_ser.str.contains("total", na=False)
+        mask_total |= _factorized_flags(df[c], _has_total_text)
 
     return df.loc[~mask_total].copy()
 
+def _read_raw_sheet(xl_obj, sheet_name):
+    # xl_obj can be a WorkbookSession (either backend) or anything pd.read_excel accepts
+    if isinstance(xl_obj, WorkbookSession):
+        return xl_obj.read_sheet(sheet_name, header=None)
+    return pd.read_excel(xl_obj, sheet_name=sheet_name, header=None)
+
 def clean_pivot_export_sheet(xl_obj, sheet_name, min_text_cells=4, remove_totals=True):
     # Reads an Excel pivot-export-like sheet where the header row isn't guaranteed to be row 1
-    df_raw = pd.read_excel(xl_obj, sheet_name=sheet_name, header=None)
-
-    row_text_counts = df_raw.apply(lambda r: _row_text_count(r), axis=1)
+    with span("load.clean_pivot_export_sheet", sheet=sheet_name) as sp:
+        df_raw = _read_raw_sheet(xl_obj, sheet_name)
+        df_clean = clean_pivot_export_frame(df_raw, min_text_cells=min_text_cells, remove_totals=remove_totals)
+        sp.set(rows=int(df_clean.shape[0]))
+        return df_clean
+
+def clean_pivot_export_frame(df_raw, min_text_cells=4, remove_totals=True):
+    # Cleans a raw header=None sheet frame. The blank-cell mask is computed once for the
+    # whole block; header detection and empty row/column pruning are array reductions on it.
+    nonblank = ~_blank_cell_mask(df_raw)
+    row_text_counts = pd.Series(nonblank.sum(axis=1), index=df_raw.index)
 
     # Find first row that looks like a header row
     header_row_idx = int((row_text_counts >= min_text_cells).idxmax())
 
     new_cols = [str(x).strip() for x in df_raw.iloc[header_row_idx].tolist()]
-    df_clean = df_raw.iloc[header_row_idx + 1 :].copy()
-    df_clean.columns = new_cols
 
-    # Drop fully empty rows
-    nonempty_row_mask = df_clean.apply(lambda r: _row_text_count(r) > 0, axis=1)
-    df_clean = df_clean.loc[nonempty_row_mask].reset_index(drop=True)
+    # Drop fully empty rows, then fully empty cols (judged on the surviving rows)
+    body_nonblank = nonblank[header_row_idx + 1 :]
+    keep_rows = np.flatnonzero(body_nonblank.any(axis=1))
+    keep_cols = np.flatnonzero(body_nonblank[keep_rows].any(axis=0))
 
-    # Drop fully empty cols
-    nonempty_col_mask = df_clean.apply(
-        lambda c: c.astype(str).str.strip().replace("", "").ne("").any(), axis=0
-    )
-    df_clean = df_clean.loc[:, nonempty_col_mask].copy()
+    df_clean = df_raw.iloc[header_row_idx + 1 + keep_rows, keep_cols].copy()
+    df_clean.columns = pd.Index(new_cols)[keep_cols]
+    df_clean = df_clean.reset_index(drop=True)
 
     # Drop Excel spillover columns like .1 / Unnamed
     df_clean = _drop_excel_junk_columns(df_clean)
@@ -137,74 +183,270 @@ def clean_pivot_export_sheet(xl_obj, sheet_name, min_text_cells=4, remove_totals
 
     return df_clean
 
-@st.cache_data(show_spinner=False)
-def load_workbook_tables(
+META_COLUMNS = ["key", "sheet_name", "rows", "cols", "seconds", "cached"]
+
+EXECUTOR_KINDS = (None, "thread", "process")
+
+def _clean_one_sheet(xl, sheet_name, min_text_cells, remove_pivot_totals):
+    # Returns (key, df_clean or None, meta_row); errors are captured per sheet, never raised
+    key = "sheet::" + sheet_name
+    t0 = time.perf_counter()
+    try:
+        df_clean = clean_pivot_export_sheet(
+            xl,
+            sheet_name,
+            min_text_cells=min_text_cells,
+            remove_totals=remove_pivot_totals,
+        )
+        meta_row = {
+            "key": key,
+            "sheet_name": sheet_name,
+            "rows": int(df_clean.shape[0]),
+            "cols": int(df_clean.shape[1]),
+            "seconds": round(time.perf_counter() - t0, 4),
+            "cached": False,
+        }
+        return key, df_clean, meta_row
+    except Exception as e:
+        meta_row = {
+            "key": key,
+            "sheet_name": sheet_name,
+            "rows": 0,
+            "cols": 0,
+            "seconds": round(time.perf_counter() - t0, 4),
+            "cached": False,
+            "error": str(e),
+        }
+        return key, None, meta_row
+    finally:
+        if isinstance(xl, WorkbookSession):
+            xl.release(sheet_name)
+
+def _cached_sheet_result(sheet_name, df_clean, seconds):
+    # Same shape as _clean_one_sheet's result, for a sheet served from the disk cache
+    meta_row = {
+        "key": "sheet::" + sheet_name,
+        "sheet_name": sheet_name,
+        "rows": int(df_clean.shape[0]),
+        "cols": int(df_clean.shape[1]),
+        "seconds": round(seconds, 4),
+        "cached": True,
+    }
+    return meta_row["key"], df_clean, meta_row
+
+def _clean_sheet_task(excel_path_str, backend, sheet_name, min_text_cells, remove_pivot_totals):
+    # Pool entry point: each worker opens its own handle, nothing is shared across tasks
+    with WorkbookSession(excel_path_str, backend=backend) as xl:
+        return _clean_one_sheet(xl, sheet_name, min_text_cells, remove_pivot_totals)
+
+def _make_executor(executor, max_workers, n_tasks):
+    workers = max_workers
+    if workers is None:
+        workers = min(n_tasks, os.cpu_count() or 1)
+    workers = max(1, int(workers))
+    if executor == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheet-clean")
+
+@traced("load.read_workbook_tables")
+def read_workbook_tables(
     excel_path,
     selected_sheets=None,
     min_text_cells=4,
     sheet_whitelist=None,
     remove_pivot_totals=True,
+    backend=DEFAULT_BACKEND,
+    executor=None,
+    max_workers=None,
+    disk_cache=True,
 ):
-    xl = pd.ExcelFile(excel_path)
-    all_sheets = xl.sheet_names
-
-    whitelist = DEFAULT_SHEET_WHITELIST if sheet_whitelist is None else sheet_whitelist
-    whitelist = [_normalize_sheet_name(x) for x in whitelist]
+    """
+    Loads and cleans the requested sheets. Returns (tables, meta_df, all_sheets).
+    Not cached in memory: callers that keep the result themselves (table_store) use this directly.
+
+    backend: "stream" (xlsx_reader, values only) or "openpyxl" (same path as pd.read_excel)
+    executor: None cleans sheets one after another on the open workbook; "thread" or
+    "process" parses and cleans them concurrently on a pool of max_workers (default:
+    one per sheet, capped at the CPU count). Each pooled task opens its own workbook
+    handle. Results, errors and ordering are the same in every mode, and meta_df
+    carries per-sheet "seconds" so the slowest tab is easy to spot.
+    disk_cache: look cleaned sheets up in the on-disk sheet_cache first (keyed by the
+    sheet's zip parts and the cleaning parameters) and store freshly cleaned ones there,
+    so a restart with an unchanged workbook parses nothing. meta_df "cached" marks hits.
+    """
+    if executor not in EXECUTOR_KINDS:
+        raise ValueError("executor must be one of " + str(EXECUTOR_KINDS) + ", got " + str(executor))
+
+    # Sheet names come from the requested backend, so both list the same sheets they can
+    # read. The stream backend only reads workbook.xml here; sheets are parsed on cache misses
+    with WorkbookSession(excel_path, backend=backend) as names_session:
+        all_sheets = names_session.sheet_names
+    requested = _requested_sheets(all_sheets, selected_sheets, sheet_whitelist)
 
     # IMPORTANT: if selected_sheets is explicitly [], treat as "names-only"
     # This avoids loading/cleaning and prevents crashes when the UI just wants sheet names.
-    if selected_sheets == []:
-        meta_df = pd.DataFrame(columns=["key", "sheet_name", "rows", "cols"])
+    if requested is None:
+        meta_df = pd.DataFrame(columns=META_COLUMNS)
         return {}, meta_df, all_sheets
 
-    # selected_sheets None means: use whitelist
-    if selected_sheets is None:
-        requested = whitelist
+    results_by_sheet = {}
+    cache_keys = {}
+    cache = get_sheet_disk_cache() if disk_cache else None
+    if cache is not None:
+        params = {"min_text_cells": int(min_text_cells), "remove_pivot_totals": bool(remove_pivot_totals), "backend": backend}
+        cache_keys = sheet_cache_keys(excel_path, requested, params)
+        for sheet_name in requested:
+            t0 = time.perf_counter()
+            df_cached = cache.get(cache_keys[sheet_name]) if sheet_name in cache_keys else None
+            if df_cached is not None:
+                results_by_sheet[sheet_name] = _cached_sheet_result(sheet_name, df_cached, time.perf_counter() - t0)
+
+    to_clean = [s for s in requested if s not in results_by_sheet]
+    if executor is None or len(to_clean) <= 1:
+        if len(to_clean) > 0:
+            with WorkbookSession(excel_path, backend=backend) as xl:
+                fresh = [
+                    _clean_one_sheet(xl, sheet_name, min_text_cells, remove_pivot_totals)
+                    for sheet_name in to_clean
+                ]
+        else:
+            fresh = []
     else:
-        requested = [_normalize_sheet_name(x) for x in selected_sheets]
-
-    # Only load sheets that exist
-    requested = [s for s in requested if s in all_sheets]
+        fresh = _clean_sheets_pooled(
+            str(excel_path),
+            backend,
+            to_clean,
+            min_text_cells,
+            remove_pivot_totals,
+            executor,
+            max_workers,
+        )
+
+    for sheet_name, result in zip(to_clean, fresh):
+        results_by_sheet[sheet_name] = result
+        if cache is not None and result[1] is not None and sheet_name in cache_keys:
+            cache.put(cache_keys[sheet_name], result[1])
+    results = [results_by_sheet[s] for s in requested]
 
     tables = {}
     meta_rows = []
-
-    for sheet_name in requested:
-        key = "sheet::" + sheet_name
-        try:
-            df_clean = clean_pivot_export_sheet(
-                xl,
-                sheet_name,
-                min_text_cells=min_text_cells,
-                remove_totals=remove_pivot_totals,
-            )
+    for key, df_clean, meta_row in results:
+        if df_clean is not None:
             tables[key] = df_clean
-            meta_rows.append(
-                {
-                    "key": key,
-                    "sheet_name": sheet_name,
-                    "rows": int(df_clean.shape[0]),
-                    "cols": int(df_clean.shape[1]),
-                }
-            )
-        except Exception as e:
-            meta_rows.append(
-                {
-                    "key": key,
-                    "sheet_name": sheet_name,
-                    "rows": 0,
-                    "cols": 0,
-                    "error": str(e),
-                }
-            )
+        meta_rows.append(meta_row)
 
     if len(meta_rows) == 0:
-        meta_df = pd.DataFrame(columns=["key", "sheet_name", "rows", "cols"])
+        meta_df = pd.DataFrame(columns=META_COLUMNS)
     else:
         meta_df = pd.DataFrame(meta_rows).sort_values(["sheet_name"]).reset_index(drop=True)
 
     return tables, meta_df, all_sheets
 
+def _params_key(items_val):
+    return None if items_val is None else tuple(items_val)
+
+def load_workbook_tables(
+    excel_path,
+    selected_sheets=None,
+    min_text_cells=4,
+    sheet_whitelist=None,
+    remove_pivot_totals=True,
+    backend=DEFAULT_BACKEND,
+    executor=None,
+    max_workers=None,
+    disk_cache=True,
+):
+    """
+    Cached read_workbook_tables, keyed by the workbook's sha256 and the cleaning parameters
+    (content_cache), so a workbook replaced in place is never served from the old bytes.
+    executor / max_workers / disk_cache only change how the work runs, not the result,
+    and are not part of the key. Every caller gets shallow copies of the frames, which
+    keep changes local only under pandas 3 copy-on-write (see table_store.ReadOnlyTables).
+    """
+    workbook_sha = file_sha256(excel_path)
+    params = (
+        _params_key(selected_sheets),
+        int(min_text_cells),
+        _params_key(sheet_whitelist),
+        bool(remove_pivot_totals),
+        backend,
+    )
+    tables, meta_df, all_sheets = get_content_cache().get_or_compute(
+        "workbook_tables",
+        workbook_sha,
+        params,
+        lambda: read_workbook_tables(
+            excel_path,
+            selected_sheets=selected_sheets,
+            min_text_cells=min_text_cells,
+            sheet_whitelist=sheet_whitelist,
+            remove_pivot_totals=remove_pivot_totals,
+            backend=backend,
+            executor=executor,
+            max_workers=max_workers,
+            disk_cache=disk_cache,
+        ),
+        owner=("workbook_tables", os.path.abspath(str(excel_path))),
+        generation=workbook_sha[:16],
+    )
+    return {k: v.copy(deep=False) for k, v in tables.items()}, meta_df.copy(deep=False), list(all_sheets)
+
+def _requested_sheets(all_sheets, selected_sheets, sheet_whitelist):
+    # None means names-only (selected_sheets == [])
+    if selected_sheets == []:
+        return None
+
+    whitelist = DEFAULT_SHEET_WHITELIST if sheet_whitelist is None else sheet_whitelist
+    whitelist = [_normalize_sheet_name(x) for x in whitelist]
+
+    # selected_sheets None means: use whitelist
+    if selected_sheets is None:
+        requested = whitelist
+    else:
+        requested = [_normalize_sheet_name(x) for x in selected_sheets]
+
+    # Only load sheets that exist
+    return [s for s in requested if s in all_sheets]
+
+def _clean_sheets_pooled(
+    excel_path_str, backend, requested, min_text_cells, remove_pivot_totals, executor, max_workers
+):
+    with _make_executor(executor, max_workers, len(requested)) as pool:
+        futures = [
+            pool.submit(
+                _clean_sheet_task,
+                excel_path_str,
+                backend,
+                sheet_name,
+                min_text_cells,
+                remove_pivot_totals,
+            )
+            for sheet_name in requested
+        ]
+
+        # Collect in submission order so output never depends on which worker finished first
+        results = []
+        for sheet_name, fut in zip(requested, futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                # Pool-level failures (e.g. a worker process died) still land in meta_rows
+                results.append(
+                    (
+                        "sheet::" + sheet_name,
+                        None,
+                        {
+                            "key": "sheet::" + sheet_name,
+                            "sheet_name": sheet_name,
+                            "rows": 0,
+                            "cols": 0,
+                            "seconds": None,
+                            "error": str(e),
+                        },
+                    )
+                )
+    return results
+
 def show_published_timestamp(excel_path=None):
     # Backwards-compatible helper expected by streamlit_app.py
     # Shows last-modified time and size for the locally present workbook.
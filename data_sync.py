@@ -1,12 +1,23 @@
 from pathlib import Path
+import functools
+import json
+import os
+import tempfile
 import time
 import zipfile
 import requests
 import streamlit as st
-import pandas as pd
+
+from tracing import traced
+from xlsx_reader import workbook_sheet_index
 
 DEST_PATH = Path("data/current.xlsx")
 
+# Sidecar next to the workbook holding the HTTP validators from the last download
+SYNC_META_PATH = DEST_PATH.with_name(DEST_PATH.name + ".sync.json")
+
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
 REQUIRED_SHEETS = [
     "Written and Produced by Week",
     "Written Produced Invoiced",
@@ -29,12 +40,23 @@ def _looks_like_xlsx(path_val):
     except Exception:
         return False
 
-def _get_sheet_names(path_val):
-    xl_obj = pd.ExcelFile(str(path_val))
-    return xl_obj.sheet_names
+@functools.lru_cache(maxsize=8)
+def _sheet_names_for(path_str, size_val, mtime_ns):
+    # Keyed on size and mtime too, so a replaced file is re-read while an unchanged one is a lookup
+    return tuple(name for name, _ in workbook_sheet_index(path_str))
 
-def _enforce_contract(path_val, url_val):
-    sheet_names = _get_sheet_names(path_val)
+def _get_sheet_names(path_val):
+    # Package metadata only (central directory, content types, workbook.xml and rels)
+    stat_val = os.stat(path_val)
+    return list(_sheet_names_for(os.path.abspath(path_val), stat_val.st_size, stat_val.st_mtime_ns))
+
+def _enforce_contract(path_val, url_val, sheet_names=None):
+    # Callers that already have the workbook open can pass its sheet names to skip a re-read
+    if sheet_names is None:
+        try:
+            sheet_names = _get_sheet_names(path_val)
+        except ValueError as exc:
+            raise RuntimeError("Workbook is not a valid XLSX package: " + str(exc) + " URL: " + str(url_val))
 
     missing_required = [s for s in REQUIRED_SHEETS if s not in sheet_names]
     forbidden_present = [s for s in FORBIDDEN_SHEETS if s in sheet_names]
@@ -51,50 +73,146 @@ def _enforce_contract(path_val, url_val):
             + str(sheet_names)
         )
 
-def ensure_latest_workbook(ttl_seconds=0, min_size_bytes=5_000_000):
+@st.cache_resource(show_spinner=False)
+def _http_session():
+    # One pooled session per process so repeated syncs reuse the TCP/TLS connection
+    sess = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+def _read_sync_meta():
+    if not SYNC_META_PATH.exists():
+        return {}
+    try:
+        meta_val = json.loads(SYNC_META_PATH.read_text())
+    except Exception:
+        return {}
+    if not isinstance(meta_val, dict):
+        return {}
+    return meta_val
+
+def _write_sync_meta(meta_val):
+    # Same temp + rename dance as the workbook so a crash never leaves half a JSON file
+    tmp_path = SYNC_META_PATH.with_name(SYNC_META_PATH.name + ".tmp")
+    tmp_path.write_text(json.dumps(meta_val, indent=2, sort_keys=True))
+    os.replace(tmp_path, SYNC_META_PATH)
+
+def _conditional_headers(sync_meta, url_val):
+    # Validators only apply to the file we already have, and only if it came from the same URL
+    if not DEST_PATH.exists() or sync_meta.get("url") != url_val:
+        return {}
+    headers = {}
+    if sync_meta.get("etag"):
+        headers["If-None-Match"] = sync_meta["etag"]
+    if sync_meta.get("last_modified"):
+        headers["If-Modified-Since"] = sync_meta["last_modified"]
+    return headers
+
+def _stream_to_temp(resp):
+    # Writes the body in chunks into a temp file in the destination folder, so the final
+    # os.replace stays on one filesystem and is atomic.
+    fd_val, tmp_name = tempfile.mkstemp(
+        dir=str(DEST_PATH.parent), prefix="." + DEST_PATH.stem + ".", suffix=".part"
+    )
+    byte_len = 0
+    try:
+        with os.fdopen(fd_val, "wb") as fh:
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                if not chunk:
+                    continue
+                fh.write(chunk)
+                byte_len += len(chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return Path(tmp_name), byte_len
+
+def _validate_cached(url_val):
+    # The contract check also validates the zip package, and is memoized on size and mtime
+    if not DEST_PATH.is_file():
+        raise RuntimeError("Cached file does not look like a valid XLSX at " + str(DEST_PATH))
+    _enforce_contract(DEST_PATH, url_val=url_val)
+
+@traced("sync.ensure_latest_workbook")
+def ensure_latest_workbook(ttl_seconds=0, min_size_bytes=5_000_000, conditional=True):
     """
     Downloads the Excel workbook from st.secrets["DATA_XLSX_URL"] into data/current.xlsx
 
     ttl_seconds default 0 so you always refresh while debugging.
     min_size_bytes default 5MB so we fail fast if we accidentally download HTML/test data.
+    conditional default True sends the ETag / Last-Modified of the local copy and keeps it
+    on a 304, so an unchanged workbook costs one round trip instead of a full download.
+
+    The body is streamed into a temp file and only renamed over data/current.xlsx after it
+    passes the size, zip and sheet contract checks. Readers never see a partial workbook,
+    and a bad download leaves the previous workbook in place.
     """
     url_val = st.secrets.get("DATA_XLSX_URL", "")
     if str(url_val).strip() == "":
         raise RuntimeError("Missing DATA_XLSX_URL in Streamlit secrets")
 
     DEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    sync_meta = _read_sync_meta()
 
     if DEST_PATH.exists() and ttl_seconds is not None and ttl_seconds > 0:
-        age_seconds = time.time() - DEST_PATH.stat().st_mtime
+        # A 304 refreshes checked_at without touching the file, so count from whichever is newer
+        last_checked = max(DEST_PATH.stat().st_mtime, float(sync_meta.get("checked_at", 0.0)))
+        age_seconds = time.time() - last_checked
         if age_seconds < ttl_seconds:
-            if not _looks_like_xlsx(DEST_PATH):
-                raise RuntimeError("Cached file does not look like a valid XLSX at " + str(DEST_PATH))
-            _enforce_contract(DEST_PATH, url_val="cached")
+            _validate_cached(url_val="cached")
             return DEST_PATH
 
-    resp = requests.get(url_val, timeout=180, allow_redirects=True)
-    resp.raise_for_status()
-    content_bytes = resp.content
-    byte_len = len(content_bytes)
-
-    DEST_PATH.write_bytes(content_bytes)
+    headers = _conditional_headers(sync_meta, url_val) if conditional else {}
 
-    if byte_len < int(min_size_bytes):
-        raise RuntimeError(
-            "Downloaded file is too small to be the real workbook. Bytes: "
-            + str(byte_len)
-            + " URL: "
-            + str(url_val)
-        )
+    with _http_session().get(
+        url_val, headers=headers, timeout=180, allow_redirects=True, stream=True
+    ) as resp:
+        if resp.status_code == 304:
+            _validate_cached(url_val=url_val)
+            sync_meta["checked_at"] = time.time()
+            _write_sync_meta(sync_meta)
+            return DEST_PATH
 
-    if not _looks_like_xlsx(DEST_PATH):
-        raise RuntimeError(
-            "Downloaded file does not look like a valid XLSX (zip missing xl/workbook.xml). "
-            + "Bytes: "
-            + str(byte_len)
-            + " URL: "
-            + str(url_val)
-        )
+        resp.raise_for_status()
+        tmp_path, byte_len = _stream_to_temp(resp)
+        resp_etag = resp.headers.get("ETag")
+        resp_last_modified = resp.headers.get("Last-Modified")
 
-    _enforce_contract(DEST_PATH, url_val=url_val)
+    try:
+        if byte_len < int(min_size_bytes):
+            raise RuntimeError(
+                "Downloaded file is too small to be the real workbook. Bytes: "
+                + str(byte_len)
+                + " URL: "
+                + str(url_val)
+            )
+
+        if not _looks_like_xlsx(tmp_path):
+            raise RuntimeError(
+                "Downloaded file does not look like a valid XLSX (zip missing xl/workbook.xml). "
+                + "Bytes: "
+                + str(byte_len)
+                + " URL: "
+                + str(url_val)
+            )
+
+        _enforce_contract(tmp_path, url_val=url_val)
+        os.replace(tmp_path, DEST_PATH)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    _write_sync_meta(
+        {
+            "url": url_val,
+            "etag": resp_etag,
+            "last_modified": resp_last_modified,
+            "bytes": byte_len,
+            "checked_at": time.time(),
+        }
+    )
     return DEST_PATH
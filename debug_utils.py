@@ -1,3 +1,5 @@
+import hashlib
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -7,31 +9,207 @@ def _coerce_num(series_in):
     series_as_str = series_as_str.str.replace("(", "-", regex=False).str.replace(")", "", regex=False)
     return pd.to_numeric(series_as_str, errors="coerce")
 
-def numeric_strength_table(df_in, top_n=20):
+def _wilson_bounds(successes, n_val, z_val=1.96):
+    # 95% Wilson score interval for a rate estimated from a sample of n_val rows
+    if n_val <= 0:
+        return 0.0, 1.0
+    p_hat = successes / n_val
+    denom = 1.0 + z_val * z_val / n_val
+    center = (p_hat + z_val * z_val / (2.0 * n_val)) / denom
+    half = z_val * np.sqrt(p_hat * (1.0 - p_hat) / n_val + z_val * z_val / (4.0 * n_val * n_val)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+def _fmt_top(values, counts):
+    return ", ".join([str(v) + " (" + str(int(c)) + ")" for v, c in zip(values, counts)])
+
+PROFILE_COLUMNS = [
+    "col",
+    "rows_profiled",
+    "non_null_numeric",
+    "numeric_rate",
+    "numeric_rate_low",
+    "numeric_rate_high",
+    "null_rate",
+    "null_rate_low",
+    "null_rate_high",
+    "cardinality",
+    "top_values",
+]
+
+# Numeric value counts kept per column for the measure section of render_debug_tab
+MEASURE_TOP_N = 20
+
+def _profile_frame(df_in, sample_rows=None, top_n=10, seed=0):
+    """
+    One pass over the frame: each column is factorized once and everything else (null
+    rate, cardinality, top values, numeric-parse rate) is derived from the codes and the
+    distinct values, so _coerce_num runs once per distinct value instead of once per row.
+    """
+    n_total = int(df_in.shape[0])
+    sampled = sample_rows is not None and n_total > int(sample_rows)
+    df_val = df_in.sample(n=int(sample_rows), random_state=seed) if sampled else df_in
+    n_rows = int(df_val.shape[0])
+
+    rows = []
+    top_numeric = {}
+    for col_pos, c in enumerate(df_val.columns):
+        codes, uniques = pd.factorize(df_val.iloc[:, col_pos], use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        null_count = int((codes < 0).sum())
+
+        uniq_num = _coerce_num(pd.Series(uniques, dtype=object))
+        num_mask = uniq_num.notna().to_numpy()
+        numeric_count = int(counts[num_mask].sum())
+
+        order = np.argsort(-counts, kind="stable")[:top_n]
+        num_order = [i for i in np.argsort(-counts, kind="stable") if num_mask[i]]
+        num_ser = pd.Series(counts[num_order], index=uniq_num.to_numpy()[num_order])
+        top_numeric[c] = (
+            num_ser.groupby(level=0, sort=False).sum().sort_values(ascending=False, kind="stable").head(MEASURE_TOP_N)
+        )
+
+        num_low, num_high = _wilson_bounds(numeric_count, n_rows) if sampled else (None, None)
+        null_low, null_high = _wilson_bounds(null_count, n_rows) if sampled else (None, None)
+        rows.append(
+            {
+                "col": c,
+                "rows_profiled": n_rows,
+                "non_null_numeric": round(numeric_count * n_total / n_rows) if n_rows > 0 else 0,
+                "numeric_rate": numeric_count / n_rows if n_rows > 0 else 0.0,
+                "numeric_rate_low": num_low,
+                "numeric_rate_high": num_high,
+                "null_rate": null_count / n_rows if n_rows > 0 else 0.0,
+                "null_rate_low": null_low,
+                "null_rate_high": null_high,
+                "cardinality": int(len(uniques)),
+                "top_values": _fmt_top(uniques.take(order) if len(order) else [], counts[order]),
+            }
+        )
+
+    profile_df = pd.DataFrame(rows, columns=PROFILE_COLUMNS)
+    profile_df.attrs["sampled"] = sampled
+    profile_df.attrs["rows_total"] = n_total
+    profile_df.attrs["top_numeric"] = top_numeric
+    return profile_df
+
+def table_content_key(df_in):
+    """sha1 over the row hashes, column names and dtypes; None if the frame can't be hashed."""
+    try:
+        row_hashes = pd.util.hash_pandas_object(df_in, index=True).to_numpy()
+    except Exception:
+        return None
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(repr([(str(c), str(t)) for c, t in df_in.dtypes.items()]).encode("utf-8"))
+    return digest.hexdigest()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _profile_cached(content_key, _df_in, sample_rows, top_n, seed):
+    # Keyed on the content hash; the frame itself is not hashed again by Streamlit
+    return _profile_frame(_df_in, sample_rows=sample_rows, top_n=top_n, seed=seed)
+
+def profile_columns(df_in, sample_rows=None, top_n=10, seed=0):
+    """
+    Per-column profile: numeric-parse rate, null rate, cardinality and top values.
+
+    sample_rows: profile a random sample of that many rows instead of the whole frame.
+    Rates then come with 95% Wilson bounds (*_low / *_high), non_null_numeric is scaled
+    to the full row count, and cardinality/top values describe the sample only.
+
+    Profiles are cached by table content hash, so an unchanged table is profiled once.
+    """
+    if df_in is None or len(df_in.columns) == 0:
+        return pd.DataFrame(columns=PROFILE_COLUMNS)
+    content_key = table_content_key(df_in)
+    if content_key is None:
+        return _profile_frame(df_in, sample_rows=sample_rows, top_n=top_n, seed=seed)
+    return _profile_cached(content_key, df_in, sample_rows, top_n, seed)
+
+def numeric_strength_table(df_in, top_n=20, profile_df=None):
     if df_in is None or len(df_in.columns) == 0:
         return pd.DataFrame()
 
-    rows = []
-    for c in df_in.columns:
-        num_non_null = int(_coerce_num(df_in[c]).notna().sum())
-        rows.append({"col": c, "non_null_numeric": num_non_null})
+    if profile_df is None:
+        profile_df = profile_columns(df_in)
+    rows = [
+        {"col": c, "non_null_numeric": int(n)}
+        for c, n in zip(profile_df["col"], profile_df["non_null_numeric"])
+    ]
 
     out_df = pd.DataFrame(rows).sort_values("non_null_numeric", ascending=False).head(top_n)
     return out_df
 
-def value_counts_table(df_in, col_name, top_n=25):
-    if df_in is None or col_name is None or col_name not in df_in.columns:
-        return None
+VALUE_COUNT_MODES = ("exact", "approx", "auto")
+
+# "auto" switches to the bounded-memory summary at this many rows
+APPROX_MIN_ROWS = 1_000_000
 
-    vc = (
-        df_in[col_name]
-        .astype(str)
+def _normalize_labels(series_in):
+    return (
+        series_in.astype(str)
         .str.replace("\u00a0", " ", regex=False)
         .str.strip()
         .str.lower()
-        .value_counts(dropna=False)
-        .head(top_n)
     )
+
+def _misra_gries_counts(series_in, capacity, chunk_rows):
+    """
+    Misra-Gries heavy hitters over fixed-size chunks. Only one chunk is normalized at a
+    time and at most `capacity` counters survive each merge, so memory does not grow with
+    the column. Every kept count is a lower bound: true count <= count + error_bound, and
+    any value seen more than rows / (capacity + 1) times is guaranteed to be kept.
+    """
+    counters = pd.Series(dtype="int64")
+    error_bound = 0
+    for start in range(0, len(series_in), chunk_rows):
+        chunk_counts = _normalize_labels(series_in.iloc[start : start + chunk_rows]).value_counts(dropna=False)
+        counters = counters.add(chunk_counts, fill_value=0).astype("int64")
+        if len(counters) > capacity:
+            # Subtract the (capacity+1)-th largest count from every counter and drop the non-positive ones
+            cut = int(counters.nlargest(capacity + 1).iloc[-1])
+            counters = counters - cut
+            counters = counters[counters > 0]
+            error_bound += cut
+    return counters, error_bound
+
+def value_counts_table(df_in, col_name, top_n=25, mode="exact", capacity=None, chunk_rows=100_000):
+    """
+    Top-N normalized value counts for one column.
+
+    mode "exact" counts the whole column at once. "approx" runs a bounded-memory
+    Misra-Gries summary with `capacity` counters (default max(10 * top_n, 256)) over
+    chunks of chunk_rows. "auto" picks approx from APPROX_MIN_ROWS rows up.
+
+    The Series attrs say what produced it: "mode" ("exact" or "misra_gries"), "rows",
+    and for approx "capacity" and "error_bound" (each count may undercount by at most
+    that much; 0 means the counts are exact).
+    """
+    if df_in is None or col_name is None or col_name not in df_in.columns:
+        return None
+    if mode not in VALUE_COUNT_MODES:
+        raise ValueError("mode must be one of " + str(VALUE_COUNT_MODES) + ", got " + str(mode))
+
+    n_rows = int(df_in.shape[0])
+    if mode == "auto":
+        mode = "approx" if n_rows >= APPROX_MIN_ROWS else "exact"
+
+    if mode == "exact":
+        vc = _normalize_labels(df_in[col_name]).value_counts(dropna=False).head(top_n)
+        vc.attrs = {"mode": "exact", "rows": n_rows}
+        return vc
+
+    if capacity is None:
+        capacity = max(10 * int(top_n), 256)
+    counters, error_bound = _misra_gries_counts(df_in[col_name], int(capacity), max(1, int(chunk_rows)))
+
+    vc = counters.sort_values(ascending=False, kind="stable").head(top_n)
+    vc.index.name = col_name
+    vc.name = "count"
+    vc.attrs = {
+        "mode": "misra_gries",
+        "rows": n_rows,
+        "capacity": int(capacity),
+        "error_bound": int(error_bound),
+    }
     return vc
 
 def render_debug_tab(
@@ -43,6 +221,7 @@ def render_debug_tab(
     time_col=None,
     measure_cols=None,
     show_numeric_strength=True,
+    sample_rows=None,
 ):
     st.subheader(title)
 
@@ -52,27 +231,50 @@ def render_debug_tab(
 
     if time_col is not None and df_clean is not None and time_col in df_clean.columns:
         st.markdown("#### Time bucket value counts")
-        vc = value_counts_table(df_clean, time_col, top_n=25)
+        vc = value_counts_table(df_clean, time_col, top_n=25, mode="auto")
         if vc is not None:
             st.write(vc)
+            if vc.attrs.get("mode") == "misra_gries":
+                st.caption(
+                    "Approximate counts over "
+                    + str(vc.attrs["rows"])
+                    + " rows; each may be low by up to "
+                    + str(vc.attrs["error_bound"])
+                    + "."
+                )
 
     if measure_cols is None:
         measure_cols = []
 
+    # One profile (cached by content hash) feeds both the measure and the strength sections
+    profile_df = None
+    if df_clean is not None and (measure_cols or show_numeric_strength):
+        profile_df = profile_columns(df_clean, sample_rows=sample_rows)
+        if profile_df.attrs.get("sampled"):
+            st.caption(
+                "Profiled a sample of "
+                + str(int(sample_rows))
+                + " of "
+                + str(profile_df.attrs.get("rows_total"))
+                + " rows; rates show 95% bounds."
+            )
+
     for c in measure_cols:
         if df_clean is not None and c in df_clean.columns:
             st.markdown("#### Measure column value counts (top 20 non-null) for `" + str(c) + "`")
-            s = df_clean[c]
-            s_num = _coerce_num(s)
-            s_num = s_num[s_num.notna()]
-            if len(s_num) == 0:
-                st.write(s.astype(str).value_counts(dropna=False).head(20))
+            top_numeric = profile_df.attrs["top_numeric"].get(c)
+            if top_numeric is None or len(top_numeric) == 0:
+                st.write(df_clean[c].astype(str).value_counts(dropna=False).head(20))
             else:
-                st.write(s_num.value_counts().head(20))
+                st.write(top_numeric)
 
     if show_numeric_strength and df_clean is not None:
         st.markdown("#### Numeric strength (top columns by numeric non-nulls)")
-        st.dataframe(numeric_strength_table(df_clean, top_n=20), use_container_width=True)
+        st.dataframe(numeric_strength_table(df_clean, top_n=20, profile_df=profile_df), use_container_width=True)
+
+    if profile_df is not None:
+        st.markdown("#### Column profile")
+        st.dataframe(profile_df, use_container_width=True)
 
     if df_clean is not None:
         st.markdown("#### All columns (cleaned)")
@@ -0,0 +1,95 @@
+"""
+Precomputed KPI snapshot for the YTD landing page.
+
+The build turns the YTD vs LY table into a small JSON document: for every location, the
+current value, LY value and pct vs LY of each landing metric. The page loads it once per
+file version and renders straight from dicts, with no pandas work per rerun.
+
+    {
+      "source_path": "data/outputs/gen-.../landing_ytd_vs_ly.parquet",
+      "source_sha256": "...",
+      "built_at": 1700000000.0,
+      "metrics": [{"key": "written", "title": "Written - Income", ...}, ...],
+      "locations": {"digital": {"name": "Digital", "written": {"current": 1.0, "ly": 2.0, "pct": -0.5}, ...}}
+    }
+"""
+from pathlib import Path
+import json
+import math
+import os
+import time
+
+import pandas as pd
+
+from build_manifest import file_sha256
+
+# (key, card title, current column, LY column) in display order
+LANDING_KPIS = [
+    ("written", "Written - Income", "Written Current", "Written LY"),
+    ("produced", "Produced - Income", "Produced Current", "Produced LY"),
+    ("invoiced", "Invoiced - Net Income", "Invoiced Current", "Invoiced LY"),
+]
+
+def _location_key(name_val):
+    return str(name_val).strip().lower()
+
+def _first_value(col_ser):
+    # First non-missing value, as the page's old safe_scalar picked it; None if there is none
+    if col_ser is None:
+        return None
+    vals = pd.to_numeric(col_ser, errors="coerce").dropna()
+    if vals.empty:
+        return None
+    return float(vals.iloc[0])
+
+def pct_vs_ly(curr_val, ly_val):
+    curr_f = float(curr_val) if curr_val is not None else 0.0
+    ly_f = float(ly_val) if ly_val is not None else 0.0
+    if ly_f == 0.0:
+        return None
+    pct_val = (curr_f - ly_f) / ly_f
+    return None if math.isnan(pct_val) else pct_val
+
+def make_kpi_snapshot(ly_df, source_path=None):
+    locations = {}
+    loc_keys = ly_df["Location"].astype(str).str.strip().str.lower()
+    for loc_key, loc_df in ly_df.groupby(loc_keys, sort=False):
+        entry = {"name": str(loc_df["Location"].iloc[0]).strip()}
+        for key, _, curr_col, ly_col in LANDING_KPIS:
+            curr_val = _first_value(loc_df.get(curr_col))
+            ly_val = _first_value(loc_df.get(ly_col))
+            entry[key] = {"current": curr_val, "ly": ly_val, "pct": pct_vs_ly(curr_val, ly_val)}
+        locations[loc_key] = entry
+
+    return {
+        "source_path": None if source_path is None else str(source_path),
+        "source_sha256": None if source_path is None else file_sha256(source_path),
+        "built_at": time.time(),
+        "metrics": [
+            {"key": key, "title": title, "current_col": curr_col, "ly_col": ly_col}
+            for key, title, curr_col, ly_col in LANDING_KPIS
+        ],
+        "locations": locations,
+    }
+
+def write_kpi_snapshot(ly_df, source_path, snapshot_path):
+    snapshot = make_kpi_snapshot(ly_df, source_path=source_path)
+    snapshot_path = Path(snapshot_path)
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(snapshot, indent=2, sort_keys=True))
+    os.replace(tmp_path, snapshot_path)
+    return snapshot
+
+def kpi_snapshot_is_current(source_path, snapshot_path):
+    # True when the snapshot exists and was made from the source file as it is on disk now
+    if not Path(snapshot_path).exists() or not Path(source_path).exists():
+        return False
+    try:
+        snapshot = json.loads(Path(snapshot_path).read_text())
+    except Exception:
+        return False
+    return isinstance(snapshot, dict) and snapshot.get("source_sha256") == file_sha256(source_path)
+
+def location_kpis(snapshot, location_name):
+    """{metric key: {"current", "ly", "pct"}} for one location, or None if it is not in the snapshot."""
+    return snapshot.get("locations", {}).get(_location_key(location_name))
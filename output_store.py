@@ -0,0 +1,184 @@
+"""
+Generation-versioned output directory for the built parquets.
+
+Every build writes a complete output set (the parquets, their Arrow IPC twins and
+partitioned datasets, the KPI snapshot and the build manifest) into a fresh directory
+under data/outputs/, named gen-<UTC time>. Outputs the build did not need to rebuild are
+hard-linked from the current generation, so each generation is self-contained. Only when
+everything is on disk does the build swap the CURRENT pointer file (write a temp file,
+os.replace), so readers see either the whole old set or the whole new set, never a mix or
+a half-written file.
+
+Readers go through resolve_output(name). The newest keep generations stay on disk, so a
+reader that resolved a path just before a swap can finish its read, and set_current()
+rolls back to an earlier set. Files are never rewritten in place, which is also what makes
+memory-mapping them safe.
+
+    python -m output_store                   # retained generations
+    python -m output_store --rollback        # point CURRENT at the previous generation
+    python -m output_store --keep 2          # prune down to 2 generations
+"""
+from pathlib import Path
+import argparse
+import datetime
+import os
+import shutil
+import sys
+
+OUTPUT_ROOT = Path("data/outputs")
+POINTER_NAME = "CURRENT"
+GENERATION_PREFIX = "gen-"
+DEFAULT_KEEP_GENERATIONS = 3
+
+# Every parquet output has an uncompressed Arrow IPC twin for memory-mapped reads, and
+# partitioned outputs a Hive-style dataset directory
+IPC_SUFFIX = ".arrow"
+DATASET_SUFFIX = ".dataset"
+
+def _keep_from_env():
+    try:
+        return max(1, int(os.environ.get("OUTPUT_GENERATIONS_KEEP", DEFAULT_KEEP_GENERATIONS)))
+    except ValueError:
+        return DEFAULT_KEEP_GENERATIONS
+
+def list_generations(root=OUTPUT_ROOT):
+    # Oldest first; names sort by creation time
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and p.name.startswith(GENERATION_PREFIX))
+
+def current_generation(root=OUTPUT_ROOT):
+    """Name of the generation CURRENT points at, or None if there is none (or it is gone)."""
+    pointer = Path(root) / POINTER_NAME
+    try:
+        name = pointer.read_text().strip()
+    except FileNotFoundError:
+        return None
+    if not name.startswith(GENERATION_PREFIX) or not (Path(root) / name).is_dir():
+        return None
+    return name
+
+def current_dir(root=OUTPUT_ROOT):
+    name = current_generation(root)
+    return None if name is None else Path(root) / name
+
+def resolve_output(name, root=OUTPUT_ROOT):
+    """Path of output name in the current generation, or None if it has not been built."""
+    gen_dir = current_dir(root)
+    if gen_dir is None:
+        return None
+    path_obj = gen_dir / str(name)
+    return path_obj if path_obj.exists() else None
+
+def ipc_name(name):
+    # "wip.parquet" -> "wip.arrow"
+    return Path(str(name)).stem + IPC_SUFFIX
+
+def dataset_name(name):
+    # "wip.parquet" -> "wip.dataset"
+    return Path(str(name)).stem + DATASET_SUFFIX
+
+def new_generation(root=OUTPUT_ROOT):
+    """Creates an empty generation directory; nothing reads it until set_current()."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    gen_dir = root / (GENERATION_PREFIX + stamp)
+    suffix = 0
+    while gen_dir.exists():
+        suffix += 1
+        gen_dir = root / (GENERATION_PREFIX + stamp + "-" + str(suffix))
+    gen_dir.mkdir()
+    return gen_dir
+
+def _link_or_copy(src, dest):
+    # Hard link when the filesystem allows it (no copy, same bytes), else a plain copy
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+def carry_over(name, src_dir, dest_dir):
+    src = Path(src_dir) / str(name)
+    dest = Path(dest_dir) / str(name)
+    if src.is_dir():
+        shutil.copytree(src, dest, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(src, dest)
+
+def set_current(name, root=OUTPUT_ROOT):
+    """Atomically points CURRENT at generation name."""
+    root = Path(root)
+    if not (root / name).is_dir():
+        raise ValueError("No such output generation: " + str(name))
+    tmp_path = root / (POINTER_NAME + "." + str(os.getpid()) + ".tmp")
+    tmp_path.write_text(str(name) + "\n")
+    os.replace(tmp_path, root / POINTER_NAME)
+
+def discard_generation(gen_dir):
+    # For a build that failed before publishing
+    shutil.rmtree(gen_dir, ignore_errors=True)
+
+def prune_generations(keep=None, root=OUTPUT_ROOT):
+    """
+    Deletes generations older than the newest keep up to and including the current one.
+    Directories newer than the current one (a build in progress) are left alone.
+    Returns the names removed.
+    """
+    keep = _keep_from_env() if keep is None else max(1, int(keep))
+    current = current_generation(root)
+    if current is None:
+        return []
+    published = [name for name in list_generations(root) if name <= current]
+    removed = published[:-keep]
+    for name in removed:
+        shutil.rmtree(Path(root) / name, ignore_errors=True)
+    return removed
+
+def previous_generation(root=OUTPUT_ROOT):
+    current = current_generation(root)
+    older = [name for name in list_generations(root) if current is not None and name < current]
+    return older[-1] if older else None
+
+def rollback(root=OUTPUT_ROOT):
+    """Points CURRENT at the generation before it; returns its name (None if there is none)."""
+    name = previous_generation(root)
+    if name is not None:
+        set_current(name, root)
+    return name
+
+def generations_report(root=OUTPUT_ROOT):
+    # [{"generation", "current", "files", "kb"}], newest first
+    current = current_generation(root)
+    rows = []
+    for name in reversed(list_generations(root)):
+        files = [p for p in (Path(root) / name).rglob("*") if p.is_file()]
+        rows.append(
+            {
+                "generation": name,
+                "current": name == current,
+                "files": len(files),
+                "kb": round(sum(p.stat().st_size for p in files) / 1024, 1),
+            }
+        )
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generation-versioned build outputs")
+    parser.add_argument("--root", default=str(OUTPUT_ROOT))
+    parser.add_argument("--rollback", action="store_true", help="Point CURRENT at the previous generation")
+    parser.add_argument("--keep", type=int, default=None, help="Delete all but this many generations")
+    args = parser.parse_args(argv)
+
+    if args.rollback:
+        name = rollback(args.root)
+        print("No earlier generation to roll back to" if name is None else "CURRENT -> " + name)
+    if args.keep is not None:
+        print("Removed " + str(len(prune_generations(keep=args.keep, root=args.root))) + " generation(s)")
+    for row in generations_report(args.root):
+        print(("* " if row["current"] else "  ") + row["generation"] + "  " + str(row["files"]) + " file(s), " + str(row["kb"]) + " KB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,16 @@
 import streamlit as st
-import pandas as pd
+
+from table_store import session_tables
 
 st.set_page_config(page_title="Cockpit", layout="wide")
 
 st.markdown("## Cockpit")
-st.markdown("Reads from `st.session_state['tables']` only (no disk reload).")
+st.markdown("Reads from the shared table store only (no disk reload).")
 
-workbook_path = st.session_state.get("workbook_path")
-tables = st.session_state.get("tables")
+# The session only holds a handle; the frames live once per process in the table store
+handle = session_tables()
+workbook_path = None if handle is None else handle.workbook_path
+tables = None if handle is None else handle.tables
 
 st.markdown("### Current session state")
 
@@ -22,10 +25,10 @@ with col_b:
         st.write("tables is None (not loaded)")
     else:
         st.write("Tables status")
-        st.write("tables is dict with " + str(len(tables)) + " keys")
+        st.write("generation " + str(handle.generation_id) + " with " + str(len(tables)) + " keys")
 
-if tables is None or not isinstance(tables, dict) or len(tables) == 0:
-    st.warning("No tables in memory. Go to the Data page and click Load workbook.")
+if tables is None or len(tables) == 0:
+    st.warning("No tables in memory yet. The background refresh loads them; see the Data page for its status.")
     st.stop()
 
 table_keys = sorted(list(tables.keys()))
@@ -41,32 +44,29 @@ with st.sidebar:
     st.header("Pick table")
     selected_key = st.selectbox("Table key", options=table_keys, index=0)
 
-df = tables[selected_key]
+# Shape, fill rate, columns and preview were computed once when the tables were published
+stats = handle.stats[selected_key]
 
 st.markdown("### Selected table")
 st.write("Key")
 st.write(selected_key)
 
 st.write("Shape")
-st.write([int(df.shape[0]), int(df.shape[1])])
+st.write([stats["rows"], stats["cols"]])
 
 st.markdown("#### Preview")
-st.dataframe(df.head(50), use_container_width=True)
+st.dataframe(stats["preview_df"], use_container_width=True)
 
 st.markdown("#### Columns")
-st.write([str(c) for c in df.columns])
+st.dataframe(stats["columns_df"], use_container_width=True, hide_index=True)
 
 st.markdown("#### Quick KPI")
-non_null_total = int(df.notna().sum().sum())
-total_cells = int(df.shape[0] * df.shape[1])
-pct_filled = 0.0
-if total_cells > 0:
-    pct_filled = non_null_total / total_cells
-
-k1, k2, k3 = st.columns(3)
+k1, k2, k3, k4 = st.columns(4)
 with k1:
-    st.metric("Rows", int(df.shape[0]))
+    st.metric("Rows", stats["rows"])
 with k2:
-    st.metric("Cols", int(df.shape[1]))
+    st.metric("Cols", stats["cols"])
 with k3:
-    st.metric("Filled cells percent", str(round(pct_filled * 100.0, 1)) + "%")
+    st.metric("Filled cells percent", str(round(stats["fill_rate"] * 100.0, 1)) + "%")
+with k4:
+    st.metric("Memory", str(round(stats["nbytes"] / (1024 * 1024), 2)) + " MB")
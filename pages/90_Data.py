@@ -1,272 +1,117 @@
-from pathlib import Path
-import re
-import streamlit as st
 import pandas as pd
+import streamlit as st
 
-from data_sync import ensure_latest_workbook
+from app_data import dataset_partitions, read_parquet, read_partitioned
+from data_build import (
+    ALL_OUT_PATHS,
+    LY_OUT_PATH,
+    OUTPUT_BUILDERS,
+    OUTPUT_PARTITIONS,
+    PLAN_OUT_PATH,
+    output_status,
+)
+from data_sync import DEST_PATH
+from output_store import generations_report, previous_generation, rollback
+from parquet_schema import size_report
+from refresh_worker import get_refresh_worker, render_refresh_status
+from workbook_session import WorkbookSession
 
 st.set_page_config(page_title="Data", layout="wide")
 st.title("Admin - Data")
 
-PLAN_OUT_PATH = "landing_ytd_plan.parquet"
-LY_OUT_PATH = "landing_ytd_vs_ly.parquet"
-TREND_OUT_PATH = "trend_weekly.parquet"
-WIP_OUT_PATH = "wip.parquet"
-COLOR_YARDS_OUT_PATH = "color_yards.parquet"
-YARDS_WASTED_OUT_PATH = "yards_wasted.parquet"
-
-EXCLUDE_DIVISIONS = {
-    "design services",
-    "design services total",
-}
-
-def _clean_columns(cols_val):
-    clean_cols = []
-    for c in cols_val:
-        c_str = str(c)
-        c_str = re.sub(r"\s+", " ", c_str).strip()
-        clean_cols.append(c_str)
-    return clean_cols
-
-def _drop_unnamed_and_empty_columns(df_val):
-    cols_str = df_val.columns.astype(str)
-    keep_mask = ~cols_str.str.match(r"^Unnamed")
-    df_val = df_val.loc[:, keep_mask]
-    df_val = df_val.dropna(axis=1, how="all")
-    return df_val
-
-def _score_header_row(row_vals):
-    vals = ["" if pd.isna(x) else str(x).strip() for x in row_vals]
-    non_empty = [v for v in vals if v != ""]
-    if len(non_empty) == 0:
-        return 0
-    unique_count = len(set(non_empty))
-    score = len(non_empty) + unique_count
-    return score
-
-def _detect_header_row(excel_path, sheet_name, max_scan_rows=30):
-    preview_df = pd.read_excel(
-        str(excel_path),
-        sheet_name=sheet_name,
-        header=None,
-        nrows=int(max_scan_rows),
-    )
-    best_idx = 0
-    best_score = -1
-    for idx_val in range(preview_df.shape[0]):
-        score_val = _score_header_row(preview_df.iloc[idx_val].tolist())
-        if score_val > best_score:
-            best_score = score_val
-            best_idx = idx_val
-    return int(best_idx)
-
-@st.cache_data(show_spinner=False)
-def _read_sheet_cached(excel_path_str, sheet_name, header_row_idx):
-    df_val = pd.read_excel(
-        excel_path_str,
-        sheet_name=sheet_name,
-        header=int(header_row_idx),
-    )
-    df_val.columns = _clean_columns(df_val.columns)
-    df_val = _drop_unnamed_and_empty_columns(df_val)
-    return df_val
-
-def _make_parquet_safe(df_val):
-    if df_val is None:
-        return df_val
-
-    out_df = df_val.copy()
-
-    # Critical: avoid pyarrow type inference issues on mixed object columns (ex: Weeks has "1 Total")
-    for col_val in out_df.columns:
-        if out_df[col_val].dtype == "object":
-            out_df[col_val] = out_df[col_val].astype(str)
-            out_df.loc[out_df[col_val].str.lower().isin(["", "none", "nat"]), col_val] = None
+# Sync and build run on the background refresh worker; this page only reads its status
+worker = get_refresh_worker()
 
-    return out_df
+st.markdown("#### Background refresh")
+render_refresh_status(worker)
 
-def _write_parquet_safe(df_val, out_path):
-    safe_df = _make_parquet_safe(df_val)
-    safe_df.to_parquet(out_path, index=False)
-    return safe_df
-
-def _clean_loc(loc_val):
-    if pd.isna(loc_val):
-        return None
-    s_val = str(loc_val).strip()
-    if s_val == "":
-        return None
-    s_val = re.sub(r"\s+", " ", s_val)
-    return s_val
-
-def _is_total_row(loc_val):
-    if pd.isna(loc_val):
-        return False
-    s_val = str(loc_val).strip().lower()
-    return (s_val == "grand total") or s_val.endswith(" total")
-
-def _base_division_name(loc_val):
-    if pd.isna(loc_val):
-        return None
-    s_val = re.sub(r"\s+", " ", str(loc_val).strip())
-    s_low = s_val.lower()
-    if s_low == "grand total":
-        return "Grand Total"
-    if s_low.endswith(" total"):
-        return s_val[:-6].strip()
-    return s_val
-
-def _build_landing_vs_ly_df(workbook_path_obj):
-    sheet_name = "YTD vs LY"
-    header_row_idx = _detect_header_row(workbook_path_obj, sheet_name)
-    raw_df = _read_sheet_cached(str(workbook_path_obj), sheet_name, header_row_idx)
-
-    df_val = raw_df.copy()
-    df_val = df_val.dropna(axis=0, how="all")
-
-    exclude_set = set([x.lower() for x in EXCLUDE_DIVISIONS])
-
-    def _block(df_in, div_col, ly_col, ty_col, out_ly_name, out_ty_name):
-        # Only pull the columns we need (never Weeks)
-        slim = df_in[[div_col, ly_col, ty_col]].copy()
-        slim["Location"] = slim[div_col].apply(_base_division_name).apply(_clean_loc)
-        slim = slim[slim[div_col].apply(_is_total_row)].copy()
-        slim = slim.dropna(subset=["Location"]).copy()
-        slim = slim[~slim["Location"].astype(str).str.strip().str.lower().isin(exclude_set)].copy()
-        slim[out_ly_name] = pd.to_numeric(slim[ly_col], errors="coerce")
-        slim[out_ty_name] = pd.to_numeric(slim[ty_col], errors="coerce")
-        return slim[["Location", out_ly_name, out_ty_name]].copy()
-
-    written_df = _block(
-        df_val,
-        "Divisions",
-        "2024 Income Written",
-        "2025 Income Written",
-        "Written LY",
-        "Written Current",
-    )
-
-    produced_div_col = "Divisions.1" if "Divisions.1" in df_val.columns else "Divisions"
-    produced_df = _block(
-        df_val,
-        produced_div_col,
-        "2024 Income Produced",
-        "2025 Income Produced",
-        "Produced LY",
-        "Produced Current",
-    )
-
-    invoiced_div_col = "Divisions.2" if "Divisions.2" in df_val.columns else "Divisions"
-    invoiced_df = _block(
-        df_val,
-        invoiced_div_col,
-        "2024 Net Income Invoiced",
-        "2025 Net Income Invoiced",
-        "Invoiced LY",
-        "Invoiced Current",
-    )
-
-    out_df = written_df.merge(produced_df, on="Location", how="outer").merge(invoiced_df, on="Location", how="outer")
-    out_df = out_df.dropna(subset=["Location"]).copy()
-
-    out_df["__sort"] = out_df["Location"].astype(str).str.strip().str.lower().apply(
-        lambda x: 9999 if x == "grand total" else 0
-    )
-    out_df = out_df.sort_values(["__sort", "Location"]).drop(columns=["__sort"]).reset_index(drop=True)
-
-    return out_df
-
-# Note: these are intentionally simple "read sheet and write parquet" builders.
-# If you already have more specific logic for these in your existing repo, keep yours.
-def _build_landing_plan_df(workbook_path_obj):
-    sheet_name = "YTD Plan vs Act"
-    header_row_idx = _detect_header_row(workbook_path_obj, sheet_name)
-    raw_df = _read_sheet_cached(str(workbook_path_obj), sheet_name, header_row_idx)
-    df_val = raw_df.copy().dropna(axis=0, how="all")
-    return df_val.reset_index(drop=True)
-
-def _build_trend_weekly_df(workbook_path_obj):
-    sheet_name = "Written and Produced by Week"
-    header_row_idx = _detect_header_row(workbook_path_obj, sheet_name)
-    raw_df = _read_sheet_cached(str(workbook_path_obj), sheet_name, header_row_idx)
-    df_val = raw_df.copy().dropna(axis=0, how="all")
-    return df_val.reset_index(drop=True)
-
-def _build_wip_df(workbook_path_obj):
-    sheet_name = "WIP"
-    header_row_idx = _detect_header_row(workbook_path_obj, sheet_name)
-    raw_df = _read_sheet_cached(str(workbook_path_obj), sheet_name, header_row_idx)
-    df_val = raw_df.copy().dropna(axis=0, how="all")
-    return df_val.reset_index(drop=True)
-
-def _build_color_yards_df(workbook_path_obj):
-    sheet_name = "Color Yards"
-    header_row_idx = _detect_header_row(workbook_path_obj, sheet_name)
-    raw_df = _read_sheet_cached(str(workbook_path_obj), sheet_name, header_row_idx)
-    df_val = raw_df.copy().dropna(axis=0, how="all")
-    return df_val.reset_index(drop=True)
-
-def _build_yards_wasted_df(workbook_path_obj):
-    sheet_name = "Yards Wasted"
-    header_row_idx = _detect_header_row(workbook_path_obj, sheet_name)
-    raw_df = _read_sheet_cached(str(workbook_path_obj), sheet_name, header_row_idx)
-    df_val = raw_df.copy().dropna(axis=0, how="all")
-    return df_val.reset_index(drop=True)
-
-def _write_all_parquets(workbook_path_obj):
-    plan_df_val = _build_landing_plan_df(workbook_path_obj)
-    ly_df_val = _build_landing_vs_ly_df(workbook_path_obj)
-    trend_df_val = _build_trend_weekly_df(workbook_path_obj)
-    wip_df_val = _build_wip_df(workbook_path_obj)
-    color_df_val = _build_color_yards_df(workbook_path_obj)
-    wasted_df_val = _build_yards_wasted_df(workbook_path_obj)
-
-    plan_df_val = _write_parquet_safe(plan_df_val, PLAN_OUT_PATH)
-    ly_df_val = _write_parquet_safe(ly_df_val, LY_OUT_PATH)
-    trend_df_val = _write_parquet_safe(trend_df_val, TREND_OUT_PATH)
-    wip_df_val = _write_parquet_safe(wip_df_val, WIP_OUT_PATH)
-    color_df_val = _write_parquet_safe(color_df_val, COLOR_YARDS_OUT_PATH)
-    wasted_df_val = _write_parquet_safe(wasted_df_val, YARDS_WASTED_OUT_PATH)
-
-    return plan_df_val, ly_df_val, trend_df_val, wip_df_val, color_df_val, wasted_df_val
+st.write("Queue a sync + parquet build on the background worker. Dashboards keep serving the current parquets meanwhile.")
+force_rebuild = st.checkbox("Force rebuild", value=False, help="Rebuild even if the workbook is unchanged")
+col_a, col_b = st.columns(2)
+with col_a:
+    if st.button("Refresh now", type="primary"):
+        worker.trigger(force=force_rebuild)
+        st.info("Refresh queued. Use Update status to follow it.")
+with col_b:
+    st.button("Update status")
 
 st.markdown("#### Workbook")
-with st.spinner("Checking workbook..."):
-    workbook_path_str = ensure_latest_workbook()
-workbook_path_obj = Path(workbook_path_str)
-
-st.write("Using workbook")
+workbook_path_obj = DEST_PATH
 st.code(str(workbook_path_obj))
 
 if not workbook_path_obj.exists():
-    st.error("Workbook not found at " + str(workbook_path_obj))
+    st.warning("No workbook downloaded yet. The background refresh fetches it.")
     st.stop()
 
 st.markdown("#### Parquet build")
-st.write("Click to generate all parquet files used by the dashboard pages.")
-build_clicked = st.button("Build parquets", type="primary")
-
-if build_clicked:
-    with st.spinner("Building parquets..."):
-        plan_df, ly_df, trend_df, wip_df, color_df, wasted_df = _write_all_parquets(workbook_path_obj)
-
-    st.success("Parquets written successfully.")
-
-    st.markdown("#### Outputs preview")
-    st.write(PLAN_OUT_PATH)
-    st.dataframe(plan_df, width="stretch")
-
-    st.write(LY_OUT_PATH)
-    st.dataframe(ly_df, width="stretch")
-
-    st.write(TREND_OUT_PATH)
-    st.dataframe(trend_df.head(30), width="stretch")
-
-    st.write(WIP_OUT_PATH)
-    st.dataframe(wip_df.head(30), width="stretch")
-
-    st.write(COLOR_YARDS_OUT_PATH)
-    st.dataframe(color_df.head(30), width="stretch")
+build_status = output_status(workbook_path_obj)
+if build_status["fresh"]:
+    built_at = pd.to_datetime(build_status["manifest"].get("built_at"), unit="s")
+    if build_status["same_workbook"]:
+        st.success("Outputs are fresh: built from this exact workbook (sha256 match) at " + str(built_at) + " (UTC).")
+    else:
+        st.success(
+            "Outputs are fresh: the workbook parts they read have the same per-part CRC32 fingerprints as at the build at "
+            + str(built_at)
+            + " (UTC). The workbook file itself has changed since (other sheets, or a re-save)."
+        )
+else:
+    st.warning(
+        str(len(build_status["stale_outputs"]))
+        + " of "
+        + str(len(ALL_OUT_PATHS))
+        + " outputs are stale: "
+        + "; ".join(build_status["reasons"])
+    )
+st.caption("Workbook sha256 " + build_status["workbook_sha256"])
 
-    st.write(YARDS_WASTED_OUT_PATH)
-    st.dataframe(wasted_df.head(30), width="stretch")
+with st.expander("Output generations"):
+    st.caption(
+        "Each build is written to its own directory and published by swapping the CURRENT pointer. "
+        "Rolling back points it at the previous generation; the next refresh rebuilds whatever is stale."
+    )
+    st.dataframe(pd.DataFrame(generations_report()), width="stretch")
+    if st.button("Roll back", disabled=previous_generation() is None):
+        st.info("CURRENT -> " + str(rollback()))
+
+with st.expander("Outputs preview"):
+    for out_path in ALL_OUT_PATHS:
+        st.write(out_path)
+        out_df = read_parquet(out_path)
+        if out_df is None:
+            st.caption("not built yet")
+        elif out_path in (PLAN_OUT_PATH, LY_OUT_PATH):
+            st.dataframe(out_df, width="stretch")
+        else:
+            st.dataframe(out_df.head(30), width="stretch")
+
+with st.expander("Partitioned datasets"):
+    st.caption(
+        "Per-location / per-division reads only open the matching partition directory (app_data.read_partitioned). "
+        "Partitions are the pivot's row labels as they are: subtotals such as \"Division 005 Total\" and "
+        "\"Grand Total\" are partitions of their own, not part of \"Division 005\"."
+    )
+    part_out = st.selectbox("Output", list(OUTPUT_PARTITIONS.keys()))
+    dataset_info = dataset_partitions(part_out)
+    if dataset_info is None:
+        st.caption("No partitioned dataset in the current generation yet")
+    else:
+        partitions, n_unpartitioned = dataset_info
+        st.write(str(len(partitions)) + " partition(s) by " + ", ".join(OUTPUT_PARTITIONS[part_out]))
+        if n_unpartitioned > 0:
+            st.caption(str(n_unpartitioned) + " row(s) with no partition value (such as an undated Grand Total) are only in the parquet.")
+        labels = [", ".join(str(k) + "=" + str(v) for k, v in p.items()) or "(not partitioned)" for p in partitions]
+        pick = st.selectbox("Partition", range(len(partitions)), format_func=lambda i: labels[i])
+        if pick is not None:
+            st.dataframe(read_partitioned(part_out, partitions[pick] or None).head(30), width="stretch")
+
+with st.expander("Parquet schema and size"):
+    st.caption("Typed columns per output, and what the typed schema saves over casting every text column to str.")
+    out_frames = {p: read_parquet(p) for p in ALL_OUT_PATHS}
+    out_frames = {p: df_val for p, df_val in out_frames.items() if df_val is not None}
+    for out_path, out_df in out_frames.items():
+        st.write(out_path + ": " + ", ".join(str(c) + " " + str(t) for c, t in out_df.dtypes.items()))
+    if st.button("Compare sizes", help="Re-runs the builders on the current workbook; takes as long as a build"):
+        with WorkbookSession(workbook_path_obj) as session:
+            built_frames = {p: OUTPUT_BUILDERS[p](session) for p in ALL_OUT_PATHS}
+        st.dataframe(size_report(built_frames), width="stretch")
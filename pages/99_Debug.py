@@ -1,10 +1,116 @@
 import streamlit as st
 from pathlib import Path
 import traceback
+import altair as alt
+
+from content_cache import get_content_cache
+from sheet_cache import get_sheet_disk_cache
+from refresh_worker import get_refresh_worker, render_refresh_status
+from table_store import get_table_store
+from tracing import export_jsonl, recent_runs, run_spans, set_tracing, tracing_enabled
 
 st.set_page_config(page_title="Debug", layout="wide")
 st.title("Debug")
 
+st.subheader("Background refresh")
+render_refresh_status(get_refresh_worker())
+
+st.subheader("Table store")
+store_report = get_table_store().memory_report()
+st.write(
+    "Generations held: "
+    + str(store_report.shape[0])
+    + " · total MB: "
+    + str(round(float(store_report["mb"].sum()), 2))
+)
+st.dataframe(store_report, width="stretch")
+
+st.subheader("Content cache")
+content_cache = get_content_cache()
+cache_stats = content_cache.stats()
+c1, c2, c3, c4, c5 = st.columns(5)
+with c1:
+    st.metric("Hits", cache_stats["hits"])
+with c2:
+    st.metric("Misses", cache_stats["misses"])
+with c3:
+    st.metric("Evictions", cache_stats["evictions"])
+with c4:
+    st.metric("Invalidations", cache_stats["invalidations"])
+with c5:
+    st.metric("Size", str(cache_stats["mb"]) + " / " + str(cache_stats["budget_mb"]) + " MB")
+st.caption(
+    "Entries: "
+    + str(cache_stats["entries"])
+    + " · hit rate: "
+    + str(cache_stats["hit_rate"])
+    + " · too large to cache: "
+    + str(cache_stats["oversize"])
+    + " · generation: "
+    + str(cache_stats["generation"])
+)
+st.dataframe(content_cache.entries_report(), width="stretch")
+if st.button("Clear content cache"):
+    content_cache.clear()
+    st.rerun()
+
+st.subheader("Sheet disk cache")
+sheet_cache = get_sheet_disk_cache()
+sheet_stats = sheet_cache.stats()
+st.write(
+    str(sheet_stats["files"])
+    + " cleaned sheet(s), "
+    + str(sheet_stats["mb"])
+    + " / "
+    + str(sheet_stats["budget_mb"])
+    + " MB in "
+    + sheet_stats["dir"]
+    + " · hits "
+    + str(sheet_stats["hits"])
+    + " · misses "
+    + str(sheet_stats["misses"])
+    + " · evictions "
+    + str(sheet_stats["evictions"])
+)
+if st.button("Clear sheet disk cache"):
+    st.success("Removed " + str(sheet_cache.clear()) + " cached sheet(s). The next table load parses the workbook again.")
+
+st.subheader("Tracing")
+trace_on = st.checkbox("Record spans (process-wide)", value=tracing_enabled())
+if trace_on != tracing_enabled():
+    set_tracing(trace_on)
+
+runs_df = recent_runs()
+if runs_df.empty:
+    st.caption("No spans recorded yet. Turn recording on, then open a page or run a refresh.")
+else:
+    run_labels = [
+        str(r.started) + "  " + str(r.name) + "  (" + str(round(r.wall_ms, 1)) + " ms, " + str(r.thread) + ")"
+        for r in runs_df.itertuples()
+    ]
+    run_pick = st.selectbox("Run", options=list(range(len(run_labels))), format_func=lambda i: run_labels[i])
+    spans_df = run_spans(int(runs_df["run_id"].iloc[int(run_pick)]))
+
+    # Waterfall: one bar per span from its start offset to its end, nested spans indented
+    waterfall = (
+        alt.Chart(spans_df)
+        .mark_bar()
+        .encode(
+            x=alt.X("offset_ms:Q", title="ms since run start"),
+            x2="end_ms:Q",
+            y=alt.Y("label:N", sort=None, title=None),
+            color=alt.Color("depth:N", legend=None),
+            tooltip=["name", "wall_ms", "cpu_ms", "rss_peak_delta_kb", "error"],
+        )
+        .properties(height=max(120, 22 * int(spans_df.shape[0])))
+    )
+    st.altair_chart(waterfall, width="stretch")
+    st.dataframe(
+        spans_df[["label", "offset_ms", "wall_ms", "cpu_ms", "rss_peak_delta_kb", "thread", "error", "attrs"]],
+        width="stretch",
+    )
+    st.download_button("Download spans (JSON lines)", data=export_jsonl(), file_name="spans.jsonl")
+
 target_path = Path("pages/00_Landing_YTD.py")
 st.write("Reading file")
 st.code(str(target_path))
@@ -0,0 +1,273 @@
+"""
+Typed, compact schemas for the built parquets.
+
+Builder outputs come straight from pivot sheets, so their object columns mix numbers and
+text (Weeks holds 1, 2, ... next to "1 Total" and "Grand Total"). Instead of casting those
+to strings, typed_frame() picks a type per column:
+
+- numbers are downcast without loss (smallest integer type, float32 when every value
+  round-trips exactly, float64 otherwise); whole-number columns with gaps become nullable
+  integers (Int8 ... Int64), stored by Arrow as integers with a null bitmap
+- mixed columns that are mostly numbers are split into the typed value plus a
+  "<col> Label" column holding the text part ("Total", "Grand Total"), null on plain rows
+- low-cardinality text (Location, Divisions, statuses) becomes a dictionary / category
+- everything else is a plain string
+
+The frame is written with the matching explicit Arrow schema, so pandas reads back the
+same dtypes and pages need no coercion.
+"""
+from pathlib import Path
+import datetime
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+LABEL_SUFFIX = " Label"
+
+# A mixed column is split into value + label when at least this share of its values has a number
+NUMERIC_MIN_SHARE = 0.5
+
+# Text columns with few distinct values are dictionary-encoded
+CATEGORY_MAX_UNIQUE = 2000
+CATEGORY_MAX_RATIO = 0.5
+
+# Write options: zstd is smaller than the default snappy at similar read speed, and row
+# groups of 64k rows keep per-group min/max statistics useful for filter pushdown
+PARQUET_COMPRESSION = "zstd"
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+
+# Partitioned datasets: the partition columns are recorded in this file inside the dataset
+# directory (pyarrow skips names starting with "_" when scanning)
+DATASET_PARTITIONING_FILE = "_partitioning.json"
+DATASET_MAX_PARTITIONS = 4096
+
+# "12", "1 Total", "-3.5 (adj)": a leading number, then the label text
+_LEADING_NUMBER_RE = r"^\s*([-+]?\d+(?:\.\d+)?)(?:\s+(.*?))?\s*$"
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+def _downcast_numeric(values):
+    # float64 ndarray -> the smallest dtype that holds every value exactly. Whole numbers
+    # with NaN gaps (Weeks once its "Total" rows are split off) become a nullable integer
+    missing = np.isnan(values)
+    finite = values[~missing]
+    if finite.shape[0] > 0 and np.isfinite(finite).all() and np.array_equal(finite, np.floor(finite)):
+        lo, hi = finite.min(), finite.max()
+        for int_type in _INT_TYPES:
+            info = np.iinfo(int_type)
+            if info.min <= lo and hi <= info.max:
+                if not missing.any():
+                    return values.astype(int_type)
+                return pd.arrays.IntegerArray(np.where(missing, 0, values).astype(int_type), missing)
+    as_f32 = values.astype(np.float32)
+    with np.errstate(invalid="ignore"):
+        exact = np.array_equal(as_f32.astype(np.float64), values, equal_nan=True)
+    return as_f32 if exact else values
+
+def _text_column(ser):
+    # Strings (or None), stripped; "", "none", "nat", "nan" are missing like the old string cast
+    text_ser = ser.astype(object).where(ser.notna(), None)
+    text_ser = text_ser.map(lambda x: None if x is None else str(x).strip(), na_action="ignore")
+    missing = text_ser.isna() | text_ser.str.lower().isin(["", "none", "nat", "nan"])
+    return text_ser.where(~missing, None)
+
+def _as_text_dtype(text_ser):
+    non_null = text_ser.dropna()
+    n_unique = int(non_null.nunique())
+    if non_null.shape[0] > 0 and n_unique <= CATEGORY_MAX_UNIQUE and n_unique <= CATEGORY_MAX_RATIO * non_null.shape[0]:
+        return text_ser.astype("category")
+    return text_ser
+
+def _is_datetime_like(non_null):
+    return non_null.shape[0] > 0 and all(
+        isinstance(x, (datetime.datetime, datetime.date, pd.Timestamp)) and not isinstance(x, datetime.time)
+        for x in non_null
+    )
+
+def _split_numeric_label(ser):
+    """(values as float64 ndarray, labels as object Series or None) for a mixed column."""
+    numeric = pd.to_numeric(ser, errors="coerce")
+    text_ser = _text_column(ser.where(numeric.isna()))
+    parts = text_ser.str.extract(_LEADING_NUMBER_RE)
+    lead = pd.to_numeric(parts[0], errors="coerce")
+
+    values = numeric.fillna(lead).to_numpy(dtype=np.float64, na_value=np.nan)
+    # Rows with no leading number keep their whole text as the label
+    labels = parts[1].where(lead.notna(), text_ser)
+    labels = labels.where(labels.notna() & (labels.astype(object) != ""), None)
+    if labels.notna().sum() == 0:
+        labels = None
+    return values, labels
+
+def _typed_column(ser):
+    """[(name suffix, typed Series)]: one entry, or two for a value + label split."""
+    if pd.api.types.is_bool_dtype(ser) or pd.api.types.is_datetime64_any_dtype(ser):
+        return [("", ser)]
+    if pd.api.types.is_numeric_dtype(ser):
+        values = ser.to_numpy(dtype=np.float64, na_value=np.nan)
+        return [("", pd.Series(_downcast_numeric(values), index=ser.index))]
+
+    non_null = ser.dropna()
+    if non_null.shape[0] > 0 and all(isinstance(x, (bool, np.bool_)) for x in non_null) and non_null.shape[0] == ser.shape[0]:
+        return [("", ser.astype(bool))]
+    if _is_datetime_like(non_null):
+        return [("", pd.to_datetime(ser, errors="coerce"))]
+
+    values, labels = _split_numeric_label(ser)
+    n_values = int(np.isfinite(values).sum())
+    if non_null.shape[0] > 0 and n_values >= NUMERIC_MIN_SHARE * non_null.shape[0]:
+        out = [("", pd.Series(_downcast_numeric(values), index=ser.index))]
+        if labels is not None:
+            out.append((LABEL_SUFFIX, _as_text_dtype(labels)))
+        return out
+    return [("", _as_text_dtype(_text_column(ser)))]
+
+def _arrow_type(ser):
+    if isinstance(ser.dtype, pd.CategoricalDtype):
+        return pa.dictionary(pa.int32(), pa.string())
+    if pd.api.types.is_string_dtype(ser.dtype) or ser.dtype == object:
+        return pa.string()
+    if pd.api.types.is_datetime64_any_dtype(ser.dtype):
+        return pa.from_numpy_dtype(ser.dtype) if ser.dt.tz is None else pa.timestamp(ser.dt.unit, tz=str(ser.dt.tz))
+    if pd.api.types.is_extension_array_dtype(ser.dtype) and ser.dtype.kind in "iu":
+        # Nullable Int8 ... Int64: Arrow integers with a null bitmap
+        return pa.from_numpy_dtype(ser.dtype.numpy_dtype)
+    return pa.from_numpy_dtype(ser.dtype)
+
+def typed_frame(df_val):
+    """
+    (typed copy of df_val, matching pyarrow schema). Column names become strings; a split
+    column keeps its name for the value and adds "<col> Label" right after it (unless the
+    frame already has a column by that name, in which case the column stays text).
+    """
+    out_cols = {}
+    existing = set(str(c) for c in df_val.columns)
+    for col_val in df_val.columns:
+        col_name = str(col_val)
+        parts = _typed_column(df_val[col_val].reset_index(drop=True))
+        if len(parts) == 2 and (col_name + LABEL_SUFFIX) in existing:
+            parts = [("", _as_text_dtype(_text_column(df_val[col_val].reset_index(drop=True))))]
+        for suffix, typed_ser in parts:
+            out_cols[col_name + suffix] = typed_ser
+
+    out_df = pd.DataFrame(out_cols, index=pd.RangeIndex(df_val.shape[0]))
+    schema = pa.schema([pa.field(name, _arrow_type(out_df[name]), nullable=True) for name in out_df.columns])
+    return out_df, schema
+
+def _partition_field(field):
+    # Directory names hold plain values, so a dictionary column partitions on its value type
+    if pa.types.is_dictionary(field.type):
+        return pa.field(field.name, field.type.value_type)
+    return field
+
+def dataset_partitioning(schema, partition_cols):
+    """Hive partitioning over the partition_cols present in schema, or None if there are none."""
+    fields = [_partition_field(schema.field(c)) for c in partition_cols if c in schema.names]
+    if len(fields) == 0:
+        return None
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+def write_partitioned_dataset(table, dataset_dir, partition_cols):
+    """
+    Writes table as a Hive-style dataset (dataset_dir/Location=Digital/part-0.parquet) so a
+    reader filtering on a partition column only opens the matching directories. Columns of
+    partition_cols the table does not have are skipped; with none left it is one file.
+
+    Rows with a missing partition value are left out rather than written to a
+    __HIVE_DEFAULT_PARTITION__ directory: they belong to no partition a page asks for (the
+    trend's undated Grand Total row). They stay in the parquet, and their count is recorded
+    as "rows_without_partition". Returns that count.
+    """
+    dataset_dir = Path(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    partitioning = dataset_partitioning(table.schema, partition_cols)
+    used_cols = [] if partitioning is None else partitioning.schema.names
+    n_dropped = 0
+    if len(used_cols) > 0:
+        has_value = pc.is_valid(table.column(used_cols[0]))
+        for col_name in used_cols[1:]:
+            has_value = pc.and_(has_value, pc.is_valid(table.column(col_name)))
+        n_dropped = table.num_rows - int(pc.sum(has_value).as_py() or 0)
+        if n_dropped > 0:
+            table = table.filter(has_value)
+        table = table.cast(
+            pa.schema(
+                [_partition_field(f) if f.name in used_cols else f for f in table.schema],
+                metadata=table.schema.metadata,
+            )
+        )
+    ds.write_dataset(
+        table,
+        str(dataset_dir),
+        format="parquet",
+        partitioning=partitioning,
+        file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+        max_rows_per_group=PARQUET_ROW_GROUP_ROWS,
+        max_partitions=DATASET_MAX_PARTITIONS,
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    (dataset_dir / DATASET_PARTITIONING_FILE).write_text(
+        json.dumps({"columns": used_cols, "rows_without_partition": n_dropped})
+    )
+    return n_dropped
+
+def write_typed_parquet(df_val, path_val, ipc_path=None, dataset_dir=None, partition_cols=()):
+    """
+    Writes df_val with its inferred schema; returns the typed frame that was written.
+    With ipc_path, the same table is also written there as an uncompressed Arrow IPC file,
+    which readers can memory-map instead of decoding (see app_data). With dataset_dir, it is
+    also written there as a dataset partitioned by partition_cols.
+    """
+    out_df, schema = typed_frame(df_val)
+    table = pa.Table.from_pandas(out_df, schema=schema, preserve_index=False)
+    pq.write_table(table, str(path_val), compression=PARQUET_COMPRESSION, row_group_size=PARQUET_ROW_GROUP_ROWS)
+    if ipc_path is not None:
+        with ipc.new_file(str(ipc_path), table.schema) as writer:
+            writer.write_table(table)
+    if dataset_dir is not None:
+        write_partitioned_dataset(table, dataset_dir, partition_cols)
+    return out_df
+
+def legacy_string_frame(df_val):
+    # The previous _make_parquet_safe: every object column cast to str (kept for size comparisons)
+    out_df = df_val.copy()
+    for col_val in out_df.columns:
+        if out_df[col_val].dtype == "object":
+            out_df[col_val] = out_df[col_val].astype(str)
+            out_df.loc[out_df[col_val].str.lower().isin(["", "none", "nat"]), col_val] = None
+    return out_df
+
+def _parquet_nbytes(df_val, schema=None):
+    buf = io.BytesIO()
+    table = pa.Table.from_pandas(df_val, schema=schema, preserve_index=False)
+    pq.write_table(table, buf, compression=PARQUET_COMPRESSION, row_group_size=PARQUET_ROW_GROUP_ROWS)
+    return buf.tell()
+
+def size_report(frames):
+    """
+    frames: {out_path: builder output}. One row per output comparing the legacy string
+    cast with the typed schema: in-memory size (deep) and parquet size, both in KB.
+    """
+    rows = []
+    for out_path, df_val in frames.items():
+        legacy_df = legacy_string_frame(df_val)
+        typed_df, schema = typed_frame(df_val)
+        rows.append(
+            {
+                "output": str(out_path),
+                "rows": int(df_val.shape[0]),
+                "mem_kb_before": round(legacy_df.memory_usage(index=True, deep=True).sum() / 1024, 1),
+                "mem_kb_after": round(typed_df.memory_usage(index=True, deep=True).sum() / 1024, 1),
+                "disk_kb_before": round(_parquet_nbytes(legacy_df) / 1024, 1),
+                "disk_kb_after": round(_parquet_nbytes(typed_df, schema) / 1024, 1),
+            }
+        )
+    return pd.DataFrame(rows)
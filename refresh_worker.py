@@ -0,0 +1,237 @@
+import threading
+import time
+import traceback
+import pandas as pd
+import streamlit as st
+
+from build_manifest import file_sha256
+from content_cache import get_content_cache
+from data_build import build_parquets_if_stale
+from data_loader import read_workbook_tables
+from data_sync import ensure_latest_workbook
+from table_store import get_table_store
+from tracing import span
+
+DEFAULT_INTERVAL_SECONDS = 900
+
+class RefreshStatus:
+    """
+    Last known state of the background refresh. Written by the worker thread and read by
+    any script run, so every access goes through a lock and readers get a copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {
+            "state": "idle",
+            "runs": 0,
+            "trigger": None,
+            "last_started_at": None,
+            "last_finished_at": None,
+            "last_ok_at": None,
+            "next_run_at": None,
+            "sync_seconds": None,
+            "build_seconds": None,
+            "load_seconds": None,
+            "generation": None,
+            "workbook_path": None,
+            "rebuilt": [],
+            "reused": [],
+            "last_error": None,
+        }
+
+    def update(self, **fields):
+        with self._lock:
+            self._state.update(fields)
+
+    def snapshot(self):
+        with self._lock:
+            snap = dict(self._state)
+        snap["rebuilt"] = list(snap["rebuilt"])
+        snap["reused"] = list(snap["reused"])
+        return snap
+
+class RefreshWorker:
+    """
+    Process-wide daemon thread that syncs the workbook, rebuilds stale parquets and, when
+    the workbook changed, loads its cleaned tables into the shared TableStore as a new
+    generation.
+
+    It runs once at start, then every interval_seconds (interval_seconds <= 0 means only on
+    trigger()). run_once() is single-flight: a call made while a refresh is in progress
+    returns False instead of starting a second download.
+    """
+
+    def __init__(
+        self,
+        interval_seconds=DEFAULT_INTERVAL_SECONDS,
+        sync_fn=None,
+        build_fn=None,
+        store=None,
+    ):
+        self.interval_seconds = float(interval_seconds)
+        self.status = RefreshStatus()
+        # Defaults are looked up per run so the module-level functions can be swapped out
+        self._sync_fn = sync_fn
+        self._build_fn = build_fn
+        self.store = store
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._force_pending = False
+        self._runs = 0
+        self._thread = threading.Thread(target=self._loop, name="refresh-worker", daemon=True)
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def trigger(self, force=False):
+        # Queues a run without waiting for it; a trigger during a run queues one more run
+        if force:
+            self._force_pending = True
+        self._wake.set()
+
+    def run_once(self, force=False, trigger="manual"):
+        if not self._run_lock.acquire(blocking=False):
+            return False
+        try:
+            with span("refresh.run", trigger=trigger, force=force):
+                self._run(force=force, trigger=trigger)
+        finally:
+            self._run_lock.release()
+        return True
+
+    def _run(self, force, trigger):
+        # Only ever called with _run_lock held
+        self._runs += 1
+        self.status.update(state="syncing", runs=self._runs, trigger=trigger, last_started_at=time.time())
+        try:
+            t0 = time.perf_counter()
+            workbook_path = (self._sync_fn or ensure_latest_workbook)()
+            sync_seconds = time.perf_counter() - t0
+            self.status.update(state="building", sync_seconds=sync_seconds, workbook_path=str(workbook_path))
+
+            t0 = time.perf_counter()
+            _, rebuilt, reused = (self._build_fn or build_parquets_if_stale)(workbook_path, force=force, return_frames=False)
+            build_seconds = time.perf_counter() - t0
+            self.status.update(state="loading", build_seconds=build_seconds, rebuilt=rebuilt, reused=reused)
+
+            t0 = time.perf_counter()
+            generation_id = self._publish_tables(workbook_path)
+            load_seconds = time.perf_counter() - t0
+            if generation_id is not None:
+                # Cached tables of older workbooks can no longer be asked for by any page
+                get_content_cache().set_generation(generation_id)
+
+            finished_at = time.time()
+            self.status.update(
+                state="ok",
+                load_seconds=load_seconds,
+                generation=generation_id,
+                last_finished_at=finished_at,
+                last_ok_at=finished_at,
+                last_error=None,
+            )
+        except Exception:
+            self.status.update(state="error", last_finished_at=time.time(), last_error=traceback.format_exc())
+
+    def _publish_tables(self, workbook_path):
+        # Tables are only re-read when the workbook bytes changed since the current generation
+        if self.store is None:
+            return None
+        generation_id = file_sha256(workbook_path)[:16]
+        if self.store.current_id == generation_id:
+            return generation_id
+        if self.store.has(generation_id):
+            self.store.make_current(generation_id)
+            return generation_id
+        with span("refresh.publish_tables", generation=generation_id):
+            tables, meta_df, _ = read_workbook_tables(workbook_path)
+        self.store.publish(generation_id, tables, meta_df=meta_df, workbook_path=workbook_path)
+        return generation_id
+
+    def _loop(self):
+        trigger = "startup"
+        while not self._stop.is_set():
+            force = self._force_pending
+            self._force_pending = False
+            self.run_once(force=force, trigger=trigger)
+
+            if self.interval_seconds > 0:
+                self.status.update(next_run_at=time.time() + self.interval_seconds)
+                woken = self._wake.wait(self.interval_seconds)
+            else:
+                self.status.update(next_run_at=None)
+                woken = self._wake.wait()
+            self._wake.clear()
+            trigger = "manual" if woken else "schedule"
+
+def _interval_from_secrets():
+    try:
+        return float(st.secrets.get("REFRESH_INTERVAL_SECONDS", DEFAULT_INTERVAL_SECONDS))
+    except Exception:
+        return float(DEFAULT_INTERVAL_SECONDS)
+
+@st.cache_resource(show_spinner=False)
+def get_refresh_worker():
+    """
+    Starts the refresh worker once per process; every session and page gets the same one.
+    The poll interval comes from st.secrets["REFRESH_INTERVAL_SECONDS"] (default 900).
+    """
+    return RefreshWorker(interval_seconds=_interval_from_secrets(), store=get_table_store()).start()
+
+def _fmt_ts(ts_val):
+    if ts_val is None:
+        return "never"
+    return str(pd.to_datetime(ts_val, unit="s").floor("s")) + " UTC"
+
+def _fmt_secs(secs_val):
+    if secs_val is None:
+        return "—"
+    return str(round(float(secs_val), 2)) + " s"
+
+def render_refresh_status(worker):
+    snap = worker.status.snapshot()
+
+    c1, c2, c3, c4, c5 = st.columns(5)
+    with c1:
+        st.metric("Refresh state", snap["state"])
+    with c2:
+        st.metric("Sync", _fmt_secs(snap["sync_seconds"]))
+    with c3:
+        st.metric("Build", _fmt_secs(snap["build_seconds"]))
+    with c4:
+        st.metric("Table load", _fmt_secs(snap["load_seconds"]))
+    with c5:
+        st.metric("Runs", int(snap["runs"]))
+
+    st.caption(
+        "Last success "
+        + _fmt_ts(snap["last_ok_at"])
+        + " · last run "
+        + _fmt_ts(snap["last_started_at"])
+        + " ("
+        + str(snap["trigger"])
+        + ") · table generation "
+        + str(snap["generation"])
+        + " · next scheduled "
+        + (_fmt_ts(snap["next_run_at"]) if snap["next_run_at"] is not None else "on demand")
+        + (" · worker thread is not running" if not worker.is_alive() else "")
+    )
+    if snap["rebuilt"]:
+        st.write("Rebuilt: " + ", ".join(snap["rebuilt"]))
+    if snap["reused"]:
+        st.write("Reused (inputs unchanged): " + ", ".join(snap["reused"]))
+    if snap["last_error"] is not None:
+        st.error("Last refresh failed")
+        st.code(snap["last_error"])
+    return snap
@@ -0,0 +1,346 @@
+"""
+On-disk cache of cleaned sheets, so a restart or redeploy does not parse the xlsx again.
+
+Each cleaned sheet is stored as one Arrow IPC file under data/sheet_cache/, named by a
+sha256 over:
+- the fingerprints of the zip parts its values come from (worksheet part, sharedStrings,
+  styles, the 1900/1904 date system; see xlsx_reader.sheet_input_fingerprints)
+- the cleaning parameters (min_text_cells, remove_pivot_totals, backend)
+- CLEANER_VERSION
+
+Files are read back through a memory map. Cleaned pivot sheets keep pandas' object
+columns that mix numbers and text, so such a column is stored as a type tag per cell plus
+one typed Arrow column per value type present. Decoding rebuilds the same Python values
+with numpy masks, without a per-cell loop. Duplicate column labels and non-range indexes
+round-trip too. numpy scalars and pd.Timestamp cells come back as the matching int /
+float / bool / datetime. A sheet with any other cell type is not cached: nothing read
+from the cache directory is ever unpickled.
+
+The directory is kept under a byte budget: reads touch a file's mtime, and writes evict
+the least recently used files beyond the budget.
+
+    python -m sheet_cache              # file count and size
+    python -m sheet_cache --clear
+    python -m sheet_cache --max-mb 100
+"""
+from pathlib import Path
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from xlsx_reader import sheet_input_fingerprints
+
+SHEET_CACHE_DIR = Path("data/sheet_cache")
+DEFAULT_MAX_MB = 512
+
+# Bump whenever clean_pivot_export_frame's output changes for the same sheet
+CLEANER_VERSION = 1
+
+# 2: no pickled cells
+FORMAT_VERSION = 2
+FILE_SUFFIX = ".arrow"
+
+# Per-cell type tags of object columns; a column with any other cell type is not stored
+_TAG_NONE, _TAG_INT, _TAG_FLOAT, _TAG_STR, _TAG_BOOL, _TAG_DATETIME = range(6)
+_TAG_UNSUPPORTED = -1
+_TAG_OF_TYPE = {
+    type(None): _TAG_NONE,
+    int: _TAG_INT,
+    float: _TAG_FLOAT,
+    str: _TAG_STR,
+    bool: _TAG_BOOL,
+    datetime.datetime: _TAG_DATETIME,
+}
+_ARROW_TYPE_OF_TAG = {
+    _TAG_INT: pa.int64(),
+    _TAG_FLOAT: pa.float64(),
+    _TAG_STR: pa.string(),
+    _TAG_BOOL: pa.bool_(),
+    _TAG_DATETIME: pa.timestamp("us"),
+}
+
+def _max_bytes_from_env():
+    try:
+        return int(float(os.environ.get("SHEET_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_MAX_MB * 1024 * 1024
+
+def sheet_cache_keys(excel_path, sheet_names, params):
+    """{sheet_name: cache key} for the sheets present in the workbook; params must be JSON-able."""
+    keys = {}
+    for sheet_name, inputs in sheet_input_fingerprints(excel_path, sheet_names).items():
+        if inputs is None:
+            continue
+        payload = {"inputs": inputs, "params": params, "cleaner_version": CLEANER_VERSION}
+        keys[sheet_name] = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+    return keys
+
+def _cell_tag(x):
+    tag = _TAG_OF_TYPE.get(type(x))
+    if tag is not None:
+        return tag
+    # numpy scalars (np.float64 subclasses float, so the exact-type lookup misses it too)
+    if isinstance(x, np.bool_):
+        return _TAG_BOOL
+    if isinstance(x, np.integer):
+        return _TAG_INT
+    if isinstance(x, (np.float16, np.float32, np.float64)):
+        return _TAG_FLOAT
+    # Stored at microsecond precision without a timezone, so only those round-trip
+    if isinstance(x, pd.Timestamp) and x.tz is None and x.nanosecond == 0:
+        return _TAG_DATETIME
+    return _TAG_UNSUPPORTED
+
+def _encode_object_column(values, prefix):
+    # [(field name, arrow array)] for one object column: the tag column plus one per value
+    # type; None if a cell has no tag or an int does not fit int64
+    n_rows = values.shape[0]
+    tags = np.fromiter((_cell_tag(x) for x in values), dtype=np.int8, count=n_rows)
+    if (tags == _TAG_UNSUPPORTED).any():
+        return None
+    if (tags == _TAG_INT).any():
+        ints = values[tags == _TAG_INT]
+        if any(x < -(2**63) or x >= 2**63 for x in ints):
+            return None
+
+    fields = [(prefix + ".tag", pa.array(tags, type=pa.int8()))]
+    for tag in np.unique(tags):
+        tag = int(tag)
+        if tag == _TAG_NONE:
+            continue
+        mask = tags == tag
+        cells = np.where(mask, values, None)
+        fields.append((prefix + "." + str(tag), pa.array(cells, type=_ARROW_TYPE_OF_TAG[tag])))
+    return fields
+
+def _decode_object_column(table, prefix, n_rows):
+    tags = table.column(prefix + ".tag").to_numpy()
+    out = np.empty(n_rows, dtype=object)
+    out[:] = None
+    for tag in np.unique(tags):
+        tag = int(tag)
+        if tag == _TAG_NONE:
+            continue
+        mask = tags == tag
+        col = table.column(prefix + "." + str(tag))
+        if tag == _TAG_STR:
+            out[mask] = col.to_numpy(zero_copy_only=False)[mask]
+        elif tag == _TAG_DATETIME:
+            out[mask] = col.fill_null(0).to_numpy().astype(object)[mask]
+        else:
+            # Assigning into an object array turns numpy scalars back into int / float / bool
+            fill_val = False if tag == _TAG_BOOL else 0
+            out[mask] = col.fill_null(fill_val).to_numpy(zero_copy_only=False)[mask]
+    return out
+
+def _is_native(ser):
+    dtype = ser.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return getattr(dtype, "tz", None) is None
+    return dtype.kind in "biuf" or pd.api.types.is_string_dtype(dtype) and dtype != object
+
+def encode_frame(df_val):
+    """Arrow table for df_val, or None if a column or the index cannot be stored exactly."""
+    if not all(type(c) is str for c in df_val.columns):
+        return None
+    n_rows = int(df_val.shape[0])
+    fields = []
+    encodings = []
+    for j in range(df_val.shape[1]):
+        ser = df_val.iloc[:, j]
+        prefix = "c" + str(j)
+        if ser.dtype == object:
+            object_fields = _encode_object_column(ser.to_numpy(), prefix)
+            if object_fields is None:
+                return None
+            fields.extend(object_fields)
+            encodings.append("object")
+        elif _is_native(ser):
+            fields.append((prefix, pa.Array.from_pandas(ser)))
+            encodings.append(str(ser.dtype))
+        else:
+            return None
+
+    index_val = df_val.index
+    if isinstance(index_val, pd.RangeIndex) and index_val.start == 0 and index_val.step == 1:
+        index_kind = "range"
+    elif pd.api.types.is_integer_dtype(index_val.dtype):
+        fields.append(("__index__", pa.array(index_val.to_numpy(dtype=np.int64))))
+        index_kind = "int64"
+    else:
+        return None
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "rows": n_rows,
+        "columns": list(df_val.columns),
+        "encodings": encodings,
+        "index": index_kind,
+    }
+    schema = pa.schema([pa.field(name, arr.type) for name, arr in fields], metadata={"sheet_cache": json.dumps(meta)})
+    return pa.Table.from_arrays([arr for _, arr in fields], schema=schema)
+
+def decode_table(table):
+    meta = json.loads(table.schema.metadata[b"sheet_cache"])
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError("sheet cache format " + str(meta.get("format_version")) + ", expected " + str(FORMAT_VERSION))
+    n_rows = int(meta["rows"])
+    if meta["index"] == "range":
+        index_val = pd.RangeIndex(n_rows)
+    else:
+        index_val = pd.Index(table.column("__index__").to_numpy(), dtype=np.int64)
+
+    cols = {}
+    for j, encoding in enumerate(meta["encodings"]):
+        prefix = "c" + str(j)
+        if encoding == "object":
+            cols[j] = pd.Series(_decode_object_column(table, prefix, n_rows), index=index_val, dtype=object)
+        else:
+            ser = table.column(prefix).to_pandas().astype(encoding)
+            ser.index = index_val
+            cols[j] = ser
+
+    # Built positionally so duplicate labels survive
+    df_val = pd.DataFrame(cols, index=index_val)
+    df_val.columns = pd.Index(meta["columns"])
+    return df_val
+
+class SheetDiskCache:
+    def __init__(self, cache_dir=SHEET_CACHE_DIR, max_bytes=None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = _max_bytes_from_env() if max_bytes is None else int(max_bytes)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "skipped": 0, "evictions": 0, "errors": 0}
+
+    def _path(self, key):
+        return self.cache_dir / (str(key) + FILE_SUFFIX)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key):
+        path_obj = self._path(key)
+        if not path_obj.exists():
+            self._count("misses")
+            return None
+        try:
+            # Memory-mapped: the Arrow buffers point into the page cache, nothing is copied up front
+            table = ipc.open_file(pa.memory_map(str(path_obj), "r")).read_all()
+            df_val = decode_table(table)
+        except Exception:
+            self._count("errors")
+            path_obj.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path_obj)
+        except OSError:
+            pass
+        self._count("hits")
+        return df_val
+
+    def put(self, key, df_val):
+        table = encode_frame(df_val)
+        if table is None:
+            self._count("skipped")
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path_obj = self._path(key)
+        tmp_path = path_obj.with_name(path_obj.name + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp")
+        try:
+            with ipc.new_file(str(tmp_path), table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, path_obj)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            self._count("errors")
+            return False
+        self._count("writes")
+        self.evict()
+        return True
+
+    def _files(self):
+        if not self.cache_dir.exists():
+            return []
+        out = []
+        for path_obj in self.cache_dir.glob("*" + FILE_SUFFIX):
+            try:
+                stat_val = path_obj.stat()
+            except FileNotFoundError:
+                continue
+            out.append((stat_val.st_mtime, stat_val.st_size, path_obj))
+        return out
+
+    def evict(self, max_bytes=None):
+        """Removes least recently used files until the directory fits max_bytes; returns how many."""
+        max_bytes = self.max_bytes if max_bytes is None else int(max_bytes)
+        files = sorted(self._files(), key=lambda f: f[0])
+        total = sum(f[1] for f in files)
+        removed = 0
+        for _, size_val, path_obj in files:
+            if total <= max_bytes:
+                break
+            path_obj.unlink(missing_ok=True)
+            total -= size_val
+            removed += 1
+        with self._lock:
+            self._counters["evictions"] += removed
+        return removed
+
+    def clear(self):
+        files = self._files()
+        for _, _, path_obj in files:
+            path_obj.unlink(missing_ok=True)
+        return len(files)
+
+    def stats(self):
+        files = self._files()
+        with self._lock:
+            out = dict(self._counters)
+        out.update(
+            {
+                "dir": str(self.cache_dir),
+                "files": len(files),
+                "mb": round(sum(f[1] for f in files) / (1024 * 1024), 2),
+                "budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+            }
+        )
+        return out
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_sheet_disk_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SheetDiskCache()
+        return _default_cache
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="On-disk cache of cleaned sheets")
+    parser.add_argument("--dir", default=str(SHEET_CACHE_DIR))
+    parser.add_argument("--clear", action="store_true", help="Delete every cached sheet")
+    parser.add_argument("--max-mb", type=float, default=None, help="Evict least recently used files down to this size")
+    args = parser.parse_args(argv)
+
+    cache = SheetDiskCache(cache_dir=args.dir)
+    if args.clear:
+        print("Removed " + str(cache.clear()) + " cached sheet(s) from " + args.dir)
+    if args.max_mb is not None:
+        print("Evicted " + str(cache.evict(max_bytes=args.max_mb * 1024 * 1024)) + " file(s)")
+    stats = cache.stats()
+    print(str(stats["files"]) + " file(s), " + str(stats["mb"]) + " MB in " + stats["dir"])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+from collections.abc import Mapping
+import threading
+import time
+import weakref
+import pandas as pd
+import streamlit as st
+
+# st.session_state key holding this session's GenerationHandle (the only per-session state)
+SESSION_HANDLE_KEY = "table_generation"
+
+PREVIEW_ROWS = 50
+
+def _column_nbytes(df_val):
+    # Deep memory per column (positional, so duplicate column names are fine) and of the index
+    try:
+        col_bytes = df_val.memory_usage(index=False, deep=True).to_numpy()
+        return [int(x) for x in col_bytes], int(df_val.index.memory_usage(deep=True))
+    except Exception:
+        return [0] * df_val.shape[1], 0
+
+def table_stats(df_val):
+    """
+    Table-level statistics computed once when a generation is published, so pages can show
+    shape, fill rate, per-column null counts, dtypes and memory without scanning the frame.
+    Shared across sessions: treat the dict and its frames as read-only.
+    """
+    n_rows, n_cols = int(df_val.shape[0]), int(df_val.shape[1])
+    non_null = df_val.notna().sum().to_numpy()
+    col_bytes, index_bytes = _column_nbytes(df_val)
+    cells = n_rows * n_cols
+    non_null_cells = int(non_null.sum()) if n_cols > 0 else 0
+
+    columns_df = pd.DataFrame(
+        {
+            "column": [str(c) for c in df_val.columns],
+            "dtype": [str(t) for t in df_val.dtypes],
+            "non_null": [int(x) for x in non_null],
+            "nulls": [n_rows - int(x) for x in non_null],
+            "fill_rate": [round(int(x) / n_rows, 4) if n_rows > 0 else 0.0 for x in non_null],
+            "kb": [round(b / 1024, 1) for b in col_bytes],
+        }
+    )
+    return {
+        "rows": n_rows,
+        "cols": n_cols,
+        "cells": cells,
+        "non_null_cells": non_null_cells,
+        "fill_rate": (non_null_cells / cells) if cells > 0 else 0.0,
+        "nbytes": sum(col_bytes) + index_bytes,
+        "columns_df": columns_df,
+        "preview_df": df_val.head(PREVIEW_ROWS),
+    }
+
+class ReadOnlyTables(Mapping):
+    """
+    Mapping view over a generation's tables. Lookups return shallow copies that share the
+    stored buffers. This relies on copy-on-write, which is always on from pandas 3.0
+    (requirements.txt pins pandas>=3.0): any change a page makes to its copy (new column,
+    in-place edit) lands in a private copy instead of the shared frame. On pandas 2.x
+    without copy-on-write, an in-place edit would change the frame for every session.
+    """
+
+    def __init__(self, tables):
+        self._tables = tables
+
+    def __getitem__(self, key):
+        return self._tables[key].copy(deep=False)
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self):
+        return len(self._tables)
+
+class GenerationHandle:
+    """
+    A session's reference to one published generation. The generation stays in the store
+    while any handle to it is alive; release() (or garbage collection of the handle when
+    the session ends) drops the reference.
+    """
+
+    def __init__(self, store, generation):
+        self.generation_id = generation["generation_id"]
+        self.workbook_path = generation["workbook_path"]
+        self.published_at = generation["published_at"]
+        self.meta_df = generation["meta_df"]
+        self.tables = ReadOnlyTables(generation["tables"])
+        # {table key: table_stats(...)}, computed at publish time
+        self.stats = generation["stats"]
+        # The finalizer must not reference self, only the store and the id
+        self._finalizer = weakref.finalize(self, store._release, self.generation_id)
+
+    def release(self):
+        self._finalizer()
+
+class TableStore:
+    """
+    Process-wide, read-only store of cleaned workbook tables keyed by generation
+    (a hash of the workbook they were loaded from). Each generation is held once no matter
+    how many sessions view it; a generation is dropped when it is no longer current and
+    no session handle references it.
+    """
+
+    def __init__(self):
+        # Re-entrant: a handle's finalizer can run from GC while this thread holds the lock
+        self._lock = threading.RLock()
+        self._generations = {}
+        self._refcounts = {}
+        self._current_id = None
+
+    @property
+    def current_id(self):
+        return self._current_id
+
+    def has(self, generation_id):
+        with self._lock:
+            return generation_id in self._generations
+
+    def publish(self, generation_id, tables, meta_df=None, workbook_path=None):
+        # Stats are computed here, once per generation, outside the lock
+        stats = {key: table_stats(df_val) for key, df_val in tables.items()}
+        nbytes = sum(s["nbytes"] for s in stats.values())
+        rows = sum(s["rows"] for s in stats.values())
+        with self._lock:
+            if generation_id not in self._generations:
+                self._generations[generation_id] = {
+                    "generation_id": generation_id,
+                    "tables": dict(tables),
+                    "stats": stats,
+                    "meta_df": meta_df,
+                    "workbook_path": None if workbook_path is None else str(workbook_path),
+                    "published_at": time.time(),
+                    "nbytes": nbytes,
+                    "rows": rows,
+                }
+                self._refcounts.setdefault(generation_id, 0)
+            self.make_current(generation_id)
+
+    def make_current(self, generation_id):
+        with self._lock:
+            if generation_id not in self._generations:
+                raise KeyError("Unknown table generation: " + str(generation_id))
+            previous_id = self._current_id
+            self._current_id = generation_id
+            if previous_id is not None and previous_id != generation_id:
+                self._drop_if_unused(previous_id)
+
+    def acquire(self, generation_id=None):
+        # Handle on the given generation (default: current), or None if it is not in the store
+        with self._lock:
+            if generation_id is None:
+                generation_id = self._current_id
+            if generation_id not in self._generations:
+                return None
+            self._refcounts[generation_id] += 1
+            return GenerationHandle(self, self._generations[generation_id])
+
+    def _release(self, generation_id):
+        with self._lock:
+            if generation_id not in self._refcounts:
+                return
+            self._refcounts[generation_id] = max(0, self._refcounts[generation_id] - 1)
+            self._drop_if_unused(generation_id)
+
+    def _drop_if_unused(self, generation_id):
+        if generation_id == self._current_id or self._refcounts.get(generation_id, 0) > 0:
+            return
+        self._generations.pop(generation_id, None)
+        self._refcounts.pop(generation_id, None)
+
+    def memory_report(self):
+        with self._lock:
+            rows = []
+            for generation_id, gen in self._generations.items():
+                rows.append(
+                    {
+                        "generation": generation_id,
+                        "current": generation_id == self._current_id,
+                        "sessions": int(self._refcounts.get(generation_id, 0)),
+                        "tables": len(gen["tables"]),
+                        "rows": gen["rows"],
+                        "mb": round(gen["nbytes"] / (1024 * 1024), 2),
+                        "published_at": pd.to_datetime(gen["published_at"], unit="s"),
+                        "workbook_path": gen["workbook_path"],
+                    }
+                )
+        return pd.DataFrame(
+            rows,
+            columns=["generation", "current", "sessions", "tables", "rows", "mb", "published_at", "workbook_path"],
+        )
+
+@st.cache_resource(show_spinner=False)
+def get_table_store():
+    return TableStore()
+
+def session_tables(store=None):
+    """
+    This session's handle on the current generation, or None if nothing is published yet.
+    A session still on an older generation moves to the current one on its next run and
+    releases the old handle, so old generations go away as sessions rerun or end.
+    """
+    if store is None:
+        store = get_table_store()
+
+    handle = st.session_state.get(SESSION_HANDLE_KEY)
+    if handle is not None and handle.generation_id == store.current_id:
+        return handle
+
+    new_handle = store.acquire()
+    if new_handle is None:
+        return handle
+
+    if handle is not None:
+        handle.release()
+    st.session_state[SESSION_HANDLE_KEY] = new_handle
+    return new_handle
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The app modules live at the repository root
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
@@ -0,0 +1,130 @@
+"""
+TableResolver must pick exactly the key the original nested-loop get_table picked, for
+every synonym and alias, including which key wins when several sheets match.
+"""
+import itertools
+
+import pytest
+
+from app_tables import TABLE_SYNONYMS, TableResolver, _norm_name, get_table
+
+def baseline_get_table(tables, desired_name):
+    # The nested loops get_table used before TableResolver, kept as the reference
+    desired_key = str(desired_name).strip().lower()
+    candidates = TABLE_SYNONYMS.get(desired_key, [desired_name])
+
+    for cand in candidates:
+        if cand in tables:
+            return tables[cand], cand
+
+    for cand in candidates:
+        cand_norm = _norm_name(cand)
+
+        for k in tables.keys():
+            if _norm_name(k) == cand_norm:
+                return tables[k], k
+
+        for k in tables.keys():
+            if cand_norm in _norm_name(k):
+                return tables[k], k
+
+    if desired_name in tables:
+        return tables[desired_name], desired_name
+
+    desired_norm = _norm_name(desired_name)
+
+    for k in tables.keys():
+        if _norm_name(k) == desired_norm:
+            return tables[k], k
+
+    for k in tables.keys():
+        if desired_norm in _norm_name(k):
+            return tables[k], k
+
+    return None, None
+
+# Sheet names as they appear in exports, plus near-misses that only match some passes
+SHEET_NAMES = [
+    "Written and Produced by Week",
+    "Written Produced Invoiced",
+    "YTD Plan vs Act",
+    "YTD vs LY",
+    "Color Yards",
+    "WIP",
+    "Yards Wasted",
+    "wip",
+    "Work in Progress (old)",
+    "Color",
+    "YTD Plan",
+    "Written Produced",
+    "Notes",
+    "---",
+]
+
+def _all_requests():
+    names = []
+    for key, aliases in TABLE_SYNONYMS.items():
+        names.append(key)
+        names.append(key.upper())
+        names.extend(aliases)
+    names.extend(SHEET_NAMES)
+    names.extend(["Unknown sheet", "zzz", "---", "", "  wip  ", "yards"])
+    return names
+
+def _tables(keys):
+    return {k: "df:" + k for k in keys}
+
+def _assert_same(tables, desired_name):
+    expected = baseline_get_table(tables, desired_name)
+    assert TableResolver(tables.keys()).resolve(desired_name) == expected[1]
+    assert get_table(tables, desired_name) == expected
+
+@pytest.mark.parametrize("desired_name", _all_requests())
+def test_matches_baseline_on_full_workbook(desired_name):
+    _assert_same(_tables(SHEET_NAMES), desired_name)
+
+@pytest.mark.parametrize("desired_name", _all_requests())
+def test_matches_baseline_in_reversed_key_order(desired_name):
+    _assert_same(_tables(list(reversed(SHEET_NAMES))), desired_name)
+
+@pytest.mark.parametrize(
+    "keys",
+    list(itertools.permutations(["Color Yards", "Color", "Color Yards Report"]))
+    + list(itertools.permutations(["WIP", "wip", "Work in Progress (old)"]))
+    + list(itertools.permutations(["YTD Plan vs Act", "YTD Plan", "Plan vs Actual YTD"])),
+)
+def test_first_key_wins_when_several_sheets_match(keys):
+    tables = _tables(keys)
+    for desired_name in ["color yds", "color", "wip", "WIP", "ytd plan v actual", "plan", "act"]:
+        _assert_same(tables, desired_name)
+
+def test_direct_key():
+    tables = _tables(["YTD vs LY", "ytd v ly"])
+    assert get_table(tables, "YTD vs LY") == ("df:YTD vs LY", "YTD vs LY")
+    _assert_same(tables, "YTD vs LY")
+
+def test_exact_normalized():
+    tables = _tables(["Notes", "Y.T.D.  vs  L.Y."])
+    assert get_table(tables, "ytd vs ly")[1] == "Y.T.D.  vs  L.Y."
+    _assert_same(tables, "ytd vs ly")
+
+def test_contains():
+    tables = _tables(["Notes", "Yards Wasted (2025)"])
+    assert get_table(tables, "yds wasted")[1] == "Yards Wasted (2025)"
+    _assert_same(tables, "yds wasted")
+
+def test_unknown_name():
+    tables = _tables(SHEET_NAMES[:-1])
+    assert get_table(tables, "Unknown sheet") == (None, None)
+    _assert_same(tables, "Unknown sheet")
+
+def test_empty_normalized_name_matches_first_key():
+    # "---" normalizes to "", which every normalized key contains
+    tables = _tables(["Notes", "WIP"])
+    assert get_table(tables, "---") == ("df:Notes", "Notes")
+    _assert_same(tables, "---")
+    _assert_same(_tables(["Notes", "***"]), "---")
+
+def test_empty_tables():
+    _assert_same({}, "wip")
+    _assert_same({}, "---")
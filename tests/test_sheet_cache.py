@@ -0,0 +1,129 @@
+"""
+The on-disk sheet cache must give back the cleaned frame it was given, cell for cell and
+type for type, store nothing it cannot give back exactly, and never decode a file written
+in an older format (format 1 could hold pickled cells).
+"""
+import datetime
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pytest
+
+from sheet_cache import FORMAT_VERSION, SheetDiskCache, decode_table, encode_frame
+
+# (cell, value and type it must come back as)
+MIXED_CELLS = [
+    (7, 7, int),
+    (-(2**63), -(2**63), int),
+    (2.5, 2.5, float),
+    ("Digital", "Digital", str),
+    (True, True, bool),
+    (None, None, type(None)),
+    (datetime.datetime(2024, 3, 1, 8, 30), datetime.datetime(2024, 3, 1, 8, 30), datetime.datetime),
+    (np.int32(12), 12, int),
+    (np.uint8(200), 200, int),
+    (np.float32(0.25), 0.25, float),
+    (np.float64(1.5), 1.5, float),
+    (np.bool_(False), False, bool),
+    (pd.Timestamp("2024-01-02 03:04:05.123456"), datetime.datetime(2024, 1, 2, 3, 4, 5, 123456), datetime.datetime),
+]
+
+def _round_trip(df_val):
+    table = encode_frame(df_val)
+    assert table is not None
+    return decode_table(table)
+
+def test_mixed_object_column_values_and_types():
+    df_val = pd.DataFrame(
+        {
+            "Location": pd.Series([cell for cell, _, _ in MIXED_CELLS], dtype=object),
+            "Written": np.arange(len(MIXED_CELLS), dtype=np.float64),
+        }
+    )
+    out = _round_trip(df_val)
+
+    assert out["Location"].dtype == object
+    for got, (_, want, want_type) in zip(out["Location"], MIXED_CELLS):
+        assert type(got) is want_type
+        assert got == want
+    pd.testing.assert_series_equal(out["Written"], df_val["Written"])
+
+def test_duplicate_labels_and_int_index():
+    cols = {0: pd.Series([1, 2], dtype=object), 1: pd.Series(["a", None], dtype=object)}
+    df_val = pd.DataFrame(cols).set_axis([5, 9]).set_axis(["Measure", "Measure"], axis=1)
+    out = _round_trip(df_val)
+
+    assert list(out.columns) == ["Measure", "Measure"]
+    assert list(out.index) == [5, 9]
+    assert out.iloc[:, 0].tolist() == [1, 2]
+    assert out.iloc[:, 1].tolist() == ["a", None]
+
+@pytest.mark.parametrize(
+    "cell",
+    [
+        datetime.date(2024, 1, 1),
+        pd.Timestamp("2024-01-01", tz="UTC"),
+        pd.Timestamp("2024-01-01 00:00:00.000000001"),
+        pd.NaT,
+        object(),
+        2**63,
+        -(2**63) - 1,
+        np.uint64(2**64 - 1),
+    ],
+)
+def test_unsupported_cell_is_not_stored(cell):
+    df_val = pd.DataFrame({"Location": pd.Series(["Digital", cell], dtype=object)})
+    assert encode_frame(df_val) is None
+
+def test_non_str_column_label_is_not_stored():
+    df_val = pd.DataFrame({"Location": ["Digital"], 2024: [1.0]})
+    assert encode_frame(df_val) is None
+
+def test_put_skips_what_encode_frame_cannot_store(tmp_path):
+    cache = SheetDiskCache(cache_dir=tmp_path, max_bytes=10**9)
+    df_val = pd.DataFrame({"Location": pd.Series([object()], dtype=object)})
+
+    assert cache.put("k", df_val) is False
+    assert cache.stats()["skipped"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+def test_get_returns_what_put_stored(tmp_path):
+    cache = SheetDiskCache(cache_dir=tmp_path, max_bytes=10**9)
+    df_val = pd.DataFrame({"Location": pd.Series(["Digital", 3, None], dtype=object), "Written": [1.0, 2.0, 3.0]})
+
+    assert cache.put("k", df_val) is True
+    pd.testing.assert_frame_equal(cache.get("k"), df_val)
+    assert cache.stats()["hits"] == 1
+
+_unpickled = []
+
+def _record_unpickle(marker):
+    _unpickled.append(marker)
+    return marker
+
+class _Payload:
+    def __reduce__(self):
+        return (_record_unpickle, ("unpickled",))
+
+def test_get_deletes_older_format_without_decoding(tmp_path):
+    # A format-1 file: object column c0 with one pickled cell (tag 6)
+    meta = {"format_version": 1, "rows": 1, "columns": ["Location"], "encodings": ["object"], "index": "range"}
+    arrays = [pa.array([6], type=pa.int8()), pa.array([pickle.dumps(_Payload())], type=pa.binary())]
+    schema = pa.schema(
+        [pa.field("c0.tag", pa.int8()), pa.field("c0.6", pa.binary())],
+        metadata={"sheet_cache": json.dumps(meta)},
+    )
+    path_obj = tmp_path / "old.arrow"
+    with ipc.new_file(str(path_obj), schema) as writer:
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    assert FORMAT_VERSION > 1
+
+    cache = SheetDiskCache(cache_dir=tmp_path, max_bytes=10**9)
+    assert cache.get("old") is None
+    assert not path_obj.exists()
+    assert _unpickled == []
+    assert cache.stats()["errors"] == 1
@@ -0,0 +1,197 @@
+"""
+In-process tracing spans for the hot paths (sync, load, build, page render).
+
+    with span("build.write_parquet", output=out_path):
+        ...
+
+    @traced("sync.ensure_latest_workbook")
+    def ensure_latest_workbook(...):
+        ...
+
+Each finished span records wall time, CPU time of its thread and how much the process's
+peak RSS grew while it ran, into a bounded ring buffer. Spans nest per thread; a span with
+no parent starts a new run (one page render, one background refresh). When tracing is
+off, span() returns a shared no-op object and traced() wrappers make a single flag check
+before calling through, so leaving the instrumentation in place costs next to nothing.
+
+Tracing is off unless DASH_TRACING=1 is set; the Debug page can toggle it at runtime.
+Spans recorded in ProcessPoolExecutor workers stay in those processes and are not shown.
+"""
+import collections
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SPAN_BUFFER_SIZE = 5000
+
+_enabled = os.environ.get("DASH_TRACING", "").strip().lower() in ("1", "true", "yes", "on")
+_spans = collections.deque(maxlen=SPAN_BUFFER_SIZE)
+_span_ids = itertools.count(1)
+_local = threading.local()
+
+def tracing_enabled():
+    return _enabled
+
+def set_tracing(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+def _peak_rss_kb():
+    if resource is None:
+        return 0
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, **attrs):
+        return None
+
+_NOOP_SPAN = _NoopSpan()
+
+class _Span:
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "run_id", "depth", "_t0", "_cpu0", "_rss0", "_start_ts")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        # Attach values only known once the work is done (row counts, cache hit, ...)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        parent = stack[-1] if stack else None
+
+        self.span_id = next(_span_ids)
+        self.parent_id = None if parent is None else parent.span_id
+        self.run_id = self.span_id if parent is None else parent.run_id
+        self.depth = len(stack)
+        stack.append(self)
+
+        self._rss0 = _peak_rss_kb()
+        self._start_ts = time.time()
+        self._cpu0 = time.thread_time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        t1 = time.perf_counter()
+        cpu1 = time.thread_time()
+        stack = _local.stack
+        if stack and stack[-1] is self:
+            stack.pop()
+
+        _spans.append(
+            {
+                "run_id": self.run_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "depth": self.depth,
+                "name": self.name,
+                "attrs": {k: _jsonable(v) for k, v in self.attrs.items()},
+                "thread": threading.current_thread().name,
+                "start_ts": self._start_ts,
+                "t0": self._t0,
+                "wall_ms": round((t1 - self._t0) * 1000.0, 3),
+                "cpu_ms": round((cpu1 - self._cpu0) * 1000.0, 3),
+                "rss_peak_delta_kb": _peak_rss_kb() - self._rss0,
+                "error": None if exc_type is None else exc_type.__name__,
+            }
+        )
+        return False
+
+def _jsonable(val):
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    return str(val)
+
+def span(name, **attrs):
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, attrs)
+
+def traced(name=None):
+    """Decorator form of span(); the span is named after the function unless name is given."""
+
+    def _decor(fn):
+        span_name = name if name is not None else fn.__module__ + "." + fn.__qualname__
+
+        @functools.wraps(fn)
+        def _wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(span_name, {}):
+                return fn(*args, **kwargs)
+
+        return _wrapper
+
+    return _decor
+
+def clear_spans():
+    _spans.clear()
+
+def recorded_spans():
+    return list(_spans)
+
+def export_jsonl(path_val=None):
+    """All buffered spans as JSON lines (oldest first); also written to path_val if given."""
+    text_val = "".join(json.dumps(s, sort_keys=True) + "\n" for s in list(_spans))
+    if path_val is not None:
+        with open(path_val, "w") as fh:
+            fh.write(text_val)
+    return text_val
+
+def recent_runs(limit=50):
+    """Root spans, newest first: one row per run with its name, start and total wall time."""
+    roots = [s for s in list(_spans) if s["parent_id"] is None]
+    roots = sorted(roots, key=lambda s: s["start_ts"], reverse=True)[:limit]
+    return pd.DataFrame(
+        [
+            {
+                "run_id": s["run_id"],
+                "name": s["name"],
+                "started": pd.to_datetime(s["start_ts"], unit="s"),
+                "wall_ms": s["wall_ms"],
+                "thread": s["thread"],
+                "error": s["error"],
+            }
+            for s in roots
+        ],
+        columns=["run_id", "name", "started", "wall_ms", "thread", "error"],
+    )
+
+def run_spans(run_id):
+    """
+    Spans of one run in start order, with offset_ms / end_ms relative to the run start
+    (the shape a waterfall chart needs).
+    """
+    rows = [s for s in list(_spans) if s["run_id"] == run_id]
+    if len(rows) == 0:
+        return pd.DataFrame()
+    df_val = pd.DataFrame(rows).sort_values("t0").reset_index(drop=True)
+    run_t0 = float(df_val["t0"].min())
+    df_val["offset_ms"] = ((df_val["t0"] - run_t0) * 1000.0).round(3)
+    df_val["end_ms"] = df_val["offset_ms"] + df_val["wall_ms"]
+    df_val["attrs"] = [json.dumps(a, sort_keys=True) for a in df_val["attrs"]]
+    df_val["label"] = [
+        "  " * int(d) + str(n) + " #" + str(i) for d, n, i in zip(df_val["depth"], df_val["name"], df_val["span_id"])
+    ]
+    return df_val.drop(columns=["t0"])
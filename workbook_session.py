@@ -0,0 +1,141 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from xlsx_reader import XlsxReader
+
+# "stream" reads cell values straight from the sheet XML (xlsx_reader);
+# "openpyxl" goes through openpyxl's read-only workbook like pd.read_excel does.
+DEFAULT_BACKEND = "stream"
+BACKENDS = ("stream", "openpyxl")
+
+class WorkbookSession:
+    """
+    One open handle on an xlsx for a whole build.
+
+    The zip is opened and sharedStrings.xml is parsed once per session. Each sheet is
+    then read at most once into plain row lists (the same cell values pd.read_excel
+    sees), and both the header preview and the body are derived from those rows, so no
+    sheet is parsed twice.
+
+    Frames come out of pandas' own TextParser with the same options pd.read_excel
+    uses, so dtypes, NaN handling and duplicate column names (Divisions.1, ...)
+    match a direct pd.read_excel(..., header=k) call.
+    """
+
+    def __init__(self, excel_path, backend=DEFAULT_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown workbook backend: " + str(backend) + " (expected one of " + str(BACKENDS) + ")")
+
+        self.excel_path = Path(excel_path)
+        self.backend = backend
+        self._book = None
+        self._reader = None
+        if backend == "stream":
+            self._reader = XlsxReader(self.excel_path)
+        else:
+            from openpyxl import load_workbook
+
+            # Same options pandas uses for its openpyxl engine
+            self._book = load_workbook(
+                str(self.excel_path), read_only=True, data_only=True, keep_links=False
+            )
+        self._rows_by_sheet = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._rows_by_sheet = {}
+
+    @property
+    def sheet_names(self):
+        if self._reader is not None:
+            return self._reader.sheet_names
+        return [ws.title for ws in self._book.worksheets]
+
+    def _sheet_rows(self, sheet_name):
+        if sheet_name in self._rows_by_sheet:
+            return self._rows_by_sheet[sheet_name]
+
+        if sheet_name not in self.sheet_names:
+            raise ValueError("Worksheet named '" + str(sheet_name) + "' not found")
+
+        if self._reader is not None:
+            rows = self._reader.read_rows(sheet_name)
+        else:
+            ws = self._book[sheet_name]
+            ws.reset_dimensions()
+            rows = _rows_like_pandas(ws.rows)
+        self._rows_by_sheet[sheet_name] = rows
+        return rows
+
+    def release(self, sheet_name):
+        """Drops the cached rows of a sheet once the caller is done with it."""
+        self._rows_by_sheet.pop(sheet_name, None)
+
+    def preview(self, sheet_name, nrows=30):
+        """Equivalent of pd.read_excel(path, sheet_name, header=None, nrows=nrows)."""
+        rows = self._sheet_rows(sheet_name)[: int(nrows)]
+        if len(rows) == 0:
+            return pd.DataFrame()
+        parser = TextParser([list(r) for r in rows], header=None, skip_blank_lines=False)
+        return parser.read()
+
+    def read_sheet(self, sheet_name, header=0):
+        """Equivalent of pd.read_excel(path, sheet_name, header=header)."""
+        rows = self._sheet_rows(sheet_name)
+        if len(rows) == 0:
+            return pd.DataFrame()
+        # TextParser may mutate its input while promoting the header, so hand it copies
+        parser = TextParser(
+            [list(r) for r in rows],
+            header=None if header is None else int(header),
+            skip_blank_lines=False,
+        )
+        return parser.read()
+
+def _convert_cell(cell):
+    # Mirrors pandas' openpyxl reader so values are identical to pd.read_excel
+    value = cell.value
+    if value is None:
+        return ""
+    data_type = cell.data_type
+    if data_type == "e":
+        return np.nan
+    if data_type == "n":
+        int_val = int(value)
+        if int_val == value:
+            return int_val
+        return float(value)
+    return value
+
+def _rows_like_pandas(ws_rows):
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(ws_rows):
+        converted_row = [_convert_cell(cell) for cell in row]
+        while converted_row and converted_row[-1] == "":
+            converted_row.pop()
+        if converted_row:
+            last_row_with_data = row_number
+        data.append(converted_row)
+
+    data = data[: last_row_with_data + 1]
+
+    if len(data) > 0:
+        max_width = max(len(r) for r in data)
+        data = [r + [""] * (max_width - len(r)) for r in data]
+
+    return data
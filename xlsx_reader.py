@@ -0,0 +1,545 @@
+"""
+Streaming, values-only XLSX reader built on the standard library (zipfile + iterparse).
+
+Pivot exports only need plain cell values, so this skips everything openpyxl builds per
+cell (styles, Cell objects, formulas) and reads xl/worksheets/sheetN.xml row by row.
+Values follow openpyxl's data_only rules (shared strings, booleans, date styles, the
+1900/1904 epochs), and read_rows() returns rows in the exact shape pandas builds for
+pd.read_excel, so it can stand in for openpyxl anywhere a WorkbookSession is used.
+"""
+from pathlib import Path
+import datetime
+import functools
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+WORKBOOK_CONTENT_TYPES = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml",
+    "application/vnd.ms-excel.sheet.macroEnabled.main+xml",
+)
+
+WINDOWS_EPOCH = datetime.datetime(1899, 12, 30)
+MAC_EPOCH = datetime.datetime(1904, 1, 1)
+SECS_PER_DAY = 86400
+
+# Built-in number formats that are dates/times (ECMA-376 18.8.30), as openpyxl sees them
+BUILTIN_DATE_FORMATS = {
+    14: "mm-dd-yy",
+    15: "d-mmm-yy",
+    16: "d-mmm",
+    17: "mmm-yy",
+    18: "h:mm AM/PM",
+    19: "h:mm:ss AM/PM",
+    20: "h:mm",
+    21: "h:mm:ss",
+    22: "m/d/yy h:mm",
+    45: "mm:ss",
+    46: "[h]:mm:ss",
+    47: "mmss.0",
+}
+
+_LITERAL_GROUP = r'".*?"'
+_LOCALE_GROUP = r"\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]"
+_STRIP_RE = re.compile(_LITERAL_GROUP + "|" + _LOCALE_GROUP)
+_DATE_CHAR_RE = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+_TIMEDELTA_RE = re.compile(
+    r"\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?", re.I
+)
+_ISO_RE = re.compile(
+    r"(?P<date>(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2}))?T?"
+    r"(?P<time>(?P<hour>\d{2}):(?P<minute>\d{2})(:(?P<second>\d{2})(?P<microsecond>\.\d{1,3})?)?)?Z?"
+)
+_ISO_DURATION_RE = re.compile(r"PT((?P<hours>\d+)H)?((?P<minutes>\d+)M)?((?P<seconds>\d+(\.\d{1,3})?)S)?")
+
+def _is_date_format(fmt):
+    if fmt is None:
+        return False
+    fmt = _STRIP_RE.sub("", fmt.split(";")[0])
+    return _DATE_CHAR_RE.search(fmt) is not None
+
+def _is_timedelta_format(fmt):
+    if fmt is None:
+        return False
+    return _TIMEDELTA_RE.search(fmt.split(";")[0]) is not None
+
+def _from_excel(value, epoch, timedelta=False):
+    if timedelta:
+        td = datetime.timedelta(days=value)
+        if td.microseconds:
+            td = datetime.timedelta(
+                seconds=td.total_seconds() // 1, microseconds=round(td.microseconds, -3)
+            )
+        return td
+
+    day, fraction = divmod(value, 1)
+    diff = datetime.timedelta(milliseconds=round(fraction * SECS_PER_DAY * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        mins, seconds = divmod(diff.seconds, 60)
+        hours, mins = divmod(mins, 60)
+        return datetime.time(hours, mins, seconds, diff.microseconds)
+    if 0 < value < 60 and epoch == WINDOWS_EPOCH:
+        day += 1
+    return epoch + datetime.timedelta(days=day) + diff
+
+def _from_iso8601(text_val):
+    match = _ISO_RE.match(text_val)
+    if match and any(match.groups()):
+        parts = match.groupdict(0)
+        for key in ["year", "month", "day", "hour", "minute", "second"]:
+            if parts[key]:
+                parts[key] = int(parts[key])
+        if parts["microsecond"]:
+            parts["microsecond"] = int(float(parts["microsecond"]) * 1_000_000)
+        if not parts["date"]:
+            return datetime.time(parts["hour"], parts["minute"], parts["second"], parts["microsecond"])
+        if not parts["time"]:
+            return datetime.date(parts["year"], parts["month"], parts["day"])
+        return datetime.datetime(
+            parts["year"],
+            parts["month"],
+            parts["day"],
+            parts["hour"],
+            parts["minute"],
+            parts["second"],
+            parts["microsecond"],
+        )
+
+    match = _ISO_DURATION_RE.match(text_val)
+    if match and any(match.groups()):
+        parts = {k: float(v) for k, v in match.groupdict().items() if v}
+        return datetime.timedelta(**parts)
+
+    raise ValueError("Invalid datetime value " + str(text_val))
+
+def _cast_number(text_val):
+    if "." in text_val or "E" in text_val or "e" in text_val:
+        return float(text_val)
+    return int(text_val)
+
+# A sheet has at most 16384 columns (A..XFD)
+MAX_SHEET_COLUMNS = 16384
+
+@functools.lru_cache(maxsize=MAX_SHEET_COLUMNS)
+def _letters_index(letters):
+    # "AB" -> 28 (1-based); memoized since every row repeats the same letters
+    col_idx = 0
+    for ch in letters:
+        col_idx = col_idx * 26 + (ord(ch.upper()) - 64)
+    return col_idx
+
+def _column_index(ref_val):
+    # "AB12" -> 28
+    return _letters_index(ref_val.rstrip("0123456789"))
+
+def _ns_of(tag_val):
+    if tag_val.startswith("{"):
+        return tag_val[: tag_val.index("}") + 1]
+    return ""
+
+def _resolve_target(base_dir, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+def read_workbook_parts(zf):
+    """
+    Reads xl/workbook.xml and its rels from an open ZipFile.
+
+    Returns a dict with:
+    - sheets: list of (sheet_name, part_path) for worksheets, in workbook order
+    - shared_strings: part path or None
+    - styles: part path or None
+    - date1904: bool
+    """
+    wb_root = ET.fromstring(zf.read("xl/workbook.xml"))
+    ns = _ns_of(wb_root.tag)
+
+    rels_targets = {}
+    rels_types = {}
+    if "xl/_rels/workbook.xml.rels" in zf.NameToInfo:
+        rels_root = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        for rel in rels_root.iter("{" + PKG_REL_NS + "}Relationship"):
+            rel_id = rel.get("Id")
+            rels_targets[rel_id] = _resolve_target("xl", rel.get("Target", ""))
+            rels_types[rel_id] = rel.get("Type", "").rsplit("/", 1)[-1]
+
+    sheets = []
+    for sheet_el in wb_root.iter(ns + "sheet"):
+        rel_id = None
+        for attr_key, attr_val in sheet_el.attrib.items():
+            if attr_key.endswith("}id"):
+                rel_id = attr_val
+                break
+        if rels_types.get(rel_id) != "worksheet":
+            # Chartsheets and dialogs have no cells; pandas skips them too
+            continue
+        sheets.append((sheet_el.get("name"), rels_targets[rel_id]))
+
+    date1904 = False
+    pr_el = wb_root.find(ns + "workbookPr")
+    if pr_el is not None:
+        date1904 = str(pr_el.get("date1904", "")).lower() in ("1", "true")
+
+    shared_strings = None
+    styles = None
+    for rel_id, rel_type in rels_types.items():
+        if rel_type == "sharedStrings":
+            shared_strings = rels_targets[rel_id]
+        elif rel_type == "styles":
+            styles = rels_targets[rel_id]
+
+    return {
+        "sheets": sheets,
+        "shared_strings": shared_strings,
+        "styles": styles,
+        "date1904": date1904,
+    }
+
+def _part_fingerprint(zf, part_path):
+    # CRC-32 and size from the zip central directory: nothing is decompressed
+    info = zf.NameToInfo.get(part_path)
+    if info is None:
+        return None
+    return format(info.CRC, "08x") + ":" + str(info.file_size)
+
+def sheet_input_fingerprints(excel_path, sheet_names):
+    """
+    {sheet_name: {input: fingerprint}} for every zip part a sheet's cell values are read
+    from: its worksheet part, sharedStrings and styles (number formats decide which
+    numbers are dates), plus the workbook's 1900/1904 date system.
+
+    Sheets that are not in the workbook map to None.
+    """
+    with zipfile.ZipFile(str(excel_path), "r") as zf:
+        parts = read_workbook_parts(zf)
+
+        common = {}
+        for part_path in (parts["shared_strings"], parts["styles"]):
+            if part_path is not None:
+                common[part_path] = _part_fingerprint(zf, part_path)
+        common["xl/workbook.xml#date1904"] = "1" if parts["date1904"] else "0"
+
+        sheet_parts = dict(parts["sheets"])
+        out = {}
+        for sheet_name in sheet_names:
+            part_path = sheet_parts.get(sheet_name)
+            if part_path is None:
+                out[sheet_name] = None
+                continue
+            inputs = {part_path: _part_fingerprint(zf, part_path)}
+            inputs.update(common)
+            out[sheet_name] = inputs
+    return out
+
+def _check_central_directory(zf, file_size):
+    # Every member must end before the central directory and start with a local header
+    # where the directory says it does; a handful of 4-byte reads, nothing decompressed
+    if zf.start_dir > file_size:
+        raise ValueError("Zip central directory lies past the end of the file (truncated download)")
+    for info in zf.infolist():
+        if info.header_offset < 0 or info.header_offset + info.compress_size > zf.start_dir:
+            raise ValueError("Zip member " + str(info.filename) + " lies outside the archive body (truncated or corrupt download)")
+        zf.fp.seek(info.header_offset)
+        if zf.fp.read(4) != LOCAL_HEADER_SIGNATURE:
+            raise ValueError("Zip member " + str(info.filename) + " has no local header at its recorded offset")
+
+def _content_types(zf):
+    # {"/part/name": content_type} from the Override entries of [Content_Types].xml
+    if CONTENT_TYPES_PART not in zf.NameToInfo:
+        raise ValueError("Zip has no " + CONTENT_TYPES_PART + "; not an Office Open XML package")
+    root = ET.fromstring(zf.read(CONTENT_TYPES_PART))
+    ns = _ns_of(root.tag)
+    return {el.get("PartName", ""): el.get("ContentType", "") for el in root.iter(ns + "Override")}
+
+def workbook_sheet_index(excel_path):
+    """
+    [(sheet_name, part_path)] for the worksheets of an xlsx, read from package metadata only:
+    the zip central directory, [Content_Types].xml, xl/workbook.xml and its rels. No
+    worksheet, shared strings or styles part is decompressed.
+
+    Raises ValueError if the file is not a complete xlsx package: not a zip or cut short,
+    no spreadsheet workbook part, or a sheet whose part is missing from the archive.
+    """
+    excel_path = Path(excel_path)
+    try:
+        zf = zipfile.ZipFile(str(excel_path), "r")
+    except zipfile.BadZipFile as exc:
+        # The central directory sits at the end of the file, so a truncated zip fails here
+        raise ValueError("Not a readable zip (truncated or not an xlsx): " + str(exc))
+
+    with zf:
+        _check_central_directory(zf, excel_path.stat().st_size)
+
+        content_types = _content_types(zf)
+        if content_types.get("/xl/workbook.xml") not in WORKBOOK_CONTENT_TYPES:
+            raise ValueError(
+                "xl/workbook.xml is not a spreadsheet workbook part (content type "
+                + str(content_types.get("/xl/workbook.xml"))
+                + ")"
+            )
+
+        try:
+            sheets = read_workbook_parts(zf)["sheets"]
+        except (KeyError, ET.ParseError) as exc:
+            raise ValueError("Unreadable workbook.xml or workbook rels: " + str(exc))
+
+        missing_parts = [part_path for _, part_path in sheets if part_path not in zf.NameToInfo]
+        if missing_parts:
+            raise ValueError("Worksheet parts missing from the archive: " + str(missing_parts))
+    return sheets
+
+class XlsxReader:
+    """
+    Values-only reader over one xlsx file.
+
+    The zip and workbook.xml are opened once; sharedStrings.xml and styles.xml are parsed
+    lazily on first use and then reused for every sheet.
+    """
+
+    def __init__(self, excel_path):
+        self.excel_path = Path(excel_path)
+        self._zf = zipfile.ZipFile(str(self.excel_path), "r")
+        parts = read_workbook_parts(self._zf)
+        self._sheet_parts = dict(parts["sheets"])
+        self._sheet_order = [name for name, _ in parts["sheets"]]
+        self._shared_strings_part = parts["shared_strings"]
+        self._styles_part = parts["styles"]
+        self._epoch = MAC_EPOCH if parts["date1904"] else WINDOWS_EPOCH
+        self._shared_strings = None
+        self._date_styles = None
+        self._timedelta_styles = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self._zf is not None:
+            self._zf.close()
+            self._zf = None
+
+    @property
+    def sheet_names(self):
+        return list(self._sheet_order)
+
+    def sheet_part(self, sheet_name):
+        if sheet_name not in self._sheet_parts:
+            raise ValueError("Worksheet named '" + str(sheet_name) + "' not found")
+        return self._sheet_parts[sheet_name]
+
+    def _load_shared_strings(self):
+        if self._shared_strings is not None:
+            return self._shared_strings
+
+        strings = []
+        part = self._shared_strings_part
+        if part is not None and part in self._zf.NameToInfo:
+            with self._zf.open(part) as fh:
+                ns = None
+                for event, el in ET.iterparse(fh, events=("end",)):
+                    if ns is None:
+                        ns = _ns_of(el.tag)
+                        si_tag, t_tag, r_tag = ns + "si", ns + "t", ns + "r"
+                    if el.tag != si_tag:
+                        continue
+                    strings.append(_text_content(el, t_tag, r_tag).replace("x005F_", ""))
+                    el.clear()
+
+        self._shared_strings = strings
+        return strings
+
+    def _load_styles(self):
+        if self._date_styles is not None:
+            return
+
+        date_styles = set()
+        timedelta_styles = set()
+        part = self._styles_part
+        if part is not None and part in self._zf.NameToInfo:
+            root = ET.fromstring(self._zf.read(part))
+            ns = _ns_of(root.tag)
+
+            custom_formats = {}
+            num_fmts = root.find(ns + "numFmts")
+            if num_fmts is not None:
+                for fmt_el in num_fmts.findall(ns + "numFmt"):
+                    custom_formats[int(fmt_el.get("numFmtId"))] = fmt_el.get("formatCode")
+
+            cell_xfs = root.find(ns + "cellXfs")
+            if cell_xfs is not None:
+                for style_idx, xf_el in enumerate(cell_xfs.findall(ns + "xf")):
+                    fmt_id = int(xf_el.get("numFmtId", 0))
+                    fmt_code = custom_formats.get(fmt_id, BUILTIN_DATE_FORMATS.get(fmt_id))
+                    if _is_date_format(fmt_code):
+                        date_styles.add(style_idx)
+                    if _is_timedelta_format(fmt_code):
+                        timedelta_styles.add(style_idx)
+
+        self._date_styles = date_styles
+        self._timedelta_styles = timedelta_styles
+
+    def iter_rows(self, sheet_name, max_rows=None):
+        """
+        Yields one tuple per sheet row (1-based row numbers are dense: gaps come out as
+        empty tuples). Empty cells are None. Stops after max_rows rows when given, without
+        reading the rest of the sheet part.
+        """
+        part = self.sheet_part(sheet_name)
+        shared_strings = self._load_shared_strings()
+        self._load_styles()
+        date_styles = self._date_styles
+        timedelta_styles = self._timedelta_styles
+        epoch = self._epoch
+
+        if max_rows is not None and int(max_rows) <= 0:
+            return
+
+        with self._zf.open(part) as fh:
+            ns = None
+            sheet_data = None
+            row_counter = 0
+            emitted = 0
+            for event, el in ET.iterparse(fh, events=("start", "end")):
+                if ns is None:
+                    ns = _ns_of(el.tag)
+                    row_tag, c_tag, v_tag = ns + "row", ns + "c", ns + "v"
+                    is_tag, t_tag, r_tag = ns + "is", ns + "t", ns + "r"
+                    sheet_data_tag = ns + "sheetData"
+                if event == "start":
+                    if sheet_data is None and el.tag == sheet_data_tag:
+                        sheet_data = el
+                    continue
+                if el.tag != row_tag:
+                    continue
+
+                r_attr = el.get("r")
+                row_idx = int(r_attr) if r_attr else row_counter + 1
+
+                # Duplicate / out-of-order rows are ignored, like openpyxl does
+                if row_idx <= row_counter:
+                    sheet_data.clear()
+                    continue
+
+                while row_counter + 1 < row_idx:
+                    row_counter += 1
+                    yield ()
+                    emitted += 1
+                    if max_rows is not None and emitted >= max_rows:
+                        return
+
+                values = []
+                col_counter = 0
+                for c_el in el.iter(c_tag):
+                    ref_val = c_el.get("r")
+                    col_idx = _column_index(ref_val) if ref_val else col_counter + 1
+                    col_counter = col_idx
+
+                    data_type = c_el.get("t", "n")
+                    if data_type == "inlineStr":
+                        is_el = c_el.find(is_tag)
+                        value = None if is_el is None else _text_content(is_el, t_tag, r_tag)
+                    else:
+                        value = c_el.findtext(v_tag, None) or None
+                        if value is not None:
+                            if data_type == "n":
+                                value = _cast_number(value)
+                                style_id = int(c_el.get("s", 0) or 0)
+                                if style_id in date_styles:
+                                    try:
+                                        value = _from_excel(
+                                            value, epoch, timedelta=style_id in timedelta_styles
+                                        )
+                                    except (OverflowError, ValueError):
+                                        data_type = "e"
+                                        value = "#VALUE!"
+                            elif data_type == "s":
+                                value = shared_strings[int(value)]
+                            elif data_type == "b":
+                                value = bool(int(value))
+                            elif data_type == "d":
+                                value = _from_iso8601(value)
+
+                    if data_type == "e" and value is not None:
+                        value = _ERROR
+                    if col_idx > len(values):
+                        values.extend([None] * (col_idx - len(values)))
+                    values[col_idx - 1] = value
+
+                # Drop finished rows from <sheetData> so memory stays flat on long sheets
+                sheet_data.clear()
+                row_counter = row_idx
+                yield tuple(values)
+                emitted += 1
+                if max_rows is not None and emitted >= max_rows:
+                    return
+
+    def read_rows(self, sheet_name, max_rows=None):
+        """
+        Returns the sheet as list-of-lists in the shape pandas builds for pd.read_excel:
+        empty cells are "", error cells are NaN, integral floats are ints, trailing empty
+        cells and rows are trimmed and every row is padded to the widest row.
+        """
+        nan_val = float("nan")
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(self.iter_rows(sheet_name, max_rows=max_rows)):
+            converted_row = []
+            for value in row:
+                if value is None:
+                    converted_row.append("")
+                elif value is _ERROR:
+                    converted_row.append(nan_val)
+                elif type(value) is float:
+                    int_val = int(value)
+                    converted_row.append(int_val if int_val == value else value)
+                else:
+                    converted_row.append(value)
+            while converted_row and converted_row[-1] == "":
+                converted_row.pop()
+            if converted_row:
+                last_row_with_data = row_number
+            data.append(converted_row)
+
+        data = data[: last_row_with_data + 1]
+
+        if len(data) > 0:
+            max_width = max(len(r) for r in data)
+            data = [r + [""] * (max_width - len(r)) for r in data]
+
+        return data
+
+    def read_columns(self, sheet_name, max_rows=None):
+        """Same values as read_rows(), transposed into one list per column."""
+        rows = self.read_rows(sheet_name, max_rows=max_rows)
+        if len(rows) == 0:
+            return []
+        return [list(col) for col in zip(*rows)]
+
+class _ErrorValue:
+    # Marker for #N/A, #REF! and friends; read_rows() turns it into NaN like pandas does
+    def __repr__(self):
+        return "<xlsx error>"
+
+_ERROR = _ErrorValue()
+
+def _text_content(el, t_tag, r_tag):
+    # Plain <t> text plus the <t> of each rich-text run; phonetic runs (<rPh>) are skipped
+    snippets = []
+    for child in el:
+        if child.tag == t_tag:
+            if child.text is not None:
+                snippets.append(child.text)
+        elif child.tag == r_tag:
+            t_el = child.find(t_tag)
+            if t_el is not None and t_el.text is not None:
+                snippets.append(t_el.text)
+    return "".join(snippets)